@@ -1,9 +1,15 @@
 from __future__ import annotations
 
 import base64
+import functools
+import hashlib
 import logging
+import math
 import os
 import random
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from krita import Krita, QUuid, Selection
 
@@ -14,11 +20,39 @@ from ..qt_compat import (
     QIODevice,
     QObject,
     QPointF,
+    QRectF,
     QThread,
     Qt,
     pyqtSignal,
 )
-from ..qt_compat import QImage, qAlpha, qRgb
+from ..qt_compat import QColor, QImage, QImageWriter, QPainter
+from ..domain.capture_cache import CaptureCache, DocumentRevision, sample_offsets, sample_step
+from ..domain.color_match import match_colors
+from ..domain.composite_plan import COMPOSITE_MODES, plan_composite_without
+from ..domain.dirty_region import DirtyUpdate, changed_tiles, dirty_mask, plan_dirty_update
+from ..domain.encode_cache import EncodedImageCache, pixel_fingerprint
+from ..domain.generation_plan import RESULT_RESAMPLING_MODES
+from ..domain.image_buffer import ImageBuffer, StripResampler, resampling_supported
+from ..domain.image_codec import IMAGE_ROLE_MASK, ImageEncoding, UploadCodecPolicy
+from ..domain.mask_ops import (
+    alpha_to_bgra,
+    is_binary_mask,
+    mask_bounds,
+    mask_feather,
+    mask_invert,
+)
+from ..domain.node_index import NodeIndex, walk_nodes
+from ..domain.payload_tiler import scale_rect
+from ..domain.png_stream import PngStreamWriter, bgra_to_rgba
+from ..domain.pixel_buffer import (
+    RGBA_BYTES_PER_PIXEL,
+    DecodedImage,
+    channel_plane,
+    scaled_size,
+)
+from ..domain.streamed_payload import StreamedImage
+from ..domain.telemetry import telemetry
+from .qt_image import pixel_data_to_buffer, qimage_bits, qimage_to_buffer
 
 
 class _Worker(QObject):
@@ -38,6 +72,38 @@ class _Worker(QObject):
             self.finished.emit()
 
 
+# Node indexes keyed by the document's root node UUID; shared by every
+# KritaAdapter instance because widgets create their own adapters. Entries
+# of closed documents are dropped (see _forget_closed_documents).
+_NODE_INDEXES: dict[str, NodeIndex] = {}
+_watching_document_close = False
+
+# Encoded uploads keyed by pixel fingerprint, role and codec policy; shared
+# for the same reason.
+_ENCODE_CACHE = EncodedImageCache()
+
+# Latest canvas captures per region, reused while the document is unchanged.
+_CAPTURES = CaptureCache()
+# Bytes of pixels read per revision checksum, whatever the region size.
+_REVISION_SAMPLE_BYTES = 1024 * 1024
+_FINGERPRINTS: OrderedDict[int, tuple] = OrderedDict()
+_MAX_FINGERPRINTS = 32
+
+# Streamed captures read strips of about this many bytes and keep the
+# encoded PNG in memory up to the spool size before moving it to disk.
+_STREAM_STRIP_BYTES = 16 * 1024 * 1024
+_STREAM_SPOOL_BYTES = 64 * 1024 * 1024
+
+# Projections of regions as they looked after their last results landed,
+# the baseline incremental img2img diffs against. Full-size, so few are kept.
+_BASELINES: OrderedDict[tuple, ImageBuffer] = OrderedDict()
+_MAX_BASELINES = 2
+
+# Maps an upload's size to the size it is sent at, while a generation
+# collects its widget payloads (see KritaAdapter.upload_sizing).
+_UPLOAD_SIZER = None
+
+
 class KritaAdapter:
     def __init__(self) -> None:
         self.doc = Krita.instance().activeDocument()
@@ -130,34 +196,254 @@ class KritaAdapter:
         base64str: str,
         width: int = -1,
         height: int = -1,
-    ) -> tuple[QByteArray, int, int]:
-        image_data = base64.b64decode(base64str)
-        image_format = "PNG" if base64str.startswith("iVBORw0KGgo") else "JPEG"
-        image = QImage.fromData(image_data, image_format)
+    ) -> tuple[bytes, int, int]:
+        """Decode a result image into BGRA pixel data for ``Node.setPixelData``.
 
-        if image.isGrayscale():
-            image = image.convertToFormat(QImage.Format_RGBA8888)
+        The image is decoded once, converted only when it is not already
+        32-bit ARGB, resized in a single step and copied out of Qt once.
+        PyQt accepts the returned ``bytes`` wherever Krita takes a
+        ``QByteArray``.
+        """
+        with telemetry.timed("results.decode_ms"):
+            image = _decode_argb32(base64str)
+            if image is None:
+                return b"", 0, 0
 
-        if width > -1:
-            image = image.scaledToWidth(width)
-        if height > -1:
-            image = image.scaledToHeight(height)
+            target_w, target_h = scaled_size(image.width(), image.height(), width, height)
+            if (target_w, target_h) != (image.width(), image.height()):
+                image = image.scaled(target_w, target_h)
 
-        image_bits = image.bits()
-        if image_bits is None:
-            return QByteArray(), 0, 0
+            return _qimage_bytes(image), image.width(), image.height()
 
-        image_bits.setsize(image.byteCount())
-        return QByteArray(image_bits.asstring()), image.width(), image.height()
+    @staticmethod
+    def resample_to_pixeldata(
+        base64str: str, width: int, height: int, method: str = "bilinear",
+    ) -> tuple[bytes, int, int]:
+        """Decode and resample a result to exactly ``width`` x ``height``.
+
+        ``"bicubic"`` and ``"lanczos"`` use :meth:`ImageBuffer.resample` when
+        NumPy is installed; otherwise, and for ``"bilinear"``, Qt's smooth
+        scaling is used (the settings page then offers only bilinear). Only ``QImage`` is touched, so this is safe on a
+        worker thread.
+        """
+        with telemetry.timed("results.resample_ms"):
+            image = _decode_argb32(base64str)
+            if image is None:
+                return b"", 0, 0
+
+            if (
+                (image.width(), image.height()) != (width, height)
+                and method != "bilinear"
+                and resampling_supported(method)
+            ):
+                buffer = qimage_to_buffer(image).resample(width, height, method)
+                return buffer.tobytes(), width, height
+
+            if (image.width(), image.height()) != (width, height):
+                image = image.scaled(
+                    width,
+                    height,
+                    Qt.AspectRatioMode.IgnoreAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation,
+                )
+            return _qimage_bytes(image), image.width(), image.height()
+
+    @classmethod
+    def decode_results(
+        cls, results, w: int = -1, h: int = -1, resample: str = "transform_mask",
+    ):
+        """Return a copy of ``results`` with its images decoded to pixel buffers.
+
+        Only ``QImage`` is used, so this is safe on a worker thread; the
+        decoded results can then be passed to :meth:`results_to_layers` on the
+        UI thread, which only creates and fills the layers. With ``resample``
+        set to a filter name the images are also resampled to ``w`` x ``h``
+        here (see :meth:`resample_to_pixeldata`), so they need no transform
+        afterwards.
+        """
+        if not isinstance(results, dict):
+            return results
+        resampled = resample in _PIXEL_RESAMPLING and w > 0 and h > 0
+
+        def _decode(image_data):
+            if resampled:
+                return DecodedImage(*cls.resample_to_pixeldata(image_data, w, h, resample))
+            return DecodedImage(*cls.base64_to_pixeldata(image_data))
+
+        decoded = dict(results)
+        images = results.get("images")
+        if isinstance(images, list):
+            decoded["images"] = [
+                _decode(image_data)
+                if isinstance(image_data, str) and image_data
+                else image_data
+                for image_data in images
+            ]
+
+        image_data = results.get("image")
+        if isinstance(image_data, str) and image_data:
+            decoded["image"] = (
+                _decode(image_data)
+                if resampled
+                else DecodedImage(*cls.base64_to_pixeldata(image_data, w, h))
+            )
+
+        return decoded
+
+    @classmethod
+    def match_result_colors(
+        cls,
+        results,
+        reference_b64: str,
+        mode: str,
+        mask_b64: str | None = None,
+        invert_mask: bool = False,
+    ):
+        """Return ``results`` with its decoded images colour-matched to the source.
+
+        Runs on the worker thread after :meth:`decode_results`. The source
+        and ``mask_b64`` are scaled to each result's size; with a mask only
+        the inpainted pixels change (see :func:`match_colors`).
+        """
+        images = results.get("images") if isinstance(results, dict) else None
+        reference = _decode_argb32(reference_b64) if reference_b64 else None
+        if not isinstance(images, list) or reference is None:
+            return results
+
+        mask = None
+        if mask_b64:
+            mask = QImage.fromData(base64.b64decode(mask_b64))
+            mask = None if mask.isNull() else mask.convertToFormat(QImage.Format.Format_Grayscale8)
+
+        scaled: dict[tuple[int, int], tuple] = {}
+        matched = []
+        with telemetry.timed("results.color_match_ms"):
+            for image in images:
+                if not isinstance(image, DecodedImage):
+                    matched.append(image)
+                    continue
+                size = (image.width, image.height)
+                if size not in scaled:
+                    scaled[size] = (
+                        qimage_to_buffer(_scaled_to(reference, *size)),
+                        _mask_plane(_scaled_to(mask, *size), invert_mask) if mask else None,
+                    )
+                source, plane = scaled[size]
+                buffer = match_colors(
+                    ImageBuffer(image.pixels, image.width, image.height, order="BGRA"),
+                    source,
+                    mode,
+                    plane,
+                )
+                matched.append(DecodedImage(buffer.tobytes(), image.width, image.height))
+        return {**results, "images": matched}
+
+    @classmethod
+    def _result_pixeldata(
+        cls, image_data, w: int = -1, h: int = -1,
+    ) -> tuple[bytes, int, int]:
+        if isinstance(image_data, DecodedImage):
+            return image_data.pixels, image_data.width, image_data.height
+        return cls.base64_to_pixeldata(image_data, w, h)
+
+    @classmethod
+    def crop_b64_image(cls, base64str: str, rect, source_size: tuple[int, int]) -> str:
+        """Crop an encoded image to ``rect``, given in ``source_size`` coordinates.
+
+        Images at another resolution than ``source_size`` are cropped at the
+        scaled position; undecodable images are returned unchanged.
+        """
+        image_format = "PNG" if base64str.startswith("iVBORw0KGgo") else "JPEG"
+        image = QImage.fromData(base64.b64decode(base64str), image_format)
+        if image.isNull():
+            return base64str
+        crop = scale_rect(rect, source_size, (image.width(), image.height()))
+        return cls.qimage_to_b64_str(image.copy(crop.x, crop.y, crop.width, crop.height))
 
     @staticmethod
-    def qimage_to_b64_str(image: QImage) -> str:
+    def qimage_to_b64_str(image: QImage, encoding: ImageEncoding | None = None) -> str:
+        encoding = encoding or ImageEncoding()
+        if encoding.mono:
+            image = image.convertToFormat(
+                QImage.Format.Format_Mono, Qt.ImageConversionFlag.ThresholdDither,
+            )
         byte_array = QByteArray()
         buffer = QBuffer(byte_array)
         buffer.open(QIODevice.OpenModeFlag.WriteOnly)
-        image.save(buffer, "PNG")
+        image.save(buffer, encoding.fmt, encoding.quality)
         return byte_array.toBase64().data().decode()
 
+    @classmethod
+    def encode_upload(cls, image: QImage, role: str, policy: UploadCodecPolicy) -> str:
+        """Encode ``image`` for upload with the ``policy`` encoding for ``role``.
+
+        Inside :meth:`upload_sizing` the image is first downscaled to the
+        planned request size. Results are cached by pixel content and size,
+        so the same capture sent by several widgets, or by back-to-back jobs,
+        is resampled and encoded once.
+        """
+        pixels = qimage_bits(image)
+        size = cls.upload_size(image.width(), image.height())
+        key = (_image_fingerprint(image, pixels), role, policy, size)
+        encoded = _ENCODE_CACHE.get(key)
+        if encoded is not None:
+            telemetry.increment("uploads.cache_hits")
+            return encoded
+
+        telemetry.increment("uploads.cache_misses")
+        if size != (image.width(), image.height()):
+            with telemetry.timed(f"uploads.{role}_resample_ms"):
+                image = _scaled_to(image, *size)
+            pixels = qimage_bits(image)
+        binary_mask = (
+            role == IMAGE_ROLE_MASK
+            and policy.mono_masks
+            and image.format() == QImage.Format.Format_Grayscale8
+            and is_binary_mask(
+                channel_plane(
+                    pixels.asstring(),
+                    image.width(),
+                    image.height(),
+                    image.bytesPerLine(),
+                    0,
+                    1,
+                )
+            )
+        )
+        encoding = policy.encoding_for(role, _writable_formats(), binary_mask)
+        with telemetry.timed(f"uploads.{role}_encode_ms"):
+            encoded = cls.qimage_to_b64_str(image, encoding)
+        telemetry.record(f"uploads.{role}_bytes", len(encoded))
+        _ENCODE_CACHE.put(key, encoded)
+        return encoded
+
+    @staticmethod
+    @contextmanager
+    def upload_sizing(sizer):
+        """Downscale uploads made inside the block to ``sizer(width, height)``.
+
+        ``sizer`` maps an image size to the size the server will generate
+        at (see ``GenerationPlan.upload_size``); images are only ever made
+        smaller. Uploads outside the block, such as for upscaling, keep
+        their full resolution.
+        """
+        global _UPLOAD_SIZER
+        previous, _UPLOAD_SIZER = _UPLOAD_SIZER, sizer
+        try:
+            yield
+        finally:
+            _UPLOAD_SIZER = previous
+
+    @staticmethod
+    def upload_size(width: int, height: int) -> tuple[int, int]:
+        """Return the size an upload of ``width`` x ``height`` is sent at."""
+        if _UPLOAD_SIZER is None or width <= 0 or height <= 0:
+            return width, height
+        target_width, target_height = _UPLOAD_SIZER(width, height)
+        if target_width * target_height < width * height:
+            return target_width, target_height
+        return width, height
+
     def find_below(self, below_layer=None):
         target_node = below_layer or self.doc.activeNode()
         target_index = target_node.index()
@@ -180,16 +466,57 @@ class KritaAdapter:
         layer_name: str = "",
         below_active: bool = False,
         below_layer=None,
+        resample: str = "transform_mask",
     ) -> None:
+        """Insert every result image as a layer, then refresh the projection once.
+
+        All layers (and the Results group for batches) are created and, where
+        needed, given their transform before a single ``refreshProjection``.
+        Krita's scripting API only refreshes whole documents, so the refresh
+        is not limited to the result rectangle.
+
+        Results that do not match ``w`` x ``h`` get a transform mask. With
+        ``resample`` set to a filter name they are resampled while decoding
+        instead, normally on the worker by :meth:`decode_results`; results
+        still encoded at this point are decoded and resampled here.
+        """
         document = self._ensure_document()
 
         if w < 0 or h < 0:
             w, h = self._resolve_result_dimensions(results)
+        if resample in _PIXEL_RESAMPLING:
+            results = self.decode_results(results, w, h, resample)
 
         parent = document.rootNode()
         if below_active or below_layer is not None:
             parent = self.find_parent_node(below_layer)
 
+        with telemetry.timed("results.insert_ms"):
+            self._insert_results(
+                results,
+                parent,
+                x,
+                y,
+                w,
+                h,
+                layer_name,
+                below_active,
+                below_layer,
+            )
+            document.refreshProjection()
+
+    def _insert_results(
+        self,
+        results,
+        parent,
+        x: int,
+        y: int,
+        w: int,
+        h: int,
+        layer_name: str,
+        below_active: bool,
+        below_layer,
+    ) -> None:
         if isinstance(results, dict) and "images" in results:
             self._add_images_results(
                 results,
@@ -216,8 +543,6 @@ class KritaAdapter:
                 below_layer,
             )
 
-        document.refreshProjection()
-
     def result_to_transparency_mask(
         self,
         results,
@@ -244,6 +569,7 @@ class KritaAdapter:
 
         if parent_node.type() == "grouplayer" and not was_group:
             previous_active.addChildNode(document.activeNode(), None)
+        self._tree_changed(document)
 
     def get_active_layer_uuid(self):
         document = self._ensure_document()
@@ -261,13 +587,24 @@ class KritaAdapter:
         return self._find_node_by_uuid(document.rootNode(), uuid)
 
     def _find_node_by_uuid(self, start_node, uuid):
-        if start_node.uniqueId() == uuid:
-            return start_node
-        for child in start_node.childNodes():
-            result = self._find_node_by_uuid(child, uuid)
-            if result is not None:
-                return result
-        return None
+        return self._node_index(start_node).find_by_uuid(start_node, uuid)
+
+    @staticmethod
+    def _node_index(root) -> NodeIndex:
+        key = str(root.uniqueId())
+        index = _NODE_INDEXES.get(key)
+        if index is None:
+            _watch_document_close()
+            _forget_closed_documents()
+            index = _NODE_INDEXES[key] = NodeIndex()
+        return index
+
+    @staticmethod
+    def _tree_changed(document) -> None:
+        """Mark the node index of ``document`` stale after adding or removing nodes."""
+        index = _NODE_INDEXES.get(str(document.rootNode().uniqueId()))
+        if index is not None:
+            index.invalidate()
 
     def set_layer_uuid_as_active(self, uuid) -> None:
         node = self.get_layer_from_uuid(uuid)
@@ -276,17 +613,212 @@ class KritaAdapter:
         except Exception:
             return
 
-    def get_selected_layer_img(self) -> QImage:
-        x, y, width, height = self.get_layer_bounds()
-        return self._ensure_document().projection(x, y, width, height)
+    def get_selected_layer_img(self, fresh: bool = False) -> QImage:
+        return self.capture_projection(*self.get_layer_bounds(), fresh=fresh)
 
-    def get_canvas_img(self) -> QImage:
-        x, y, width, height = self.get_canvas_bounds()
-        return self._ensure_document().projection(x, y, width, height)
+    def get_canvas_img(self, fresh: bool = False) -> QImage:
+        return self.capture_projection(*self.get_canvas_bounds(), fresh=fresh)
 
-    def get_selection_img(self) -> QImage:
-        x, y, width, height = self.get_selection_bounds()
-        return self._ensure_document().projection(x, y, width, height)
+    def get_selection_img(self, fresh: bool = False) -> QImage:
+        return self.capture_projection(*self.get_selection_bounds(), fresh=fresh)
+
+    def capture_projection(
+        self, x: int, y: int, width: int, height: int, fresh: bool = False,
+    ) -> QImage:
+        """Return the document projection of a region, reusing an unchanged capture.
+
+        The previous capture of the same region is returned while the
+        document revision (structure, active node, modified flag and a
+        bounded pixel sample) is unchanged. ``fresh`` always reads the canvas
+        and skips the revision.
+        """
+        document = self._ensure_document()
+        return self._captured(
+            document,
+            ("projection", x, y, width, height),
+            (x, y, width, height),
+            lambda: document.projection(x, y, width, height),
+            fresh,
+        )
+
+    def stream_projection(
+        self,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+        compression: int = 3,
+        target_size: tuple[int, int] | None = None,
+    ) -> StreamedImage | None:
+        """Encode a region of the projection to PNG without a full-size copy.
+
+        The region is read in horizontal strips with ``Document.pixelData``
+        and each strip goes straight into an incremental PNG encoder writing
+        to a spooled temporary file, so memory holds a strip, not the image.
+        With ``target_size`` the strips go through a :class:`StripResampler`,
+        which keeps the filter's context rows across strip boundaries so the
+        scaled image has no seams; without NumPy a Qt-based resampler does
+        the same with strips of the same size. Returns ``None`` for
+        documents that are not 8-bit RGBA.
+        """
+        document = self._ensure_document()
+        if width <= 0 or height <= 0:
+            return None
+        if document.colorModel() != "RGBA" or document.colorDepth() != "U8":
+            return None
+
+        out_width, out_height = target_size or (width, height)
+        resampler = None
+        strip_rows = max(1, _STREAM_STRIP_BYTES // (width * RGBA_BYTES_PER_PIXEL))
+        if (out_width, out_height) != (width, height):
+            try:
+                resampler = StripResampler(width, height, out_width, out_height)
+            except RuntimeError:
+                resampler = _QtStripResampler(width, height, out_width, out_height)
+
+        sink = tempfile.SpooledTemporaryFile(max_size=_STREAM_SPOOL_BYTES)
+        writer = PngStreamWriter(sink, out_width, out_height, compression)
+        with telemetry.timed("capture.stream_ms"):
+            for top in range(y, y + height, strip_rows):
+                rows = min(strip_rows, y + height - top)
+                strip = document.pixelData(x, top, width, rows).data()
+                if resampler is not None:
+                    strip = resampler.feed(ImageBuffer(strip, width, rows, order="BGRA")).tobytes()
+                writer.write_rows(bgra_to_rgba(strip))
+            writer.close()
+        telemetry.record("capture.stream_bytes", writer.bytes_written)
+        return StreamedImage(sink, writer.bytes_written, out_width, out_height)
+
+    def _captured(self, document, region, bounds, capture, fresh: bool = False):
+        if fresh:
+            # A fresh read is never reused, so no revision is worth computing.
+            with telemetry.timed("capture.projection_ms"):
+                return capture()
+
+        region = (str(document.rootNode().uniqueId()),) + region
+        revision = self._document_revision(document, *bounds)
+        cached = _CAPTURES.get(region, revision)
+        if cached is not None:
+            telemetry.increment("capture.reused")
+            return cached
+
+        with telemetry.timed("capture.projection_ms"):
+            value = capture()
+        _CAPTURES.put(region, revision, value)
+        return value
+
+    def remember_projection(self, x: int, y: int, width: int, height: int) -> None:
+        """Store the region's current projection as the baseline for :meth:`dirty_update`."""
+        document = self._ensure_document()
+        if hasattr(document, "waitForDone"):
+            # Results were just inserted; let Krita finish recompositing.
+            document.waitForDone()
+        image = self.capture_projection(x, y, width, height, fresh=True)
+        key = (str(document.rootNode().uniqueId()), x, y, width, height)
+        _BASELINES[key] = qimage_to_buffer(image)
+        _BASELINES.move_to_end(key)
+        while len(_BASELINES) > _MAX_BASELINES:
+            _BASELINES.popitem(last=False)
+
+    def dirty_update(
+        self, x: int, y: int, width: int, height: int, padding: int, feather: int,
+    ) -> tuple[DirtyUpdate, QImage, QImage] | None:
+        """Compare the region with its baseline and plan a partial re-render.
+
+        Returns the update, the current pixels of its crop and a feathered
+        Grayscale8 mask of the changed cells, or ``None`` when there is no
+        baseline, nothing changed, or the change is too large to be worth it.
+        """
+        document = self._ensure_document()
+        baseline = _BASELINES.get((str(document.rootNode().uniqueId()), x, y, width, height))
+        if baseline is None:
+            return None
+
+        current = self.capture_projection(x, y, width, height)
+        with telemetry.timed("incremental.diff_ms"):
+            tiles = changed_tiles(baseline, qimage_to_buffer(current))
+        update = plan_dirty_update(tiles, width, height, max(padding, feather))
+        if update is None:
+            telemetry.increment("incremental.full")
+            return None
+
+        rect = update.rect
+        telemetry.increment("incremental.partial")
+        telemetry.record("incremental.area_ratio", rect.width * rect.height / (width * height))
+        mask = QImage(
+            bytes(dirty_mask(update, feather)),
+            rect.width,
+            rect.height,
+            rect.width,
+            QImage.Format.Format_Grayscale8,
+        ).copy()
+        return update, current.copy(rect.x, rect.y, rect.width, rect.height), mask
+
+    def live_revision(self, x: int, y: int, width: int, height: int) -> DocumentRevision:
+        """Revision of a region as painted, ignoring this adapter's preview layer.
+
+        Live results are written to the preview layer, which is part of the
+        projection, so the checksum samples the active node's own pixels and
+        the preview layer is left out of the structure. Edits on layers other
+        than the active one are seen as soon as the user switches to them.
+        """
+        document = self._ensure_document()
+        excluded = str(self.preview_layer_uid) if self.preview_layer_uid is not None else None
+        active_node = document.activeNode()
+        if active_node is None or str(active_node.uniqueId()) == excluded:
+            # Nothing the user paints on; only the layer structure counts.
+            return self._document_revision(document, x, y, 0, 0, excluded=excluded)
+        return self._document_revision(
+            document, x, y, width, height,
+            read=active_node.projectionPixelData, excluded=excluded,
+        )
+
+    def capture_live_source(self, x: int, y: int, width: int, height: int) -> QImage:
+        """Capture a region as it looks without this adapter's preview layer."""
+        document = self._ensure_document()
+        preview = (
+            self._get_layer_with_uid(self.preview_layer_uid)
+            if self.preview_layer_uid is not None
+            else None
+        )
+        if preview is None:
+            return self.capture_projection(x, y, width, height)
+        with telemetry.timed("live.capture_ms"):
+            image = self.composite_without(document, preview, x, y, width, height)
+            if image is None:
+                image = self._projection_with_hidden(document, preview, x, y, width, height)
+        return image
+
+    @staticmethod
+    def _document_revision(
+        document, x: int, y: int, width: int, height: int, read=None, excluded=None,
+    ) -> DocumentRevision:
+        with telemetry.timed("capture.revision_ms"):
+            structure = tuple(
+                (str(node.uniqueId()), node.visible(), node.opacity())
+                for node in walk_nodes(document.rootNode())
+                if excluded is None or str(node.uniqueId()) != excluded
+            )
+            active_node = document.activeNode()
+            digest = hashlib.blake2b(digest_size=16)
+            read = read or document.pixelData
+            step = sample_step(width, height, _REVISION_SAMPLE_BYTES)
+            if step == 1:
+                if width > 0 and height > 0:
+                    digest.update(read(x, y, width, height).data())
+            else:
+                for row in sample_offsets(y, height, step):
+                    digest.update(read(x, row, width, 1).data())
+                for column in sample_offsets(x, width, step):
+                    digest.update(read(column, y, 1, height).data())
+            return DocumentRevision(
+                # Writing the preview layer marks the document modified, so
+                # the flag is not part of a revision that excludes it.
+                modified=document.modified() if excluded is None else False,
+                active_node=str(active_node.uniqueId()) if active_node else "",
+                structure=structure,
+                checksum=digest.digest(),
+            )
 
     def get_transparent_selection(self) -> QImage:
         x, y, width, height = self.get_selection_bounds()
@@ -304,15 +836,15 @@ class KritaAdapter:
         return self.projection_to_qimage(pixels, width, height)
 
     @staticmethod
-    def alpha_to_mask(image: QImage, width: int, height: int) -> QImage:
-        for pixel_x in range(width):
-            for pixel_y in range(height):
-                pixel = image.pixel(pixel_x, pixel_y)
-                alpha = qAlpha(pixel)
-                image.setPixel(pixel_x, pixel_y, qRgb(alpha, alpha, alpha))
-        return image
-
-    def get_mask_and_image(self, mode: str = "canvas"):
+    def alpha_to_mask(pixel_data: QByteArray, width: int, height: int) -> QImage:
+        """Build a Grayscale8 mask from the alpha channel of Krita pixel data."""
+        with telemetry.timed("mask.alpha_to_mask_ms"):
+            alpha = pixel_data_to_buffer(pixel_data, width, height).alpha()
+            return QImage(
+                alpha, width, height, width, QImage.Format.Format_Grayscale8,
+            ).copy()
+
+    def get_mask_and_image(self, mode: str = "canvas", fresh: bool = False):
         document = self._ensure_document()
         mask_layer = document.activeNode()
 
@@ -320,20 +852,83 @@ class KritaAdapter:
             mask_layer = mask_layer.parentNode()
             document.setActiveNode(mask_layer)
 
-        x, y, width, height = self._bounds_for_mode(mode)
+        x, y, width, height = self.bounds_for_mode(mode)
+        return self._captured(
+            document,
+            ("mask", str(mask_layer.uniqueId()), x, y, width, height),
+            (x, y, width, height),
+            lambda: self._capture_mask_and_image(document, mask_layer, x, y, width, height),
+            fresh,
+        )
 
+    def _capture_mask_and_image(self, document, mask_layer, x, y, width, height):
         mask_pixels = mask_layer.projectionPixelData(x, y, width, height)
-        mask_image = self.projection_to_qimage(mask_pixels, width, height)
-        mask_image_bw = self.alpha_to_mask(mask_image, width, height)
+        mask_image_bw = self.alpha_to_mask(mask_pixels, width, height)
 
-        mask_layer.setVisible(False)
-        document.refreshProjection()
-        source_image = document.projection(x, y, width, height)
-        mask_layer.setVisible(True)
-        document.refreshProjection()
+        with telemetry.timed("mask.source_composite_ms"):
+            source_image = self.composite_without(document, mask_layer, x, y, width, height)
+        if source_image is None:
+            telemetry.increment("mask.source_toggle_fallbacks")
+            with telemetry.timed("mask.source_toggle_ms"):
+                source_image = self._projection_with_hidden(
+                    document, mask_layer, x, y, width, height,
+                )
 
         return mask_image_bw, source_image
 
+    def composite_without(self, document, excluded, x, y, width, height) -> QImage | None:
+        """Composite the region as if ``excluded`` were hidden, without hiding it.
+
+        Layers are painted from their own projections for just this region,
+        so the document is never recomposited. Returns ``None`` when the
+        document cannot be reproduced this way (see ``plan_composite_without``)
+        or is not 8-bit RGBA.
+        """
+        if document.colorModel() != "RGBA" or document.colorDepth() != "U8":
+            return None
+        plan = plan_composite_without(document.rootNode(), excluded)
+        if plan is None:
+            return None
+
+        image = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
+        background = (
+            document.backgroundColor()
+            if hasattr(document, "backgroundColor")
+            else QColor(0, 0, 0, 0)
+        )
+        image.fill(background)
+        painter = QPainter(image)
+        self._paint_composite(painter, plan, x, y, width, height)
+        painter.end()
+        return image.convertToFormat(QImage.Format.Format_ARGB32)
+
+    def _paint_composite(self, painter, steps, x, y, width, height) -> None:
+        for step in steps:
+            if step.children is None:
+                layer = self.projection_to_qimage(
+                    step.node.projectionPixelData(x, y, width, height), width, height,
+                )
+            else:
+                layer = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
+                layer.fill(QColor(0, 0, 0, 0))
+                group_painter = QPainter(layer)
+                self._paint_composite(group_painter, step.children, x, y, width, height)
+                group_painter.end()
+            painter.setOpacity(step.opacity)
+            painter.setCompositionMode(
+                getattr(QPainter.CompositionMode, COMPOSITE_MODES[step.mode])
+            )
+            painter.drawImage(0, 0, layer)
+
+    @staticmethod
+    def _projection_with_hidden(document, layer, x, y, width, height) -> QImage:
+        layer.setVisible(False)
+        document.refreshProjection()
+        image = document.projection(x, y, width, height)
+        layer.setVisible(True)
+        document.refreshProjection()
+        return image
+
     @staticmethod
     def projection_to_qimage(pixel_data: QByteArray, width: int, height: int) -> QImage:
         bytes_per_pixel = 4
@@ -348,17 +943,22 @@ class KritaAdapter:
     def _get_layer_with_uid(self, uid, node=None):
         if node is None:
             node = self.doc.rootNode()
-        if node.uniqueId() == uid:
-            return node
-        for child in node.childNodes():
-            result = self._get_layer_with_uid(uid, child)
-            if result:
-                return result
-        return None
+        return self._find_node_by_uuid(node, uid)
 
     def transform_to_width_height(
-        self, layer, x: int, y: int, width: int, height: int
+        self,
+        layer,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
     ) -> None:
+        """Fit ``layer`` to ``width`` x ``height`` at ``x``, ``y``.
+
+        Adds a live transform mask on Krita 5.2+ and scales the layer on
+        older versions. Results resampled by :meth:`decode_results` already
+        have the right size and never get here.
+        """
         try:
             if self.version_gte("5.2"):
                 self.use_transform_mask(layer, x, y, width, height)
@@ -387,14 +987,11 @@ class KritaAdapter:
         scale_x = width / bounds.width()
         scale_y = height / bounds.height()
 
-        plugin_dir = os.path.dirname(os.path.realpath(__file__))
-        xml_path = os.path.join(plugin_dir, "..", "resources", "transform_params.xml")
-        xml_path = os.path.normpath(xml_path)
-
-        with open(xml_path, "r", encoding="utf-8") as handle:
-            xml_template = handle.read()
-
-        mask.fromXML(xml_template.format(x=x, y=y, scale_x=scale_x, scale_y=scale_y))
+        mask.fromXML(
+            _transform_params_template().format(
+                x=x, y=y, scale_x=scale_x, scale_y=scale_y,
+            )
+        )
 
     def delete_preview_layer(self) -> None:
         if self.preview_layer_uid is None:
@@ -404,15 +1001,30 @@ class KritaAdapter:
         if layer:
             layer.setLocked(False)
             layer.remove()
+            self._tree_changed(self._ensure_document())
 
         self.preview_layer_uid = None
 
     def update_preview_layer(
         self, base64str: str, x: int, y: int, w: int, h: int
     ) -> None:
+        self.apply_preview_image(self.decode_preview(base64str, w, h), x, y)
+
+    @classmethod
+    def decode_preview(cls, base64str: str, w: int, h: int) -> DecodedImage:
+        """Decode a progress preview at its target size; safe off the UI thread."""
+        with telemetry.timed("preview.decode_ms"):
+            return DecodedImage(*cls.base64_to_pixeldata(base64str, w, h))
+
+    def apply_preview_image(self, image: DecodedImage, x: int, y: int) -> None:
+        if image.width <= 0 or image.height <= 0:
+            return
+
         document = self._ensure_document()
-        byte_array, img_w, img_h = self.base64_to_pixeldata(base64str, w, h)
-        self._apply_preview_pixels(document, byte_array, img_w, img_h, x, y)
+        with telemetry.timed("preview.commit_ms"):
+            self._apply_preview_pixels(
+                document, image.pixels, image.width, image.height, x, y,
+            )
 
     def _apply_preview_pixels(
         self, document, byte_array, img_w: int, img_h: int, x: int, y: int
@@ -421,6 +1033,7 @@ class KritaAdapter:
             layer = document.createNode("Preview", "paintLayer")
             document.rootNode().addChildNode(layer, None)
             self.preview_layer_uid = layer.uniqueId()
+            self._tree_changed(document)
         else:
             layer = self._get_layer_with_uid(self.preview_layer_uid)
 
@@ -429,42 +1042,6 @@ class KritaAdapter:
         layer.setLocked(True)
         document.refreshProjection()
 
-    _PREVIEW_MAX_DIM = 512
-
-    def update_preview_from_progress(
-        self, base64str: str, x: int, y: int, target_w: int, target_h: int
-    ) -> None:
-        """Decode progress image, scale down for performance, then apply to preview layer.
-
-        The raw progress image can be large; scaling it before writing to Krita's
-        pixel buffer keeps the UI responsive during generation.
-        """
-        image_data = base64.b64decode(base64str)
-        image_format = "PNG" if base64str.startswith("iVBORw0KGgo") else "JPEG"
-        image = QImage.fromData(image_data, image_format)
-        if image.isNull():
-            return
-
-        if image.isGrayscale():
-            image = image.convertToFormat(QImage.Format_RGBA8888)
-
-        max_dim = max(image.width(), image.height())
-        if max_dim > self._PREVIEW_MAX_DIM:
-            scale = self._PREVIEW_MAX_DIM / max_dim
-            new_w = max(1, int(image.width() * scale))
-            new_h = max(1, int(image.height() * scale))
-            image = image.scaled(
-                new_w, new_h, Qt.KeepAspectRatio, Qt.SmoothTransformation
-            )
-
-        document = self._ensure_document()
-        image_bits = image.bits()
-        if image_bits is None:
-            return
-        image_bits.setsize(image.byteCount())
-        byte_array = QByteArray(image_bits.asstring())
-        self._apply_preview_pixels(document, byte_array, image.width(), image.height(), x, y)
-
     @staticmethod
     def get_foreground_color_hex() -> str:
         view = Krita.instance().activeWindow().activeView()
@@ -481,6 +1058,7 @@ class KritaAdapter:
         document = self._ensure_document()
         layer = document.createNode(name, "paintLayer")
         document.rootNode().addChildNode(layer, None)
+        self._tree_changed(document)
         document.setActiveNode(layer)
         document.refreshProjection()
 
@@ -518,10 +1096,81 @@ class KritaAdapter:
         w, h = bounds.width(), bounds.height()
         if w > 0 and h > 0:
             # Format_ARGB32 stores pixels as BGRA bytes; all-0xFF = opaque white
-            pixel_data = QByteArray(bytes([255, 255, 255, 255] * (w * h)))
-            node.setPixelData(pixel_data, x, y, w, h)
+            node.setPixelData(b"\xff" * (4 * w * h), x, y, w, h)
         document.refreshProjection()
 
+    def apply_mask_operation(self, operation, layer=None) -> None:
+        """Run ``operation(mask, width, height)`` on a mask layer's alpha.
+
+        The layer is read over the whole canvas so grown masks are not clipped
+        to the painted bounds, and written back as opaque white with the
+        resulting alpha. Only the read and the write run on the UI thread;
+        the operation itself runs on a worker thread.
+        """
+        document = self._ensure_document()
+        node = layer if layer is not None else document.activeNode()
+        x, y, w, h = self.get_canvas_bounds()
+        if w <= 0 or h <= 0:
+            return
+
+        alpha = bytearray(
+            pixel_data_to_buffer(node.projectionPixelData(x, y, w, h), w, h).alpha()
+        )
+        pixels = []
+
+        def run() -> None:
+            with telemetry.timed("mask.operation_ms"):
+                operation(alpha, w, h)
+                pixels.append(bytes(alpha_to_bgra(alpha)))
+
+        def write_back() -> None:
+            if not pixels:
+                return
+            node.setPixelData(pixels[0], x, y, w, h)
+            document.refreshProjection()
+
+        self.run_as_thread(run, write_back)
+
+    @staticmethod
+    def mask_image_bounds(image: QImage):
+        """Return the bounding box of the non-zero pixels of a mask image."""
+        if image.format() != QImage.Format.Format_Grayscale8:
+            image = image.convertToFormat(QImage.Format.Format_Grayscale8)
+        return mask_bounds(
+            _qimage_bytes(image), image.width(), image.height(), image.bytesPerLine(),
+        )
+
+    @staticmethod
+    def apply_mask_operation_to_image(image: QImage, operation) -> QImage:
+        """Run ``operation(mask, width, height)`` on a Grayscale8 mask image."""
+        width, height = image.width(), image.height()
+        if image.format() != QImage.Format.Format_Grayscale8:
+            image = image.convertToFormat(QImage.Format.Format_Grayscale8)
+
+        with telemetry.timed("mask.operation_ms"):
+            mask = bytearray(
+                channel_plane(_qimage_bytes(image), width, height, image.bytesPerLine(), 0, 1)
+            )
+            operation(mask, width, height)
+            return QImage(
+                bytes(mask), width, height, width, QImage.Format.Format_Grayscale8,
+            ).copy()
+
+    @classmethod
+    def feather_mask_upload(cls, mask_b64: str, radius: int, policy: UploadCodecPolicy) -> str:
+        """Feather an encoded mask upload by ``radius`` pixels and re-encode it.
+
+        Called on the generation worker so the blur does not hold up the UI
+        thread while the job is built. Undecodable masks are returned as is.
+        """
+        mask = QImage.fromData(base64.b64decode(mask_b64))
+        if mask.isNull():
+            return mask_b64
+        mask = cls.apply_mask_operation_to_image(
+            mask, lambda plane, width, height: mask_feather(plane, width, height, radius),
+        )
+        return cls.encode_upload(mask, IMAGE_ROLE_MASK, policy)
+
     def get_active_brush_size(self) -> int:
         """Try to read the current brush size; returns 0 if unavailable."""
         try:
@@ -534,32 +1183,13 @@ class KritaAdapter:
 
     def get_paintable_layer_names(self) -> list[str]:
         """Return names of all paintable (non-group) layers."""
-        document = self._ensure_document()
-        names: list[str] = []
-
-        def _collect(node):
-            if node.type() == "paintLayer":
-                names.append(node.name())
-            for child in node.childNodes():
-                _collect(child)
-
-        _collect(document.rootNode())
-        return names
+        root = self._ensure_document().rootNode()
+        return self._node_index(root).paintable_names(root)
 
     def get_layer_by_name(self, name: str):
         """Find a node by name in the document tree. Returns None if not found."""
-        document = self._ensure_document()
-
-        def _find(node):
-            if node.name() == name:
-                return node
-            for child in node.childNodes():
-                result = _find(child)
-                if result is not None:
-                    return result
-            return None
-
-        return _find(document.rootNode())
+        root = self._ensure_document().rootNode()
+        return self._node_index(root).find_by_name(root, name)
 
     def get_layer_projection_image(self, node) -> QImage:
         """Get the rendered projection image for a specific layer node."""
@@ -576,7 +1206,7 @@ class KritaAdapter:
             self.create_new_doc()
         return self.doc
 
-    def _bounds_for_mode(self, mode: str) -> tuple[int, int, int, int]:
+    def bounds_for_mode(self, mode: str) -> tuple[int, int, int, int]:
         mode = mode.lower()
         if mode == "selection":
             return self.get_selection_bounds()
@@ -633,6 +1263,8 @@ class KritaAdapter:
             group = document.createGroupLayer("Results")
             image_parent = group
 
+        inserted = 0
+
         for index, image_data in enumerate(images):
             if not image_data:
                 continue
@@ -643,7 +1275,7 @@ class KritaAdapter:
                 name = self._seed_layer_name(results, index)
 
             layer = document.createNode(name, "paintLayer")
-            byte_array, img_w, img_h = self.base64_to_pixeldata(image_data)
+            byte_array, img_w, img_h = self._result_pixeldata(image_data)
             layer.setPixelData(byte_array, x, y, img_w, img_h)
 
             destination = None
@@ -653,8 +1285,7 @@ class KritaAdapter:
             image_parent.addChildNode(layer, destination)
             if img_w != w or img_h != h:
                 self.transform_to_width_height(layer, x, y, w, h)
-
-            document.refreshProjection()
+            inserted += 1
 
         if group is not None:
             if below_active or below_layer is not None:
@@ -663,6 +1294,9 @@ class KritaAdapter:
             else:
                 document.rootNode().addChildNode(group, None)
 
+        self._tree_changed(document)
+        telemetry.increment("results.layers_inserted", inserted)
+
     def _add_single_image_result(
         self,
         results,
@@ -676,12 +1310,12 @@ class KritaAdapter:
         below_layer,
     ) -> None:
         image_data = results.get("image")
-        if not isinstance(image_data, str) or not image_data:
+        if not isinstance(image_data, (str, DecodedImage)) or not image_data:
             return
 
         document = self._ensure_document()
         layer = document.createNode(layer_name or "Image", "paintLayer")
-        byte_array, img_w, img_h = self.base64_to_pixeldata(image_data, w, h)
+        byte_array, img_w, img_h = self._result_pixeldata(image_data, w, h)
         layer.setPixelData(byte_array, x, y, img_w, img_h)
 
         destination = (
@@ -690,11 +1324,12 @@ class KritaAdapter:
             else None
         )
         parent.addChildNode(layer, destination)
+        self._tree_changed(document)
 
         if img_w != w or img_h != h:
             self.transform_to_width_height(layer, x, y, w, h)
 
-        document.refreshProjection()
+        telemetry.increment("results.layers_inserted")
 
     @staticmethod
     def _seed_layer_name(results, index: int) -> str:
@@ -706,4 +1341,206 @@ class KritaAdapter:
         return "Image"
 
 
+# Result resampling modes applied to the pixels while decoding.
+_PIXEL_RESAMPLING = frozenset(RESULT_RESAMPLING_MODES) - {"transform_mask"}
+
+
+@functools.lru_cache(maxsize=1)
+def _transform_params_template() -> str:
+    plugin_dir = os.path.dirname(os.path.realpath(__file__))
+    xml_path = os.path.join(plugin_dir, "..", "resources", "transform_params.xml")
+    with open(os.path.normpath(xml_path), "r", encoding="utf-8") as handle:
+        return handle.read()
+
+
+def _forget_closed_documents(*_) -> None:
+    """Drop the node indexes of documents that are no longer open."""
+    try:
+        open_roots = {
+            str(document.rootNode().uniqueId())
+            for document in Krita.instance().documents()
+        }
+    except Exception:
+        return
+    for key in list(_NODE_INDEXES):
+        if key not in open_roots:
+            del _NODE_INDEXES[key]
+
+
+def _watch_document_close() -> None:
+    global _watching_document_close
+    if _watching_document_close:
+        return
+    try:
+        notifier = Krita.instance().notifier()
+        notifier.setActive(True)
+        notifier.imageClosed.connect(_forget_closed_documents)
+    except Exception:
+        return
+    _watching_document_close = True
+
+
+def _image_fingerprint(image: QImage, pixels) -> tuple:
+    # A reused capture is the same QImage, so its cacheKey (which changes on
+    # every modification) saves hashing the pixels again.
+    cache_key = image.cacheKey()
+    fingerprint = _FINGERPRINTS.get(cache_key)
+    if fingerprint is None:
+        fingerprint = pixel_fingerprint(
+            pixels, image.width(), image.height(), image.bytesPerLine(), image.format(),
+        )
+        _FINGERPRINTS[cache_key] = fingerprint
+        while len(_FINGERPRINTS) > _MAX_FINGERPRINTS:
+            _FINGERPRINTS.popitem(last=False)
+    return fingerprint
+
+
+@functools.lru_cache(maxsize=None)
+def _writable_formats() -> frozenset[str]:
+    return frozenset(
+        name.data().decode("ascii", "replace").upper()
+        for name in QImageWriter.supportedImageFormats()
+    )
+
+
+def _decode_argb32(base64str: str) -> QImage | None:
+    image_format = "PNG" if base64str.startswith("iVBORw0KGgo") else "JPEG"
+    image = QImage.fromData(base64.b64decode(base64str), image_format)
+    if image.isNull():
+        return None
+    if image.format() not in (QImage.Format.Format_ARGB32, QImage.Format.Format_RGB32):
+        image = image.convertToFormat(QImage.Format.Format_ARGB32)
+    return image
+
+
+def _scaled_to(image: QImage, width: int, height: int) -> QImage:
+    if (image.width(), image.height()) == (width, height):
+        return image
+    scaled = image.scaled(
+        width,
+        height,
+        Qt.AspectRatioMode.IgnoreAspectRatio,
+        Qt.TransformationMode.SmoothTransformation,
+    )
+    # Smooth scaling works in 32-bit premultiplied; keep the caller's format.
+    if scaled.format() != image.format():
+        scaled = scaled.convertToFormat(image.format())
+    return scaled
+
+
+def _resample_strip(strip: bytes, width: int, rows: int, out_width: int, out_rows: int) -> bytes:
+    image = QImage(
+        strip, width, rows, width * RGBA_BYTES_PER_PIXEL, QImage.Format.Format_ARGB32,
+    )
+    return _qimage_bytes(_scaled_to(image, out_width, out_rows))
+
+
+def _painted_rows(strip: bytes, width: int, rows: int, top: float, span: float, out_rows: int) -> bytes:
+    """Bilinearly map source rows ``top`` to ``top + span`` onto ``out_rows`` rows."""
+    source = QImage(
+        strip, width, rows, width * RGBA_BYTES_PER_PIXEL, QImage.Format.Format_ARGB32,
+    )
+    target = QImage(width, out_rows, QImage.Format.Format_ARGB32)
+    target.fill(0)
+    painter = QPainter(target)
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+    painter.drawImage(QRectF(0, 0, width, out_rows), source, QRectF(0, top, width, span))
+    painter.end()
+    return _qimage_bytes(target)
+
+
+class _QtStripResampler:
+    """Scale BGRA strips, fed top to bottom, with Qt and without seams.
+
+    The NumPy-free counterpart of :class:`StripResampler` for ARGB32
+    (BGRA in memory) pixels, with the same ``feed``. Each strip is
+    scaled across with Qt's smooth scaling, which keeps rows independent.
+    Downscales then average whole groups of ``step`` rows, so no group
+    straddles a strip boundary; the vertical factor left over (below 2,
+    or an upscale) is a bilinear QPainter pass that keeps the last rows of
+    the previous strip as context.
+    """
+
+    def __init__(self, width: int, height: int, out_width: int, out_height: int) -> None:
+        self.width, self.height = width, height
+        self.out_width, self.out_height = out_width, out_height
+        self._row_bytes = out_width * RGBA_BYTES_PER_PIXEL
+        self._step = max(1, height // out_height)
+        self._reduced_height = -(-height // self._step)
+        self._scale = self._reduced_height / out_height
+        self._fed = 0
+        self._pending = b""  # rows scaled across, short of a whole group
+        self._context = b""  # grouped rows the bilinear pass still reaches
+        self._context_top = 0
+        self._emitted = 0
+
+    def feed(self, strip: ImageBuffer) -> ImageBuffer:
+        """Take the next source rows; return the output rows now complete."""
+        rows = strip.height
+        self._fed += rows
+        last = self._fed >= self.height
+        self._pending += _resample_strip(strip.tobytes(), self.width, rows, self.out_width, rows)
+        pending_rows = len(self._pending) // self._row_bytes
+        groups, partial = divmod(pending_rows, self._step)
+        taken = groups * self._step
+        reduced = b""
+        if groups:
+            reduced = _resample_strip(
+                self._pending[:taken * self._row_bytes], self.out_width, taken, self.out_width, groups,
+            )
+        if last and partial:
+            reduced += _resample_strip(
+                self._pending[taken * self._row_bytes:], self.out_width, partial, self.out_width, 1,
+            )
+            taken = pending_rows
+        self._pending = self._pending[taken * self._row_bytes:]
+        self._context += reduced
+        out = self._emit(last)
+        return ImageBuffer(out, self.out_width, len(out) // self._row_bytes, order=strip.order)
+
+    def _emit(self, last: bool) -> bytes:
+        top = self._context_top
+        available = top + len(self._context) // self._row_bytes
+        if self._reduced_height == self.out_height:
+            out, self._context, self._context_top = self._context, b"", available
+            return out
+
+        if last:
+            end = self.out_height
+        else:
+            # Output row j samples around grouped row (j + 0.5) * scale - 0.5;
+            # emit only rows whose bilinear pair and one more row are in hand.
+            end = math.ceil((available - 1.5) / self._scale - 0.5)
+            end = min(self.out_height, max(self._emitted, end))
+        count = end - self._emitted
+        if not count:
+            return b""
+
+        out = _painted_rows(
+            self._context,
+            self.out_width,
+            available - top,
+            self._emitted * self._scale - top,
+            count * self._scale,
+            count,
+        )
+        self._emitted = end
+        keep = min(available, max(top, int(end * self._scale) - 2))
+        self._context = self._context[(keep - top) * self._row_bytes:]
+        self._context_top = keep
+        return out
+
+
+def _mask_plane(mask: QImage, invert: bool) -> bytes:
+    plane = bytearray(
+        channel_plane(_qimage_bytes(mask), mask.width(), mask.height(), mask.bytesPerLine(), 0, 1)
+    )
+    return bytes(mask_invert(plane) if invert else plane)
+
+
+def _qimage_bytes(image: QImage) -> bytes:
+    return qimage_bits(image).asstring()
+
+
 __all__ = ["KritaAdapter"]
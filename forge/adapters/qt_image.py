@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import base64
+
+from ..domain.image_buffer import ImageBuffer
+from ..qt_compat import QByteArray, QImage
+
+# QImage formats whose memory layout matches an ImageBuffer channel order.
+# ARGB32 is stored as BGRA on the little-endian machines Krita runs on.
+_FORMAT_ORDERS = {
+    QImage.Format.Format_RGBA8888: "RGBA",
+    QImage.Format.Format_ARGB32: "BGRA",
+}
+
+
+def qimage_bits(image: QImage):
+    """Return a read-only buffer over the image's pixels, without copying."""
+    bits = image.constBits()
+    if hasattr(image, "sizeInBytes"):
+        bits.setsize(image.sizeInBytes())
+    else:
+        bits.setsize(image.byteCount())
+    return bits
+
+
+def qimage_to_buffer(image: QImage) -> ImageBuffer:
+    """Wrap a QImage's pixels in an :class:`ImageBuffer` without copying.
+
+    RGBA8888 and ARGB32 images are viewed in place; other formats are
+    converted to RGBA8888 first. The buffer keeps the image alive.
+    """
+    order = _FORMAT_ORDERS.get(image.format())
+    if order is None:
+        image = image.convertToFormat(QImage.Format.Format_RGBA8888)
+        order = "RGBA"
+    return ImageBuffer(
+        memoryview(qimage_bits(image)),
+        image.width(),
+        image.height(),
+        image.bytesPerLine(),
+        order,
+        owner=image,
+    )
+
+
+def buffer_to_qimage(buffer: ImageBuffer) -> QImage:
+    """Return a QImage over ``buffer``'s pixels, without copying.
+
+    The image borrows the buffer's memory; call ``.copy()`` on it if it has
+    to outlive ``buffer``.
+    """
+    fmt = (
+        QImage.Format.Format_RGBA8888
+        if buffer.order == "RGBA"
+        else QImage.Format.Format_ARGB32
+    )
+    return QImage(buffer.pixels, buffer.width, buffer.height, buffer.stride, fmt)
+
+
+def pixel_data_to_buffer(pixel_data: QByteArray | bytes, width: int, height: int) -> ImageBuffer:
+    """Wrap Krita ``pixelData``/``projectionPixelData`` (BGRA8) in a buffer."""
+    if isinstance(pixel_data, QByteArray):
+        pixel_data = pixel_data.data()
+    return ImageBuffer(pixel_data, width, height, order="BGRA")
+
+
+def decode_buffer(image_b64: str) -> ImageBuffer | None:
+    """Decode a base64 PNG/JPEG into an :class:`ImageBuffer`, or ``None``."""
+    image = QImage.fromData(base64.b64decode(image_b64))
+    if image.isNull():
+        return None
+    return qimage_to_buffer(image)
+
+
+__all__ = [
+    "buffer_to_qimage",
+    "decode_buffer",
+    "pixel_data_to_buffer",
+    "qimage_bits",
+    "qimage_to_buffer",
+]
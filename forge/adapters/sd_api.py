@@ -7,11 +7,36 @@ import os
 import time
 import urllib.error
 import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from enum import Enum
-from typing import Any, Callable, Union
-
+from typing import Any, Callable, Iterable, Iterator, Union
+
+from ..domain.generation_plan import (
+    SeamRefinement,
+    TileLayout,
+    TileRect,
+    build_seam_strips,
+    build_tile_layout,
+    prune_generation_results,
+)
+from ..domain.image_buffer import blend_tiles
+from ..domain.image_codec import png_quality_for_compression
+from ..domain.model_registry import detect_model_family, get_model_config
 from ..domain.payload_builder import build_api_payload
-from ..qt_compat import QColor, QPainter, QByteArray, QBuffer, QImage, QIODevice
+from ..domain.payload_tiler import map_payload_images, scale_rect
+from ..domain.pixel_buffer import band_mask, tile_view
+from ..domain.streamed_payload import (
+    StreamedImage,
+    StreamedJsonBody,
+    contains_streams,
+    json_default,
+)
+from ..domain.telemetry import telemetry
+from ..domain.tile_filter import TileSkipThresholds, measure_tile, tile_skip_reason
+from ..qt_compat import QPainter, QByteArray, QBuffer, QImage, QIODevice
+from .qt_image import buffer_to_qimage, decode_buffer, qimage_bits, qimage_to_buffer
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +74,11 @@ class SDAPI:
         self.gen_connect_timeout = 5.05
         self.gen_read_timeout = 600.0
 
+        # Tiled generation: PNG level for tile uploads, and the threads that
+        # encode tiles and send seam strip requests
+        self.tile_png_compression = 1
+        self.tile_encode_workers = _default_encode_workers()
+
         self.host = _normalize_host(host)
         self.state = ConnectionState.DISCONNECTED
         self.connected = False  # backward compatibility
@@ -183,6 +213,16 @@ class SDAPI:
             try:
                 if method == "GET":
                     request = urllib.request.Request(url)
+                elif contains_streams(data):
+                    body = StreamedJsonBody(data)
+                    request = urllib.request.Request(
+                        url,
+                        data=body,
+                        headers={
+                            "Content-Type": "application/json",
+                            "Content-Length": str(body.length),
+                        },
+                    )
                 else:
                     payload = json.dumps(data or {}).encode("utf-8")
                     request = urllib.request.Request(
@@ -551,7 +591,11 @@ class SDAPI:
         plugin_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
         log_path = os.path.join(plugin_dir, filename)
         with open(log_path, "w", encoding="utf-8") as output_file:
-            json.dump({"request": data, "response": response}, output_file)
+            json.dump(
+                {"request": data, "response": response},
+                output_file,
+                default=json_default,
+            )
 
     def write_img_to_file(self, base64_str: str, filename: str = "saved.png") -> None:
         with open(filename, "wb") as output_file:
@@ -569,14 +613,38 @@ class SDAPI:
     def tiled_generate(
         self,
         data: dict[str, Any],
-        tile_size: int = 1024,
+        tile_size: int | None = None,
         overlap: int = 64,
+        skip_thresholds: TileSkipThresholds | None = None,
+        seam_refinement: SeamRefinement | None = None,
     ) -> dict[str, Any] | None:
-        """Generate a large image by splitting into tiles, generating each, and blending."""
+        """Generate a large image by splitting into tiles, generating each, and blending.
+
+        No page of the plugin calls this yet; it is a library entry point
+        for scripts driving :class:`SDAPI` directly.
+
+        The tile grid comes from :func:`build_tile_layout`. ``tile_size`` caps
+        the tile side; when omitted the model family's ``default_max_size`` is
+        used. ``overlap`` is the minimum overlap between neighbouring tiles.
+
+        When ``skip_thresholds`` is given, tiles outside ``mask_img`` are
+        copied through from the source instead of being generated, and so
+        are transparent or flat tiles when there is no mask. The number of skipped tiles is reported in the result
+        ``info`` as ``tiles_skipped``.
+
+        ``mask_img`` and ControlNet unit images are cropped to each tile's
+        rect (see :func:`map_payload_images`), so a tile request only carries
+        the part of every image that the tile covers.
+
+        With ``seam_refinement`` set, :meth:`refine_seams` runs a low-denoise
+        inpaint over narrow strips along the internal seams afterwards.
+        """
         src_b64: str | None = (
             data.get("img2img_img")
             or data.get("inpaint_img")
         )
+        if isinstance(src_b64, StreamedImage):
+            src_b64 = src_b64.read_base64()
 
         if src_b64 is None:
             logger.warning(
@@ -586,85 +654,354 @@ class SDAPI:
             return self.txt2img(data)
 
         src_bytes = base64.b64decode(src_b64)
-        fmt = "PNG" if src_b64[:8] == "iVBORw0KGgo" else "JPEG"
+        fmt = "PNG" if src_b64.startswith("iVBORw0KGgo") else "JPEG"
         src_image = QImage.fromData(src_bytes, fmt)
         if src_image.isNull():
             logger.error("tiled_generate: failed to decode source image")
             return None
 
+        if src_image.format() != QImage.Format.Format_RGBA8888:
+            src_image = src_image.convertToFormat(QImage.Format.Format_RGBA8888)
+
         full_width = src_image.width()
         full_height = src_image.height()
 
-        if full_width <= tile_size and full_height <= tile_size:
+        layout = self.plan_tiles(data, full_width, full_height, tile_size, overlap)
+        if layout.tile_count == 1:
             return self.img2img(data)
 
-        tiles = self.split_into_tiles(src_b64, tile_size, overlap)
-        if not tiles:
-            logger.error("tiled_generate: tile splitting returned no tiles")
-            return None
+        pixels = _qimage_bytes(src_image)
+        stride = src_image.bytesPerLine()
+        tile_count = layout.tile_count
 
         logger.info(
-            "tiled_generate: split %dx%d image into %d tiles (tile=%d, overlap=%d)",
-            full_width, full_height, len(tiles), tile_size, overlap,
+            "tiled_generate: split %dx%d image into %d tiles "
+            "(%dx%d grid, tile=%dx%d, overlap=%dx%d)",
+            full_width, full_height, tile_count, layout.columns, layout.rows,
+            layout.tile_width, layout.tile_height, layout.overlap_x, layout.overlap_y,
         )
 
-        generated_tiles: list[dict[str, Any]] = []
-
-        for idx, tile in enumerate(tiles):
-            tile_data = dict(data)
-            tile_data["img2img_img"] = tile["tile_b64"]
-            tile_data["width"] = tile["w"]
-            tile_data["height"] = tile["h"]
-            tile_data["resize_mode"] = 1
-
-            logger.debug(
-                "tiled_generate: generating tile %d/%d at (%d,%d) %dx%d",
-                idx + 1, len(tiles), tile["x"], tile["y"], tile["w"], tile["h"],
+        if skip_thresholds is None:
+            skip_reasons: list[str | None] = [None] * tile_count
+        else:
+            skip_reasons = self._tile_skip_reasons(
+                data, pixels, stride, layout, skip_thresholds,
+            )
+        skipped = sum(reason is not None for reason in skip_reasons)
+        telemetry.increment("tiles.generated", tile_count - skipped)
+        telemetry.increment("tiles.skipped", skipped)
+        if skipped:
+            logger.info(
+                "tiled_generate: skipping %d/%d tiles (saved %d GPU passes)",
+                skipped, tile_count, skipped,
             )
+        if skipped == tile_count:
+            return {
+                "images": [src_b64],
+                "info": {"tiles_total": tile_count, "tiles_skipped": skipped},
+            }
 
-            result = self.img2img(tile_data)
-            if result is None:
-                logger.error("tiled_generate: tile %d generation failed", idx)
-                return None
+        generated_tiles: list[dict[str, Any]] = []
+        info: Any = {}
+        cropper = _PayloadImageCropper(
+            full_width,
+            full_height,
+            png_quality_for_compression(self.tile_png_compression),
+        )
 
-            images = result.get("images", [])
-            if not images:
-                logger.error("tiled_generate: tile %d returned no images", idx)
-                return None
+        tile_stream = self.iter_tiles(
+            pixels,
+            stride,
+            layout.tiles,
+            png_compression=self.tile_png_compression,
+            workers=self.tile_encode_workers,
+        )
+        with closing(tile_stream) as tiles:
+            for idx, tile in enumerate(tiles):
+                if skip_reasons[idx] is not None:
+                    logger.debug(
+                        "tiled_generate: tile %d/%d at (%d,%d) is %s; copying source",
+                        idx + 1, tile_count, tile["x"], tile["y"], skip_reasons[idx],
+                    )
+                    generated_tiles.append(tile)
+                    continue
 
-            generated_tiles.append({
-                "x": tile["x"],
-                "y": tile["y"],
-                "w": tile["w"],
-                "h": tile["h"],
-                "tile_b64": images[0],
-            })
+                tile_data = cropper.tile_data(
+                    data, TileRect(tile["x"], tile["y"], tile["w"], tile["h"]),
+                )
+                tile_data["img2img_img"] = tile["tile_b64"]
+                tile_data["width"] = tile["w"]
+                tile_data["height"] = tile["h"]
+                tile_data["resize_mode"] = 1
+
+                logger.debug(
+                    "tiled_generate: generating tile %d/%d at (%d,%d) %dx%d",
+                    idx + 1, tile_count, tile["x"], tile["y"], tile["w"], tile["h"],
+                )
+
+                result = self.img2img(tile_data)
+                if result is None:
+                    logger.error("tiled_generate: tile %d generation failed", idx)
+                    return None
+
+                images = result.get("images", [])
+                if not images:
+                    logger.error("tiled_generate: tile %d returned no images", idx)
+                    return None
+                info = result.get("info", {})
+
+                generated_tiles.append({
+                    "x": tile["x"],
+                    "y": tile["y"],
+                    "w": tile["w"],
+                    "h": tile["h"],
+                    "tile_b64": images[0],
+                })
 
         reconstructed_b64 = self.reconstruct_from_tiles(
-            generated_tiles, full_width, full_height, overlap,
+            generated_tiles, full_width, full_height, layout.overlap,
         )
 
         if not reconstructed_b64:
             logger.error("tiled_generate: reconstruction failed")
             return None
 
-        return {
-            "images": [reconstructed_b64],
-            "info": result.get("info", {}) if result else {},
+        if not isinstance(info, dict):
+            info = {}
+        info = {**info, "tiles_total": tile_count, "tiles_skipped": skipped}
+
+        if seam_refinement is not None:
+            refined = self.refine_seams(data, reconstructed_b64, layout, seam_refinement)
+            if refined is None:
+                logger.warning("tiled_generate: seam refinement failed; keeping blend")
+            else:
+                reconstructed_b64, info["seam_strips"] = refined
+
+        return {"images": [reconstructed_b64], "info": info}
+
+    def refine_seams(
+        self,
+        data: dict[str, Any],
+        image_b64: str,
+        layout: TileLayout,
+        refinement: SeamRefinement,
+    ) -> tuple[str, int] | None:
+        """Re-render narrow strips over the internal seams of a tiled image.
+
+        Vertical seams are refined first and horizontal seams second, so the
+        crossings see the already refined vertical strips. Strips of one
+        orientation share their size and padded, feathered band mask, and
+        are sent as batched img2img inpaint requests of up to
+        ``refinement.batch_size`` init images, encoded through
+        :meth:`iter_tiles`. Up to :attr:`tile_encode_workers` batches are in
+        flight at once; results are painted back in strip order, so where
+        strips overlap the later one still wins.
+
+        ControlNet units are left out of the strip requests: one batch shares
+        its unit images across strips at different positions, so no crop of
+        them would line up, and full-size images would be uploaded once per
+        batch.
+
+        Returns the refined base64 PNG and the number of strips processed.
+        """
+        image = QImage.fromData(base64.b64decode(image_b64))
+        if image.isNull():
+            return None
+        if image.format() != QImage.Format.Format_RGBA8888:
+            image = image.convertToFormat(QImage.Format.Format_RGBA8888)
+
+        strip_count = 0
+        for vertical in (True, False):
+            strips = build_seam_strips(
+                layout,
+                vertical=vertical,
+                band=refinement.band,
+                context=refinement.context,
+            )
+            if not strips:
+                continue
+
+            pixels = _qimage_bytes(image)
+            stride = image.bytesPerLine()
+            strip_w, strip_h = strips[0].rect.width, strips[0].rect.height
+            mask = band_mask(
+                strip_w,
+                strip_h,
+                strips[0].band,
+                padding=refinement.mask_padding,
+                feather=refinement.mask_feather,
+            )
+            mask_b64 = _qimage_to_b64(
+                QImage(mask, strip_w, strip_h, strip_w, QImage.Format.Format_Grayscale8),
+                quality=png_quality_for_compression(self.tile_png_compression),
+            )
+
+            max_workers = max(self.tile_encode_workers or _default_encode_workers(), 1)
+            tile_stream = self.iter_tiles(
+                pixels,
+                stride,
+                [strip.rect for strip in strips],
+                png_compression=self.tile_png_compression,
+                workers=max_workers,
+            )
+            pending: deque = deque()
+            with closing(tile_stream) as tiles, ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="forge-seam-refine",
+            ) as pool:
+                try:
+                    for batch in _batched(tiles, max(refinement.batch_size, 1)):
+                        pending.append((batch, pool.submit(
+                            self._refine_strip_batch, data, batch, mask_b64, refinement,
+                        )))
+                        if len(pending) >= max_workers and not self._paint_strips(
+                            image, *pending.popleft(),
+                        ):
+                            return None
+                    while pending:
+                        if not self._paint_strips(image, *pending.popleft()):
+                            return None
+                finally:
+                    for _, future in pending:
+                        future.cancel()
+            strip_count += len(strips)
+
+        telemetry.increment("tiles.seam_strips", strip_count)
+        logger.info("refine_seams: refined %d seam strips", strip_count)
+        return _qimage_to_b64(image), strip_count
+
+    @staticmethod
+    def _paint_strips(image: QImage, batch: list[dict[str, Any]], future) -> bool:
+        """Paint a batch's refined strips into ``image``; False if it failed."""
+        refined = future.result()
+        if refined is None:
+            return False
+        painter = QPainter(image)
+        for tile, strip_b64 in zip(batch, refined):
+            strip_img = QImage.fromData(base64.b64decode(strip_b64))
+            painter.drawImage(tile["x"], tile["y"], strip_img)
+        painter.end()
+        return True
+
+    def _refine_strip_batch(
+        self,
+        data: dict[str, Any],
+        batch: list[dict[str, Any]],
+        mask_b64: str,
+        refinement: SeamRefinement,
+    ) -> list[str] | None:
+        strip_data = {
+            key: value
+            for key, value in data.items()
+            if key not in ("img2img_img", "inpaint_img", "mask_img")
         }
+        scripts = strip_data.get("alwayson_scripts")
+        if isinstance(scripts, dict) and "controlnet" in scripts:
+            strip_data["alwayson_scripts"] = {
+                name: args for name, args in scripts.items() if name != "controlnet"
+            }
+        strip_data.update({
+            "init_images": [tile["tile_b64"] for tile in batch],
+            "mask_img": mask_b64,
+            "width": batch[0]["w"],
+            "height": batch[0]["h"],
+            "batch_size": len(batch),
+            "batch_count": 1,
+            "denoising_strength": refinement.denoising_strength,
+            "resize_mode": 1,
+            # The band mask is feathered here already.
+            "mask_blur": 0,
+            "inpainting_fill": 1,
+            "inpainting_mask_invert": 0,
+            "inpaint_full_res": 0,
+        })
+
+        result = prune_generation_results(self.img2img(strip_data))
+        images = result.get("images", []) if isinstance(result, dict) else []
+        if len(images) < len(batch):
+            logger.error(
+                "refine_seams: expected %d strips, got %d", len(batch), len(images),
+            )
+            return None
+        return images[:len(batch)]
+
+    @staticmethod
+    def _tile_skip_reasons(
+        data: dict[str, Any],
+        pixels: bytes,
+        stride: int,
+        layout: TileLayout,
+        thresholds: TileSkipThresholds,
+    ) -> list[str | None]:
+        """Measure every tile of ``layout`` once and decide which can be skipped."""
+        mask = None
+        mask_stride = 0
+        mask_b64 = data.get("mask_img")
+        if isinstance(mask_b64, str) and mask_b64:
+            mask_image = QImage.fromData(base64.b64decode(mask_b64))
+            if (
+                not mask_image.isNull()
+                and mask_image.width() == layout.image_width
+                and mask_image.height() == layout.image_height
+            ):
+                mask_image = mask_image.convertToFormat(QImage.Format.Format_Grayscale8)
+                mask = _qimage_bytes(mask_image)
+                mask_stride = mask_image.bytesPerLine()
+
+        return [
+            tile_skip_reason(
+                measure_tile(
+                    pixels,
+                    stride,
+                    rect,
+                    mask=mask,
+                    mask_stride=mask_stride,
+                    mask_inverted=bool(data.get("inpainting_mask_invert")),
+                    sample_step=thresholds.sample_step,
+                ),
+                thresholds,
+            )
+            for rect in layout.tiles
+        ]
+
+    def plan_tiles(
+        self,
+        data: dict[str, Any],
+        width: int,
+        height: int,
+        tile_size: int | None = None,
+        overlap: int = 64,
+    ) -> TileLayout:
+        """Plan the tile grid for ``data`` using the model family's size bounds."""
+        model_name = data.get("model") or data.get("sd_model_checkpoint")
+        if not isinstance(model_name, str) or not model_name:
+            model_name = self.defaults.get("model", "")
+        config = get_model_config(detect_model_family(model_name))
+
+        return build_tile_layout(
+            width,
+            height,
+            min_size=config.min_size,
+            max_size=tile_size or config.default_max_size,
+            min_overlap=overlap,
+        )
 
     @staticmethod
     def split_into_tiles(
         image_data_b64: str,
         tile_size: int,
         overlap: int,
+        layout: TileLayout | None = None,
     ) -> list[dict[str, Any]]:
         """Split a base64-encoded image into overlapping tiles.
 
+        Tiles follow ``layout`` when given, otherwise a layout is planned with
+        ``tile_size`` as the maximum tile side and ``overlap`` as the minimum
+        overlap.
+
         Returns a list of dicts with keys: x, y, w, h, tile_b64.
         """
         src_bytes = base64.b64decode(image_data_b64)
-        fmt = "PNG" if image_data_b64[:8] == "iVBORw0KGgo" else "JPEG"
+        fmt = "PNG" if image_data_b64.startswith("iVBORw0KGgo") else "JPEG"
         src_image = QImage.fromData(src_bytes, fmt)
         if src_image.isNull():
             return []
@@ -672,44 +1009,70 @@ class SDAPI:
         if src_image.format() != QImage.Format.Format_RGBA8888:
             src_image = src_image.convertToFormat(QImage.Format.Format_RGBA8888)
 
-        full_width = src_image.width()
-        full_height = src_image.height()
-        step = max(tile_size - overlap, 1)
-
-        tiles: list[dict[str, Any]] = []
-
-        y = 0
-        while y < full_height:
-            x = 0
-            while x < full_width:
-                tw = min(tile_size, full_width - x)
-                th = min(tile_size, full_height - y)
-
-                tile_img = src_image.copy(x, y, tw, th)
-
-                byte_arr = QByteArray()
-                buf = QBuffer(byte_arr)
-                buf.open(QIODevice.OpenModeFlag.WriteOnly)
-                tile_img.save(buf, "PNG")
-                tile_b64 = byte_arr.toBase64().data().decode()
-
-                tiles.append({
-                    "x": x,
-                    "y": y,
-                    "w": tw,
-                    "h": th,
-                    "tile_b64": tile_b64,
-                })
+        if layout is None:
+            layout = build_tile_layout(
+                src_image.width(),
+                src_image.height(),
+                min_size=0,
+                max_size=tile_size,
+                min_overlap=overlap,
+            )
 
-                if x + tile_size >= full_width:
-                    break
-                x += step
+        return list(SDAPI.iter_tiles(
+            _qimage_bytes(src_image), src_image.bytesPerLine(), layout.tiles,
+        ))
 
-            if y + tile_size >= full_height:
-                break
-            y += step
+    @staticmethod
+    def iter_tiles(
+        pixels: bytes,
+        stride: int,
+        rects: Iterable[TileRect],
+        *,
+        png_compression: int = 1,
+        workers: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Lazily yield the ``rects`` of an image encoded as base64 PNG.
 
-        return tiles
+        ``pixels`` is the decoded RGBA8888 source with ``stride`` bytes per
+        line. Each tile is a zero-copy view into it and is encoded on a worker
+        pool at ``png_compression`` (0-9), a few tiles ahead of the consumer,
+        so the first tile can be sent while later ones are still encoding.
+
+        Yields dicts with keys: x, y, w, h, tile_b64.
+        """
+        quality = png_quality_for_compression(png_compression)
+        max_workers = max(workers or _default_encode_workers(), 1)
+        rects = iter(rects)
+        pending: deque = deque()
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="forge-tile-encode",
+        ) as pool:
+
+            def _submit_next() -> None:
+                rect = next(rects, None)
+                if rect is not None:
+                    pending.append(
+                        (rect, pool.submit(_encode_tile, pixels, stride, rect, quality))
+                    )
+
+            for _ in range(max_workers * 2):
+                _submit_next()
+
+            try:
+                while pending:
+                    rect, future = pending.popleft()
+                    _submit_next()
+                    yield {
+                        "x": rect.x,
+                        "y": rect.y,
+                        "w": rect.width,
+                        "h": rect.height,
+                        "tile_b64": future.result(),
+                    }
+            finally:
+                for _, future in pending:
+                    future.cancel()
 
     @staticmethod
     def reconstruct_from_tiles(
@@ -720,76 +1083,19 @@ class SDAPI:
     ) -> str:
         """Reconstruct full image from generated tiles with seam blending.
 
-        Returns a base64-encoded PNG of the reconstructed image.
+        Tiles are feathered over half the overlap on their inner edges and
+        averaged by weight (see :func:`blend_tiles`). Returns a base64-encoded
+        PNG of the reconstructed image.
         """
-        result = QImage(full_width, full_height, QImage.Format.Format_RGBA8888)
-        result.fill(0)
-
-        weight = QImage(full_width, full_height, QImage.Format.Format_Grayscale8)
-        weight.fill(0)
-
-        half_overlap = max(overlap // 2, 1)
-
+        decoded = []
         for tile in tiles:
-            tile_b64 = tile["tile_b64"]
-            tx, ty = tile["x"], tile["y"]
-            tw, th = tile["w"], tile["h"]
-
-            tile_bytes = base64.b64decode(tile_b64)
-            fmt = "PNG" if tile_b64[:8] == "iVBORw0KGgo" else "JPEG"
-            tile_img = QImage.fromData(tile_bytes, fmt)
-            if tile_img.isNull():
-                continue
-
-            if tile_img.format() != QImage.Format.Format_RGBA8888:
-                tile_img = tile_img.convertToFormat(QImage.Format.Format_RGBA8888)
-
-            for ty_off in range(th):
-                for tx_off in range(tw):
-                    gx = tx + tx_off
-                    gy = ty + ty_off
-
-                    if gx >= full_width or gy >= full_height:
-                        continue
-
-                    dist_left = tx_off
-                    dist_right = tw - 1 - tx_off
-                    dist_top = ty_off
-                    dist_bottom = th - 1 - ty_off
-
-                    min_dist = min(dist_left, dist_right, dist_top, dist_bottom)
-
-                    if overlap > 0:
-                        fade = min(float(min_dist) / float(half_overlap), 1.0)
-                    else:
-                        fade = 1.0
-
-                    tile_color = tile_img.pixelColor(tx_off, ty_off)
-                    existing_color = result.pixelColor(gx, gy)
+            buffer = decode_buffer(tile["tile_b64"])
+            if buffer is not None:
+                decoded.append((TileRect(tile["x"], tile["y"], tile["w"], tile["h"]), buffer))
 
-                    # QImage.pixel(row, col) — row=gy, col=gx for Grayscale8
-                    w_val = weight.pixel(gy, gx) & 0xFF
-                    existing_weight = w_val
-
-                    new_weight = existing_weight + fade
-                    if new_weight <= 0:
-                        continue
-
-                    alpha = fade / new_weight
-
-                    r = int(existing_color.red() * (1 - alpha) + tile_color.red() * alpha)
-                    g = int(existing_color.green() * (1 - alpha) + tile_color.green() * alpha)
-                    b = int(existing_color.blue() * (1 - alpha) + tile_color.blue() * alpha)
-                    a = int(existing_color.alpha() * (1 - alpha) + tile_color.alpha() * alpha)
-
-                    result.setPixelColor(gx, gy, QColor(r, g, b, a))
-                    weight.setPixel(gy, gx, min(int(new_weight * 255), 255))
-
-        byte_arr = QByteArray()
-        buf = QBuffer(byte_arr)
-        buf.open(QIODevice.OpenModeFlag.WriteOnly)
-        result.save(buf, "PNG")
-        return byte_arr.toBase64().data().decode()
+        with telemetry.timed("tiles.reconstruct_ms"):
+            result = blend_tiles(decoded, full_width, full_height, max(overlap // 2, 1))
+        return _qimage_to_b64(buffer_to_qimage(result))
 
     @staticmethod
     def blend_seams(
@@ -807,111 +1113,66 @@ class SDAPI:
             direction: ``"horizontal"`` or ``"vertical"``.
         """
         if direction == "horizontal":
-            return SDAPI._blend_horizontal(tile_a, tile_b, overlap)
+            return SDAPI._blend_pair(tile_a, tile_b, overlap, vertical=False)
         elif direction == "vertical":
-            return SDAPI._blend_vertical(tile_a, tile_b, overlap)
+            return SDAPI._blend_pair(tile_a, tile_b, overlap, vertical=True)
         else:
             logger.warning("blend_seams: unknown direction %r, returning tile_a", direction)
             return tile_a.copy()
 
     @staticmethod
-    def _blend_horizontal(
-        tile_a: QImage, tile_b: QImage, overlap: int
+    def _blend_pair(
+        tile_a: QImage, tile_b: QImage, overlap: int, vertical: bool
     ) -> QImage:
-        if tile_a.format() != QImage.Format.Format_RGBA8888:
-            tile_a = tile_a.convertToFormat(QImage.Format.Format_RGBA8888)
-        if tile_b.format() != QImage.Format.Format_RGBA8888:
-            tile_b = tile_b.convertToFormat(QImage.Format.Format_RGBA8888)
-
-        ha = tile_a.height()
-        hb = tile_b.height()
-        result_height = max(ha, hb)
-        result_width = tile_a.width() + tile_b.width() - overlap
-        result = QImage(result_width, result_height, QImage.Format.Format_RGBA8888)
-        result.fill(0)
-
-        painter = QPainter(result)
-        painter.drawImage(0, 0, tile_a)
-
-        overlap_start_x = tile_a.width() - overlap
-        for x in range(overlap):
-            fade_a = 1.0 - (x / max(overlap, 1))
-            fade_b = x / max(overlap, 1)
-            src_x = overlap_start_x + x
-            dst_x = tile_a.width() + x
-
-            for y in range(result_height):
-                if y >= hb:
-                    continue
-
-                ca = tile_a.pixelColor(src_x, y) if src_x < tile_a.width() else QColor(0, 0, 0, 0)
-                cb = tile_b.pixelColor(x, y)
-
-                r = int(ca.red() * fade_a + cb.red() * fade_b)
-                g = int(ca.green() * fade_a + cb.green() * fade_b)
-                b = int(ca.blue() * fade_a + cb.blue() * fade_b)
-                a = int(ca.alpha() * fade_a + cb.alpha() * fade_b)
+        a = qimage_to_buffer(tile_a)
+        b = qimage_to_buffer(tile_b)
+        overlap = max(0, min(overlap, b.height if vertical else b.width))
+        if vertical:
+            width, height = max(a.width, b.width), a.height + b.height - overlap
+            b_rect = TileRect(0, a.height - overlap, b.width, b.height)
+        else:
+            width, height = a.width + b.width - overlap, max(a.height, b.height)
+            b_rect = TileRect(a.width - overlap, 0, b.width, b.height)
+
+        # A ramp as wide as the overlap makes the two weights a linear cross-fade.
+        result = blend_tiles(
+            [(TileRect(0, 0, a.width, a.height), a), (b_rect, b)],
+            width,
+            height,
+            overlap,
+        )
+        return buffer_to_qimage(result).copy()
 
-                result.setPixelColor(dst_x, y, QColor(r, g, b, a))
 
-        non_overlap_width = tile_b.width() - overlap
-        if non_overlap_width > 0:
-            painter.drawImage(
-                tile_a.width(), 0,
-                tile_b, overlap, 0, non_overlap_width, hb,
-            )
+class _PayloadImageCropper:
+    """Cut the mask and ControlNet images of a request down to one tile.
 
-        painter.end()
-        return result
+    Each distinct image is decoded once and then cropped per tile; images
+    whose size differs from the source are cropped at the scaled position.
+    """
 
-    @staticmethod
-    def _blend_vertical(
-        tile_a: QImage, tile_b: QImage, overlap: int
-    ) -> QImage:
-        if tile_a.format() != QImage.Format.Format_RGBA8888:
-            tile_a = tile_a.convertToFormat(QImage.Format.Format_RGBA8888)
-        if tile_b.format() != QImage.Format.Format_RGBA8888:
-            tile_b = tile_b.convertToFormat(QImage.Format.Format_RGBA8888)
-
-        wb = tile_b.width()
-        result_width = max(tile_a.width(), wb)
-        result_height = tile_a.height() + tile_b.height() - overlap
-        result = QImage(result_width, result_height, QImage.Format.Format_RGBA8888)
-        result.fill(0)
-
-        painter = QPainter(result)
-        painter.drawImage(0, 0, tile_a)
-
-        overlap_start_y = tile_a.height() - overlap
-        for y in range(overlap):
-            fade_a = 1.0 - (y / max(overlap, 1))
-            fade_b = y / max(overlap, 1)
-            src_y = overlap_start_y + y
-            dst_y = tile_a.height() + y
-
-            for x in range(result_width):
-                if x >= wb:
-                    continue
+    def __init__(self, source_width: int, source_height: int, quality: int) -> None:
+        self._source_size = (source_width, source_height)
+        self._quality = quality
+        self._decoded: dict[str, QImage | None] = {}
 
-                ca = tile_a.pixelColor(x, src_y) if src_y < tile_a.height() else QColor(0, 0, 0, 0)
-                cb = tile_b.pixelColor(x, y)
+    def tile_data(self, data: dict[str, Any], rect: TileRect) -> dict[str, Any]:
+        return map_payload_images(data, lambda image_b64: self.crop(image_b64, rect))
 
-                r = int(ca.red() * fade_a + cb.red() * fade_b)
-                g = int(ca.green() * fade_a + cb.green() * fade_b)
-                b = int(ca.blue() * fade_a + cb.blue() * fade_b)
-                a = int(ca.alpha() * fade_a + cb.alpha() * fade_b)
+    def crop(self, image_b64: str, rect: TileRect) -> str:
+        if image_b64 not in self._decoded:
+            image = QImage.fromData(base64.b64decode(image_b64))
+            self._decoded[image_b64] = None if image.isNull() else image
 
-                result.setPixelColor(x, dst_y, QColor(r, g, b, a))
+        image = self._decoded[image_b64]
+        if image is None:
+            return image_b64
 
-        non_overlap_height = tile_b.height() - overlap
-        if non_overlap_height > 0:
-            painter.drawImage(
-                0, tile_a.height(),
-                tile_b, 0, overlap, wb, non_overlap_height,
-            )
-
-        painter.end()
-        return result
+        crop = scale_rect(rect, self._source_size, (image.width(), image.height()))
+        return _qimage_to_b64(
+            image.copy(crop.x, crop.y, crop.width, crop.height),
+            quality=self._quality,
+        )
 
 
 def _normalize_host(host: str) -> str:
@@ -921,6 +1182,41 @@ def _normalize_host(host: str) -> str:
     return host.rstrip("/")
 
 
+def _batched(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    batch: list[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _default_encode_workers() -> int:
+    return min(4, os.cpu_count() or 1)
+
+
+def _encode_tile(pixels: bytes, stride: int, rect: TileRect, quality: int) -> str:
+    view = tile_view(pixels, stride, rect)
+    tile_img = QImage(
+        view, rect.width, rect.height, stride, QImage.Format.Format_RGBA8888,
+    )
+    return _qimage_to_b64(tile_img, quality=quality)
+
+
+def _qimage_to_b64(image: QImage, fmt: str = "PNG", quality: int = -1) -> str:
+    byte_arr = QByteArray()
+    buf = QBuffer(byte_arr)
+    buf.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buf, fmt, quality)
+    return byte_arr.toBase64().data().decode()
+
+
+def _qimage_bytes(image: QImage) -> bytes:
+    return qimage_bits(image).asstring()
+
+
 def _safe_name(item: Any, key: str) -> str:
     if isinstance(item, dict):
         value = item.get(key, "")
@@ -1,12 +1,41 @@
 from .generation_plan import (
     FORGE_PROCESSING_KEY,
+    RESULT_RESAMPLING_MODES,
     GenerationPlan,
     ResizeInstruction,
+    SeamRefinement,
+    SeamStrip,
+    TileLayout,
+    TileRect,
+    build_draft_plan,
     build_generation_plan,
+    build_seam_strips,
+    build_tile_layout,
+    draft_steps,
     merge_generation_data,
     prune_generation_results,
 )
+from .capture_cache import CaptureCache, DocumentRevision, sample_offsets, sample_step
+from .composite_plan import COMPOSITE_MODES, CompositeStep, plan_composite_without
+from .color_match import (
+    COLOR_MATCH_MODES,
+    channel_histograms,
+    histogram_luts,
+    match_colors,
+    transfer_lab,
+)
+from .dirty_region import DirtyUpdate, changed_tiles, dirty_mask, plan_dirty_update
+from .encode_cache import EncodedImageCache, pixel_fingerprint
 from .history_manager import HistoryManager
+from .image_buffer import (
+    CHANNEL_ORDERS,
+    ImageBuffer,
+    StripResampler,
+    blend_tiles,
+    edge_ramp,
+    resampling_supported,
+)
+from .live_session import LivePaintScheduler, LiveTicket
 from .model_registry import (
     CONFIGS,
     DETECT_PATTERNS,
@@ -15,24 +44,146 @@ from .model_registry import (
     detect_model_family,
     get_model_config,
 )
+from .image_codec import (
+    IMAGE_ROLES,
+    ImageEncoding,
+    UploadCodecPolicy,
+    png_quality_for_compression,
+)
+from .mask_ops import (
+    alpha_to_bgra,
+    is_binary_mask,
+    mask_bounds,
+    mask_clear,
+    mask_feather,
+    mask_fill,
+    mask_grow,
+    mask_invert,
+    mask_shrink,
+    mask_threshold,
+    padded_crop,
+)
+from .node_index import NodeIndex, walk_nodes
 from .payload_builder import build_api_payload
+from .payload_tiler import map_controlnet_images, map_payload_images, scale_rect
+from .pixel_buffer import (
+    ARGB32_ALPHA_OFFSET,
+    DecodedImage,
+    RGBA_BYTES_PER_PIXEL,
+    band_mask,
+    channel_plane,
+    scaled_size,
+    scaled_span,
+    tile_view,
+)
+from .png_stream import PngStreamWriter, bgra_to_rgba
+from .preview_pipeline import LatestFrameSlot, PreviewFrameGate, PreviewThrottle, frame_fingerprint
 from .progress_state import ProgressState, parse_progress_state
+from .streamed_payload import (
+    StreamedImage,
+    StreamedJsonBody,
+    contains_streams,
+    iter_streams,
+    json_default,
+)
+from .telemetry import Telemetry, telemetry
+from .tile_filter import TileSkipThresholds, TileStats, measure_tile, tile_skip_reason
 
 __all__ = [
+    "ARGB32_ALPHA_OFFSET",
+    "CHANNEL_ORDERS",
+    "COLOR_MATCH_MODES",
+    "COMPOSITE_MODES",
     "CONFIGS",
+    "CaptureCache",
+    "CompositeStep",
     "DETECT_PATTERNS",
+    "DecodedImage",
+    "DirtyUpdate",
+    "DocumentRevision",
+    "EncodedImageCache",
     "FORGE_PROCESSING_KEY",
     "GenerationPlan",
     "HistoryManager",
+    "IMAGE_ROLES",
+    "ImageBuffer",
+    "ImageEncoding",
+    "LatestFrameSlot",
+    "LivePaintScheduler",
+    "LiveTicket",
     "ModelConfig",
     "ModelFamily",
+    "NodeIndex",
+    "PngStreamWriter",
+    "PreviewFrameGate",
+    "PreviewThrottle",
     "ProgressState",
+    "RESULT_RESAMPLING_MODES",
+    "RGBA_BYTES_PER_PIXEL",
     "ResizeInstruction",
+    "SeamRefinement",
+    "SeamStrip",
+    "StreamedImage",
+    "StreamedJsonBody",
+    "StripResampler",
+    "Telemetry",
+    "TileLayout",
+    "TileRect",
+    "TileSkipThresholds",
+    "TileStats",
+    "UploadCodecPolicy",
+    "alpha_to_bgra",
+    "band_mask",
+    "bgra_to_rgba",
+    "blend_tiles",
     "build_api_payload",
+    "build_draft_plan",
     "build_generation_plan",
+    "build_seam_strips",
+    "build_tile_layout",
+    "changed_tiles",
+    "channel_histograms",
+    "channel_plane",
+    "contains_streams",
     "detect_model_family",
+    "dirty_mask",
+    "draft_steps",
+    "edge_ramp",
+    "frame_fingerprint",
     "get_model_config",
+    "histogram_luts",
+    "is_binary_mask",
+    "iter_streams",
+    "json_default",
+    "map_controlnet_images",
+    "map_payload_images",
+    "mask_bounds",
+    "mask_clear",
+    "mask_feather",
+    "mask_fill",
+    "mask_grow",
+    "mask_invert",
+    "mask_shrink",
+    "mask_threshold",
+    "match_colors",
+    "measure_tile",
     "merge_generation_data",
+    "padded_crop",
     "parse_progress_state",
+    "plan_dirty_update",
+    "plan_composite_without",
+    "pixel_fingerprint",
+    "png_quality_for_compression",
     "prune_generation_results",
+    "resampling_supported",
+    "sample_offsets",
+    "sample_step",
+    "scaled_size",
+    "scale_rect",
+    "scaled_span",
+    "telemetry",
+    "tile_skip_reason",
+    "tile_view",
+    "transfer_lab",
+    "walk_nodes",
 ]
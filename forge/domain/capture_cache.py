@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+
+@dataclass(frozen=True)
+class DocumentRevision:
+    """Cheap stand-in for "has this region of the document changed".
+
+    ``structure`` lists every node with the properties that affect the
+    projection (id, visibility, opacity), so adding, removing, hiding or
+    fading a layer changes it. ``checksum`` hashes a bounded sample of the
+    region (see :func:`sample_step`), catching paint strokes that leave the
+    structure alone. Small regions are hashed whole; on large ones an edit
+    smaller than the sample step in both directions can slip between
+    samples, so callers that must be exact should bypass the cache.
+    """
+
+    modified: bool
+    active_node: str
+    structure: tuple
+    checksum: bytes
+
+
+def sample_step(width: int, height: int, budget: int, pixel_bytes: int = 4) -> int:
+    """Return the row and column step that keeps a checksum near ``budget`` bytes.
+
+    A step of 1 means the whole region fits in the budget and is read at
+    once. Otherwise every ``step``-th row and column is read, about
+    ``budget`` bytes in total however large the region.
+    """
+    area = width * height * pixel_bytes
+    if area <= budget:
+        return 1
+    return max(2, -(-2 * area // max(budget, 1)))
+
+
+def sample_offsets(start: int, length: int, step: int) -> list[int]:
+    """Return every ``step``-th offset in ``[start, start + length)``, plus the last."""
+    if length <= 0:
+        return []
+    offsets = list(range(start, start + length, max(step, 1)))
+    if offsets[-1] != start + length - 1:
+        offsets.append(start + length - 1)
+    return offsets
+
+
+class CaptureCache:
+    """Keep the latest capture per region, valid while the revision matches.
+
+    ``get`` returns the stored value only if it was captured at an equal
+    :class:`DocumentRevision`; a mismatch drops the stale entry. At most
+    ``max_entries`` regions are kept, least recently used first out.
+    """
+
+    def __init__(self, max_entries: int = 8) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[DocumentRevision, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, region: Hashable, revision: DocumentRevision) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(region)
+            if entry is None or entry[0] != revision:
+                self._entries.pop(region, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(region)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, region: Hashable, revision: DocumentRevision, value: Any) -> None:
+        with self._lock:
+            self._entries[region] = (revision, value)
+            self._entries.move_to_end(region)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+__all__ = ["CaptureCache", "DocumentRevision", "sample_offsets", "sample_step"]
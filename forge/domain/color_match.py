@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from collections import Counter
+
+from . import image_buffer
+from .image_buffer import ImageBuffer
+from .pixel_buffer import RGBA_BYTES_PER_PIXEL
+
+COLOR_MATCH_OFF = "off"
+COLOR_MATCH_HISTOGRAM = "histogram"
+COLOR_MATCH_LAB = "lab"
+COLOR_MATCH_MODES = (COLOR_MATCH_OFF, COLOR_MATCH_HISTOGRAM, COLOR_MATCH_LAB)
+
+# Statistics are gathered from at most about this many pixels per image;
+# evenly spaced samples give the same histograms at a fraction of the cost.
+COLOR_MATCH_MAX_SAMPLES = 1 << 20
+
+# Rows converted to Lab at a time, bounding the float temporaries at 4K.
+_LAB_ROWS_PER_CHUNK = 256
+
+# Linear-light levels in the gamma-encoding table; fine enough that the
+# steepest part of the sRGB curve moves by less than one 8-bit step per level.
+_ENCODE_LEVELS = 1 << 14
+
+_FULL_RUNS = re.compile(b"\xff+")
+_PARTIAL_RUNS = re.compile(b"[\x01-\xfe]+")
+
+# sRGB (D65) to XYZ, and XYZ scaled by the D65 white point to Lab.
+_RGB_TO_XYZ = (
+    (0.4124564, 0.3575761, 0.1804375),
+    (0.2126729, 0.7151522, 0.0721750),
+    (0.0193339, 0.1191920, 0.9503041),
+)
+_D65_WHITE = (0.95047, 1.0, 1.08883)
+
+
+def match_colors(
+    result: ImageBuffer,
+    reference: ImageBuffer,
+    mode: str,
+    mask: bytes | None = None,
+) -> ImageBuffer:
+    """Match the colours of ``result`` to ``reference`` with ``mode``.
+
+    Statistics come from the whole of both images. ``mask`` is an optional
+    Grayscale8 plane the size of ``result`` that weights the change per
+    pixel, so only inpainted pixels are adjusted and a feathered mask edge
+    fades the correction out. Alpha is left alone. Returns a packed buffer in
+    ``result``'s channel order.
+    """
+    if mode == COLOR_MATCH_OFF:
+        return result
+    if mode == COLOR_MATCH_HISTOGRAM:
+        matched = _apply_luts(result, histogram_luts(result, reference))
+    elif mode == COLOR_MATCH_LAB:
+        matched = transfer_lab(result, reference)
+    else:
+        raise ValueError(f"unknown colour match mode: {mode!r}")
+    return _select_masked(result, matched, mask) if mask is not None else matched
+
+
+def histogram_luts(result: ImageBuffer, reference: ImageBuffer) -> list[bytes]:
+    """Per-channel 256-entry tables mapping ``result`` onto ``reference``'s histograms."""
+    reference = reference.with_order(result.order)
+    return [
+        _match_cdf(source, target)
+        for source, target in zip(channel_histograms(result), channel_histograms(reference))
+    ]
+
+
+def transfer_lab(result: ImageBuffer, reference: ImageBuffer) -> ImageBuffer:
+    """Reinhard colour transfer: match the mean and deviation of L, a and b.
+
+    Needs NumPy; without it the same mean and deviation transfer is done on
+    the R, G and B channels with lookup tables, which keeps the overall tone
+    but can shift hue slightly more.
+    """
+    reference = reference.with_order(result.order)
+    if image_buffer.numpy is None:
+        return _apply_luts(result, [
+            _moments_lut(source, target)
+            for source, target in zip(channel_histograms(result), channel_histograms(reference))
+        ])
+    return _transfer_lab_numpy(result, reference)
+
+
+def channel_histograms(buffer: ImageBuffer) -> list[list[int]]:
+    """Histograms of the first three channels over evenly sampled pixels."""
+    pixels = buffer.tobytes()
+    step = RGBA_BYTES_PER_PIXEL * _sample_step(buffer.width * buffer.height)
+    numpy = image_buffer.numpy
+    histograms = []
+    for channel in range(3):
+        samples = pixels[channel::step]
+        if numpy is not None:
+            counts = numpy.bincount(numpy.frombuffer(samples, dtype=numpy.uint8), minlength=256)
+            histograms.append(counts.tolist())
+        else:
+            counter = Counter(samples)
+            histograms.append([counter.get(value, 0) for value in range(256)])
+    return histograms
+
+
+def _sample_step(pixel_count: int) -> int:
+    return max(1, pixel_count // COLOR_MATCH_MAX_SAMPLES)
+
+
+def _match_cdf(source: list[int], target: list[int]) -> bytes:
+    source_cdf, target_cdf = _cdf(source), _cdf(target)
+    if not source_cdf or not target_cdf:
+        return bytes(range(256))
+    return bytes(min(bisect_left(target_cdf, value), 255) for value in source_cdf)
+
+
+def _cdf(histogram: list[int]) -> list[float]:
+    total = sum(histogram)
+    if not total:
+        return []
+    running, cdf = 0, []
+    for count in histogram:
+        running += count
+        cdf.append(running / total)
+    return cdf
+
+
+def _moments(histogram: list[int]) -> tuple[float, float]:
+    total = sum(histogram) or 1
+    mean = sum(value * count for value, count in enumerate(histogram)) / total
+    variance = sum((value - mean) ** 2 * count for value, count in enumerate(histogram)) / total
+    return mean, variance ** 0.5
+
+
+def _moments_lut(source: list[int], target: list[int]) -> bytes:
+    source_mean, source_std = _moments(source)
+    target_mean, target_std = _moments(target)
+    scale = target_std / source_std if source_std > 1e-6 else 1.0
+    return bytes(
+        min(max(int((value - source_mean) * scale + target_mean + 0.5), 0), 255)
+        for value in range(256)
+    )
+
+
+def _apply_luts(buffer: ImageBuffer, luts: list[bytes]) -> ImageBuffer:
+    pixels = buffer.tobytes()
+    matched = bytearray(pixels)
+    for channel, lut in enumerate(luts):
+        matched[channel::RGBA_BYTES_PER_PIXEL] = pixels[channel::RGBA_BYTES_PER_PIXEL].translate(lut)
+    return ImageBuffer(matched, buffer.width, buffer.height, order=buffer.order)
+
+
+def _select_masked(original: ImageBuffer, matched: ImageBuffer, mask) -> ImageBuffer:
+    if len(mask) != original.width * original.height:
+        raise ValueError("mask size does not match the image")
+    mask = bytes(mask)
+    numpy = image_buffer.numpy
+    if numpy is not None:
+        weights = numpy.frombuffer(mask, dtype=numpy.uint8)
+        before = original.as_array().reshape(-1, RGBA_BYTES_PER_PIXEL)
+        after = matched.as_array().reshape(-1, RGBA_BYTES_PER_PIXEL)
+        selected = numpy.where((weights == 255)[:, None], after, before)
+        partial = numpy.flatnonzero((weights > 0) & (weights < 255))
+        if partial.size:
+            weight = weights[partial].astype(numpy.int32)[:, None]
+            selected[partial] = (
+                before[partial].astype(numpy.int32) * (255 - weight)
+                + after[partial].astype(numpy.int32) * weight
+                + 127
+            ) // 255
+        return ImageBuffer(bytearray(selected), original.width, original.height, order=original.order)
+
+    # Fully masked runs are copied as slices; only the feathered edge is mixed.
+    selected = bytearray(original.tobytes())
+    for run in _FULL_RUNS.finditer(mask):
+        begin, end = run.start() * RGBA_BYTES_PER_PIXEL, run.end() * RGBA_BYTES_PER_PIXEL
+        selected[begin:end] = matched.pixels[begin:end]
+    for run in _PARTIAL_RUNS.finditer(mask):
+        for index in range(run.start(), run.end()):
+            weight = mask[index]
+            for offset in range(index * RGBA_BYTES_PER_PIXEL, (index + 1) * RGBA_BYTES_PER_PIXEL):
+                selected[offset] = (
+                    selected[offset] * (255 - weight) + matched.pixels[offset] * weight + 127
+                ) // 255
+    return ImageBuffer(selected, original.width, original.height, order=original.order)
+
+
+def _transfer_lab_numpy(result: ImageBuffer, reference: ImageBuffer) -> ImageBuffer:
+    numpy = image_buffer.numpy
+    rgb = [2, 1, 0] if result.order == "BGRA" else [0, 1, 2]
+
+    def samples(buffer):
+        pixels = buffer.as_array().reshape(-1, RGBA_BYTES_PER_PIXEL)
+        return _rgb_to_lab(numpy, pixels[::_sample_step(len(pixels)), rgb])
+
+    source_lab, target_lab = samples(result), samples(reference)
+    source_mean, source_std = source_lab.mean(axis=0), source_lab.std(axis=0)
+    target_mean, target_std = target_lab.mean(axis=0), target_lab.std(axis=0)
+    scale = numpy.where(source_std > 1e-6, target_std / numpy.maximum(source_std, 1e-6), 1.0)
+
+    pixels = result.as_array()
+    matched = numpy.array(pixels)
+    for top in range(0, result.height, _LAB_ROWS_PER_CHUNK):
+        rows = pixels[top:top + _LAB_ROWS_PER_CHUNK].reshape(-1, RGBA_BYTES_PER_PIXEL)
+        lab = (_rgb_to_lab(numpy, rows[:, rgb]) - source_mean) * scale + target_mean
+        chunk = matched[top:top + _LAB_ROWS_PER_CHUNK].reshape(-1, RGBA_BYTES_PER_PIXEL)
+        chunk[:, rgb] = _lab_to_rgb(numpy, lab)
+    return ImageBuffer.from_array(matched, result.order)
+
+
+def _rgb_to_lab(numpy, rgb):
+    encoded = numpy.arange(256, dtype=numpy.float32) / 255
+    linear = numpy.where(encoded <= 0.04045, encoded / 12.92, ((encoded + 0.055) / 1.055) ** 2.4)
+    xyz = linear.astype(numpy.float32)[rgb] @ numpy.array(_RGB_TO_XYZ, dtype=numpy.float32).T
+    xyz /= numpy.array(_D65_WHITE, dtype=numpy.float32)
+    f = numpy.where(xyz > 216 / 24389, numpy.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return numpy.stack([
+        116 * f[:, 1] - 16,
+        500 * (f[:, 0] - f[:, 1]),
+        200 * (f[:, 1] - f[:, 2]),
+    ], axis=1)
+
+
+def _lab_to_rgb(numpy, lab):
+    fy = (lab[:, 0] + 16) / 116
+    f = numpy.stack([fy + lab[:, 1] / 500, fy, fy - lab[:, 2] / 200], axis=1)
+    xyz = numpy.where(f ** 3 > 216 / 24389, f ** 3, (116 * f - 16) / (24389 / 27))
+    xyz *= numpy.array(_D65_WHITE, dtype=numpy.float32)
+    linear = numpy.clip(xyz @ numpy.linalg.inv(numpy.array(_RGB_TO_XYZ)).T.astype(numpy.float32), 0, 1)
+    # Gamma-encode through a fine lookup table instead of a per-pixel power.
+    levels = numpy.linspace(0, 1, _ENCODE_LEVELS)
+    table = numpy.where(levels <= 0.0031308, levels * 12.92, 1.055 * levels ** (1 / 2.4) - 0.055)
+    table = numpy.clip(table * 255 + 0.5, 0, 255).astype(numpy.uint8)
+    return table[(linear * (_ENCODE_LEVELS - 1) + 0.5).astype(numpy.intp)]
+
+
+__all__ = [
+    "COLOR_MATCH_HISTOGRAM",
+    "COLOR_MATCH_LAB",
+    "COLOR_MATCH_MAX_SAMPLES",
+    "COLOR_MATCH_MODES",
+    "COLOR_MATCH_OFF",
+    "channel_histograms",
+    "histogram_luts",
+    "match_colors",
+    "transfer_lab",
+]
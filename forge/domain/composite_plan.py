@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+# Krita blend modes (``Node.blendingMode()``) that QPainter can reproduce,
+# mapped to the name of the matching ``QPainter.CompositionMode`` member.
+# "add" is left out: CompositionMode_Plus sums premultiplied colours, while
+# Krita blends the clamped sum like the other separable modes, so the two
+# differ wherever either layer is translucent.
+COMPOSITE_MODES = {
+    "normal": "CompositionMode_SourceOver",
+    "multiply": "CompositionMode_Multiply",
+    "screen": "CompositionMode_Screen",
+    "overlay": "CompositionMode_Overlay",
+    "darken": "CompositionMode_Darken",
+    "lighten": "CompositionMode_Lighten",
+    "dodge": "CompositionMode_ColorDodge",
+    "burn": "CompositionMode_ColorBurn",
+    "hard_light": "CompositionMode_HardLight",
+    "soft_light_svg": "CompositionMode_SoftLight",
+    "diff": "CompositionMode_Difference",
+    "exclusion": "CompositionMode_Exclusion",
+}
+
+# Layers whose projection depends on what is composited below them.
+_BACKDROP_DEPENDENT_TYPES = frozenset({"filterlayer"})
+
+
+@dataclass(frozen=True)
+class CompositeStep:
+    """One layer to paint, bottom to top, with its opacity and blend mode.
+
+    A step with ``children`` is a group rebuilt from those steps; any other
+    step paints ``node``'s own projection.
+    """
+
+    node: Any
+    opacity: float
+    mode: str
+    children: tuple[CompositeStep, ...] | None = None
+
+
+def plan_composite_without(root, excluded) -> tuple[CompositeStep, ...] | None:
+    """Plan the projection of ``root`` as if ``excluded`` were hidden.
+
+    Only the groups containing ``excluded`` are rebuilt from their children;
+    every other visible layer is painted from its own projection. Returns
+    ``None`` when the result cannot match Krita's compositing: a blend mode
+    QPainter lacks, pass-through groups, alpha inheritance, adjustment
+    layers, or masks on a rebuilt group.
+    """
+    excluded_id = str(excluded.uniqueId())
+    ancestors = set()
+    node = excluded.parentNode()
+    while node is not None:
+        ancestors.add(str(node.uniqueId()))
+        node = node.parentNode()
+    if str(root.uniqueId()) not in ancestors:
+        return None
+    return _plan_children(root, excluded_id, ancestors)
+
+
+def _plan_children(parent, excluded_id: str, ancestors: set) -> tuple[CompositeStep, ...] | None:
+    steps = []
+    for child in parent.childNodes():
+        node_type = child.type()
+        uuid = str(child.uniqueId())
+        if uuid == excluded_id or node_type.endswith("mask") or not child.visible():
+            continue
+        if node_type in _BACKDROP_DEPENDENT_TYPES or child.inheritAlpha():
+            return None
+
+        mode = child.blendingMode()
+        if mode not in COMPOSITE_MODES:
+            return None
+
+        children = None
+        if uuid in ancestors:
+            if _is_pass_through(child) or any(
+                grandchild.type().endswith("mask") for grandchild in child.childNodes()
+            ):
+                return None
+            children = _plan_children(child, excluded_id, ancestors)
+            if children is None:
+                return None
+        steps.append(CompositeStep(child, child.opacity() / 255, mode, children))
+    return tuple(steps)
+
+
+def _is_pass_through(node) -> bool:
+    pass_through = getattr(node, "passThroughMode", None)
+    return bool(pass_through()) if pass_through is not None else False
+
+
+__all__ = ["COMPOSITE_MODES", "CompositeStep", "plan_composite_without"]
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from . import image_buffer
+from .generation_plan import TileRect
+from .image_buffer import ImageBuffer
+from .mask_ops import mask_feather, padded_crop
+from .pixel_buffer import RGBA_BYTES_PER_PIXEL
+
+# Side of the square cells two projections are compared in.
+DIRTY_TILE_SIZE = 32
+
+# Above this share of the region a partial update saves too little to be
+# worth a mask seam; the whole region is rendered again instead.
+DIRTY_MAX_FRACTION = 0.5
+
+
+@dataclass(frozen=True)
+class DirtyUpdate:
+    """Part of a region to re-render after a local edit.
+
+    ``rect`` is the padded crop to upload, in region coordinates, and
+    ``tiles`` the changed cells relative to ``rect``.
+    """
+
+    rect: TileRect
+    tiles: tuple[TileRect, ...]
+
+
+def changed_tiles(
+    before: ImageBuffer,
+    after: ImageBuffer,
+    tile: int = DIRTY_TILE_SIZE,
+    threshold: int = 0,
+) -> list[TileRect]:
+    """Return the ``tile``-sized cells where any channel moved by more than ``threshold``.
+
+    Both images must be the same size; ``before`` is converted to
+    ``after``'s channel order. Cells on the right and bottom edges are
+    clipped to the image. An exact comparison is a memory compare per row
+    and cell, which beats a NumPy difference; NumPy is only used to measure
+    differences against a non-zero ``threshold``.
+    """
+    if (before.width, before.height) != (after.width, after.height):
+        raise ValueError("images to compare differ in size")
+    if tile <= 0:
+        raise ValueError("tile must be greater than zero")
+    before = before.with_order(after.order)
+    if threshold > 0 and image_buffer.numpy is not None:
+        flags = _changed_cells_numpy(before, after, tile, threshold)
+    else:
+        flags = _changed_cells_python(before, after, tile, threshold)
+    return [
+        TileRect(
+            column * tile,
+            row * tile,
+            min(tile, after.width - column * tile),
+            min(tile, after.height - row * tile),
+        )
+        for row, column in flags
+    ]
+
+
+def plan_dirty_update(
+    tiles: list[TileRect],
+    width: int,
+    height: int,
+    padding: int,
+    max_fraction: float = DIRTY_MAX_FRACTION,
+) -> DirtyUpdate | None:
+    """Cover ``tiles`` with a padded crop of a ``width`` x ``height`` region.
+
+    Returns ``None`` when nothing changed or when the crop would exceed
+    ``max_fraction`` of the region, in which case the caller renders the
+    whole region.
+    """
+    if not tiles:
+        return None
+    left = min(cell.x for cell in tiles)
+    top = min(cell.y for cell in tiles)
+    right = max(cell.x + cell.width for cell in tiles)
+    bottom = max(cell.y + cell.height for cell in tiles)
+    rect = padded_crop(TileRect(left, top, right - left, bottom - top), padding, width, height)
+    if rect.width * rect.height > max_fraction * width * height:
+        return None
+    return DirtyUpdate(
+        rect=rect,
+        tiles=tuple(
+            TileRect(cell.x - rect.x, cell.y - rect.y, cell.width, cell.height)
+            for cell in tiles
+        ),
+    )
+
+
+def dirty_mask(update: DirtyUpdate, feather: int) -> bytearray:
+    """Grayscale8 plane the size of ``update.rect``: the changed cells, feathered."""
+    width, height = update.rect.width, update.rect.height
+    mask = bytearray(width * height)
+    for cell in update.tiles:
+        run = b"\xff" * cell.width
+        for y in range(cell.y, cell.y + cell.height):
+            mask[y * width + cell.x:y * width + cell.x + cell.width] = run
+    return mask_feather(mask, width, height, feather)
+
+
+def _changed_bands(before, after, tile):
+    """Indices of the ``tile``-row bands with any differing byte.
+
+    Equal rows are rejected by a plain memory comparison, which is much
+    cheaper than a per-pixel difference when only a small area changed.
+    Rows are compared as bytes: memoryview equality goes element by element.
+    """
+    return [
+        band
+        for band in range(-(-after.height // tile))
+        if any(
+            before.row(y).tobytes() != after.row(y).tobytes()
+            for y in range(band * tile, min((band + 1) * tile, after.height))
+        )
+    ]
+
+
+def _changed_cells_numpy(before, after, tile, threshold):
+    numpy = image_buffer.numpy
+    columns = -(-after.width // tile)
+    cells = []
+    for band in _changed_bands(before, after, tile):
+        a = before.as_array()[band * tile:(band + 1) * tile]
+        b = after.as_array()[band * tile:(band + 1) * tile]
+        # max - min stays in uint8, unlike a signed difference.
+        difference = (numpy.maximum(a, b) - numpy.minimum(a, b)).max(axis=(0, 2))
+        padded = numpy.zeros(columns * tile, dtype=numpy.uint8)
+        padded[:after.width] = difference
+        changed = padded.reshape(columns, tile).max(axis=1) > threshold
+        cells.extend((band, int(column)) for column in numpy.flatnonzero(changed))
+    return cells
+
+
+def _changed_cells_python(before, after, tile, threshold):
+    cells = []
+    for band in _changed_bands(before, after, tile):
+        rows = range(band * tile, min((band + 1) * tile, after.height))
+        for column in range(-(-after.width // tile)):
+            begin = column * tile * RGBA_BYTES_PER_PIXEL
+            end = min((column + 1) * tile, after.width) * RGBA_BYTES_PER_PIXEL
+            if any(
+                _cell_changed(before.row(y)[begin:end], after.row(y)[begin:end], threshold)
+                for y in rows
+            ):
+                cells.append((band, column))
+    return cells
+
+
+def _cell_changed(cell_before, cell_after, threshold) -> bool:
+    if cell_before.tobytes() == cell_after.tobytes():
+        return False
+    return threshold <= 0 or max(abs(p - q) for p, q in zip(cell_before, cell_after)) > threshold
+
+
+__all__ = [
+    "DIRTY_MAX_FRACTION",
+    "DIRTY_TILE_SIZE",
+    "DirtyUpdate",
+    "changed_tiles",
+    "dirty_mask",
+    "plan_dirty_update",
+]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+def pixel_fingerprint(pixels, width: int, height: int, stride: int, pixel_format) -> tuple:
+    """Return a cache key part identifying a raw pixel buffer and its layout."""
+    digest = hashlib.blake2b(pixels, digest_size=16).digest()
+    return (digest, width, height, stride, pixel_format)
+
+
+class EncodedImageCache:
+    """Size-bounded LRU of encoded images.
+
+    Keys combine a :func:`pixel_fingerprint` with whatever decides the
+    encoding (role and codec policy), so identical pixels sent with the same
+    options are encoded once.
+
+    Values are the encoded strings; their lengths count against
+    ``max_bytes`` and the least recently used entries are evicted first.
+    A single value larger than ``max_bytes`` is returned but not stored.
+    ``hits``, ``misses`` and ``evictions`` count lookups since creation.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, str] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous)
+            self._entries[key] = value
+            self.size_bytes += len(value)
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+
+    def get_or_encode(self, key: Hashable, encode: Callable[[], str]) -> str:
+        """Return the value cached under ``key``, calling ``encode`` on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = encode()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+
+__all__ = ["EncodedImageCache", "pixel_fingerprint"]
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import math
 from dataclasses import dataclass
 from typing import Any, Iterable, Mapping
 
 FORGE_PROCESSING_KEY = "FORGE"
+LATENT_ALIGNMENT = 64
+# How results whose size differs from their target region are resized:
+# with a live Krita transform mask, or by resampling the pixels directly.
+RESULT_RESAMPLING_MODES = ("transform_mask", "bilinear", "bicubic", "lanczos")
 
 
 @dataclass(frozen=True)
@@ -20,6 +25,80 @@ class GenerationPlan:
     output_height: int
     resize: ResizeInstruction | None
 
+    @property
+    def upload_size(self) -> tuple[int, int]:
+        """Size to send images of the output region at.
+
+        The request size when the plan shrinks the region, so the server gets
+        exactly the pixels it will use; otherwise the region's own size, since
+        upscaling before upload only adds bytes.
+        """
+        if self.request_width * self.request_height < self.output_width * self.output_height:
+            return self.request_width, self.request_height
+        return self.output_width, self.output_height
+
+
+@dataclass(frozen=True)
+class TileRect:
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class TileLayout:
+    image_width: int
+    image_height: int
+    tile_width: int
+    tile_height: int
+    overlap_x: int
+    overlap_y: int
+    columns: int
+    rows: int
+    tiles: tuple[TileRect, ...]
+
+    @property
+    def tile_count(self) -> int:
+        return len(self.tiles)
+
+    @property
+    def overlap(self) -> int:
+        """Narrowest overlap between neighbouring tiles, 0 for a single tile."""
+        overlaps = [
+            overlap
+            for overlap, count in (
+                (self.overlap_x, self.columns),
+                (self.overlap_y, self.rows),
+            )
+            if count > 1
+        ]
+        return min(overlaps) if overlaps else 0
+
+
+@dataclass(frozen=True)
+class SeamRefinement:
+    """Settings for the optional seam pass after tiled reconstruction.
+
+    ``band`` is the masked width centred on each seam and ``context`` the
+    unmasked margin kept on both sides so the model sees the surroundings.
+    The mask is grown by ``mask_padding`` and then faded over
+    ``mask_feather`` pixels of that margin, so refined strips blend in.
+    """
+
+    band: int = 64
+    context: int = 64
+    mask_padding: int = 8
+    mask_feather: int = 24
+    denoising_strength: float = 0.3
+    batch_size: int = 4
+
+
+@dataclass(frozen=True)
+class SeamStrip:
+    rect: TileRect
+    band: TileRect  # masked area, relative to ``rect``
+
 
 def build_generation_plan(
     width: int,
@@ -63,6 +142,174 @@ def build_generation_plan(
     )
 
 
+def build_draft_plan(
+    plan: GenerationPlan, scale: float, *, alignment: int = 8,
+) -> GenerationPlan:
+    """Return ``plan`` with its request shrunk by ``scale`` for a quick draft.
+
+    The request sides are rounded to ``alignment`` (never below it) and the
+    output is unchanged, so the draft always carries a resize back to the
+    output size.
+    """
+    if not 0 < scale <= 1:
+        raise ValueError("scale must be in (0, 1]")
+
+    def _scaled(side: int) -> int:
+        return max(round(side * scale / alignment) * alignment, alignment)
+
+    return GenerationPlan(
+        request_width=_scaled(plan.request_width),
+        request_height=_scaled(plan.request_height),
+        output_width=plan.output_width,
+        output_height=plan.output_height,
+        resize=ResizeInstruction(width=plan.output_width, height=plan.output_height),
+    )
+
+
+def draft_steps(steps: int, fraction: float) -> int:
+    """Sampling steps for a draft: ``fraction`` of ``steps``, at least one."""
+    return max(math.ceil(steps * fraction), 1)
+
+
+def build_tile_layout(
+    width: int,
+    height: int,
+    *,
+    min_size: int,
+    max_size: int,
+    min_overlap: int = LATENT_ALIGNMENT,
+    alignment: int = LATENT_ALIGNMENT,
+) -> TileLayout:
+    """Cover a ``width``x``height`` image with the fewest equally sized tiles.
+
+    Each axis is planned independently, so wide or tall images get tiles that
+    follow the image aspect ratio. Tile sides are multiples of ``alignment``
+    (the latent stride) no larger than ``max_size`` and, where the image allows
+    it, no smaller than ``min_size``. Spare coverage is spread evenly over the
+    overlaps instead of leaving a thin sliver tile on the last row or column.
+    """
+    if width <= 0 or height <= 0:
+        raise ValueError("width and height must be greater than zero")
+    if alignment <= 0:
+        raise ValueError("alignment must be greater than zero")
+
+    tile_width, overlap_x, offsets_x = _plan_tile_axis(
+        width,
+        min_size=min_size,
+        max_size=max_size,
+        min_overlap=min_overlap,
+        alignment=alignment,
+    )
+    tile_height, overlap_y, offsets_y = _plan_tile_axis(
+        height,
+        min_size=min_size,
+        max_size=max_size,
+        min_overlap=min_overlap,
+        alignment=alignment,
+    )
+
+    tiles = tuple(
+        TileRect(x=tile_x, y=tile_y, width=tile_width, height=tile_height)
+        for tile_y in offsets_y
+        for tile_x in offsets_x
+    )
+    return TileLayout(
+        image_width=width,
+        image_height=height,
+        tile_width=tile_width,
+        tile_height=tile_height,
+        overlap_x=overlap_x,
+        overlap_y=overlap_y,
+        columns=len(offsets_x),
+        rows=len(offsets_y),
+        tiles=tiles,
+    )
+
+
+def build_seam_strips(
+    layout: TileLayout,
+    *,
+    vertical: bool,
+    band: int = 64,
+    context: int = 64,
+    alignment: int = LATENT_ALIGNMENT,
+) -> tuple[SeamStrip, ...]:
+    """Return narrow strips centred on the internal seams of ``layout``.
+
+    Vertical seams (between columns) get one strip per tile row and
+    horizontal seams one strip per tile column, so every strip spans a single
+    tile length and all strips of one orientation share the same size.
+    """
+    if vertical:
+        seam_count, image_extent, tile_extent = (
+            layout.columns, layout.image_width, layout.tile_width,
+        )
+        across_offsets = sorted({tile.x for tile in layout.tiles})
+        along = sorted({tile.y for tile in layout.tiles})
+        along_extent = layout.tile_height
+    else:
+        seam_count, image_extent, tile_extent = (
+            layout.rows, layout.image_height, layout.tile_height,
+        )
+        across_offsets = sorted({tile.y for tile in layout.tiles})
+        along = sorted({tile.x for tile in layout.tiles})
+        along_extent = layout.tile_width
+
+    if seam_count < 2:
+        return ()
+
+    strip_extent = min(_align_up(band + 2 * context, alignment), image_extent)
+    band_extent = min(band, strip_extent)
+
+    strips: list[SeamStrip] = []
+    for index in range(seam_count - 1):
+        seam = (across_offsets[index + 1] + across_offsets[index] + tile_extent) // 2
+        start = min(max(seam - strip_extent // 2, 0), image_extent - strip_extent)
+        band_start = min(
+            max(seam - start - band_extent // 2, 0), strip_extent - band_extent,
+        )
+        for offset in along:
+            if vertical:
+                rect = TileRect(start, offset, strip_extent, along_extent)
+                band_rect = TileRect(band_start, 0, band_extent, along_extent)
+            else:
+                rect = TileRect(offset, start, along_extent, strip_extent)
+                band_rect = TileRect(0, band_start, along_extent, band_extent)
+            strips.append(SeamStrip(rect=rect, band=band_rect))
+
+    return tuple(strips)
+
+
+def _plan_tile_axis(
+    length: int,
+    *,
+    min_size: int,
+    max_size: int,
+    min_overlap: int,
+    alignment: int,
+) -> tuple[int, int, list[int]]:
+    max_tile = max((max_size // alignment) * alignment, alignment)
+    if length <= max_tile:
+        return length, 0, [0]
+
+    overlap = max(min(min_overlap, max_tile - alignment), 0)
+    count = math.ceil((length - overlap) / (max_tile - overlap))
+
+    tile = _align_up(math.ceil((length + (count - 1) * overlap) / count), alignment)
+    tile = min(max(tile, _align_up(min_size, alignment)), max_tile)
+
+    span = length - tile
+    offsets = [round(index * span / (count - 1)) for index in range(count)]
+    actual_overlap = tile - max(
+        offsets[index + 1] - offsets[index] for index in range(count - 1)
+    )
+    return tile, actual_overlap, offsets
+
+
+def _align_up(value: int, alignment: int) -> int:
+    return -(-value // alignment) * alignment
+
+
 def scale_to_target_min(*, width: int, height: int, min_size: int) -> tuple[int, int]:
     if width <= 0 or height <= 0:
         raise ValueError("width and height must be greater than zero")
@@ -150,9 +397,19 @@ def prune_generation_results(
 
 __all__ = [
     "FORGE_PROCESSING_KEY",
+    "LATENT_ALIGNMENT",
+    "RESULT_RESAMPLING_MODES",
     "GenerationPlan",
     "ResizeInstruction",
+    "SeamRefinement",
+    "SeamStrip",
+    "TileLayout",
+    "TileRect",
+    "build_draft_plan",
     "build_generation_plan",
+    "build_seam_strips",
+    "build_tile_layout",
+    "draft_steps",
     "merge_generation_data",
     "prune_generation_results",
     "scale_to_target_max",
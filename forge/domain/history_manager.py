@@ -8,6 +8,8 @@ import threading
 import logging
 from pathlib import Path
 
+from .streamed_payload import json_default
+
 logger = logging.getLogger(__name__)
 
 # Constants
@@ -182,7 +184,7 @@ class HistoryManager:
         history = history[:MAX_ENTRIES]
 
         with open(self.history_file, "w") as f:
-            json.dump(history, f, indent=4)
+            json.dump(history, f, indent=4, default=json_default)
 
     def save_generation_async(self, data: dict, image_data_b64: str):
         """Save a generation with an async thumbnail write (non-blocking).
@@ -0,0 +1,444 @@
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from .generation_plan import TileRect
+from .pixel_buffer import RGBA_BYTES_PER_PIXEL, channel_plane
+from .png_stream import bgra_to_rgba
+
+try:
+    import numpy
+except ImportError:  # Krita's bundled Python usually ships without NumPy.
+    numpy = None
+
+# Byte order of the four channels in memory. QImage's RGBA8888 is "RGBA";
+# Krita pixel data and QImage ARGB32 on little-endian machines are "BGRA".
+CHANNEL_ORDERS = ("RGBA", "BGRA")
+
+_SINGLE_COVERAGE = re.compile(b"\x01+")
+_MULTI_COVERAGE = re.compile(b"[\x02-\xff]+")
+_INCREMENT = bytes(min(value + 1, 255) for value in range(256))
+
+
+@dataclass
+class ImageBuffer:
+    """Four-channel 8-bit pixels with their size, row stride and byte order.
+
+    ``pixels`` is any bytes-like object and is never copied on construction,
+    so a buffer can be a view over a QImage or Krita pixel data; ``owner``
+    keeps such foreign memory alive. Operations use NumPy when it is
+    installed and fall back to slicing in pure Python otherwise; both give
+    identical results.
+    """
+
+    pixels: Any
+    width: int
+    height: int
+    stride: int = 0
+    order: str = "RGBA"
+    owner: Any = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.width < 0 or self.height < 0:
+            raise ValueError("image size must not be negative")
+        if self.order not in CHANNEL_ORDERS:
+            raise ValueError(f"unknown channel order: {self.order!r}")
+        if not self.stride:
+            self.stride = self.row_bytes
+        if self.stride < self.row_bytes:
+            raise ValueError("stride is shorter than a row")
+        needed = self.stride * (self.height - 1) + self.row_bytes if self.height else 0
+        if len(self.pixels) < needed:
+            raise ValueError("pixel buffer is smaller than the image")
+
+    @classmethod
+    def blank(cls, width: int, height: int, order: str = "RGBA") -> "ImageBuffer":
+        """Return a fully transparent, writable buffer."""
+        return cls(bytearray(width * height * RGBA_BYTES_PER_PIXEL), width, height, order=order)
+
+    @property
+    def row_bytes(self) -> int:
+        return self.width * RGBA_BYTES_PER_PIXEL
+
+    def row(self, y: int) -> memoryview:
+        offset = y * self.stride
+        return memoryview(self.pixels)[offset:offset + self.row_bytes]
+
+    def tobytes(self) -> bytes:
+        """Return the pixels tightly packed (stride equal to the row size)."""
+        if self.stride == self.row_bytes:
+            return bytes(memoryview(self.pixels)[:self.row_bytes * self.height])
+        return b"".join(self.row(y) for y in range(self.height))
+
+    def as_array(self):
+        """Return a ``(height, width, 4)`` uint8 NumPy view of the pixels."""
+        if numpy is None:
+            raise RuntimeError("NumPy is not installed")
+        return numpy.ndarray(
+            (self.height, self.width, RGBA_BYTES_PER_PIXEL),
+            dtype=numpy.uint8,
+            buffer=self.pixels,
+            strides=(self.stride, RGBA_BYTES_PER_PIXEL, 1),
+        )
+
+    @classmethod
+    def from_array(cls, pixels, order: str = "RGBA") -> "ImageBuffer":
+        height, width = pixels.shape[:2]
+        return cls(bytearray(numpy.ascontiguousarray(pixels, dtype=numpy.uint8)), width, height, order=order)
+
+    def copy(self) -> "ImageBuffer":
+        return ImageBuffer(bytearray(self.tobytes()), self.width, self.height, order=self.order)
+
+    def crop(self, rect: TileRect) -> "ImageBuffer":
+        """Return a packed copy of ``rect``, clipped to the image."""
+        rect = _clip(rect, self.width, self.height)
+        begin = rect.x * RGBA_BYTES_PER_PIXEL
+        end = begin + rect.width * RGBA_BYTES_PER_PIXEL
+        view = memoryview(self.pixels)
+        pixels = bytearray(b"".join(
+            view[row * self.stride + begin:row * self.stride + end]
+            for row in range(rect.y, rect.y + rect.height)
+        ))
+        return ImageBuffer(pixels, rect.width, rect.height, order=self.order)
+
+    def paste(self, source: "ImageBuffer", x: int, y: int) -> None:
+        """Copy ``source`` over this buffer at ``x``, ``y``, clipped to the image."""
+        target = _clip(TileRect(x, y, source.width, source.height), self.width, self.height)
+        if not target.width or not target.height:
+            return
+        source = source.with_order(self.order)
+        source_begin = (target.x - x) * RGBA_BYTES_PER_PIXEL
+        length = target.width * RGBA_BYTES_PER_PIXEL
+        target_begin = target.x * RGBA_BYTES_PER_PIXEL
+        for offset in range(target.height):
+            source_row = (target.y - y + offset) * source.stride + source_begin
+            target_row = (target.y + offset) * self.stride + target_begin
+            self.pixels[target_row:target_row + length] = (
+                memoryview(source.pixels)[source_row:source_row + length]
+            )
+
+    def resize(self, width: int, height: int) -> "ImageBuffer":
+        """Return a nearest-neighbour resize to ``width`` x ``height``."""
+        columns = [min(int((x + 0.5) * self.width / width), self.width - 1) for x in range(width)]
+        rows = [min(int((y + 0.5) * self.height / height), self.height - 1) for y in range(height)]
+        if numpy is not None:
+            resized = self.as_array()[numpy.array(rows)[:, None], numpy.array(columns)[None, :]]
+            return ImageBuffer.from_array(resized, self.order)
+
+        out_rows: list[bytes] = []
+        previous_row, previous_bytes = None, b""
+        for source_row in rows:
+            if source_row != previous_row:
+                line = self.row(source_row)
+                previous_bytes = b"".join(
+                    line[column * RGBA_BYTES_PER_PIXEL:(column + 1) * RGBA_BYTES_PER_PIXEL]
+                    for column in columns
+                )
+                previous_row = source_row
+            out_rows.append(previous_bytes)
+        return ImageBuffer(bytearray(b"".join(out_rows)), width, height, order=self.order)
+
+    def resample(self, width: int, height: int, method: str = "bilinear") -> "ImageBuffer":
+        """Return a filtered resize to ``width`` x ``height``.
+
+        ``method`` is ``"bilinear"``, ``"bicubic"`` or ``"lanczos"`` (3 lobes).
+        Filters are widened when downscaling, and colour is averaged with
+        premultiplied alpha so transparent pixels do not bleed. Needs NumPy;
+        raises ``RuntimeError`` without it.
+        """
+        if method not in _RESAMPLING_KERNELS:
+            raise ValueError(f"unknown resampling method: {method!r}")
+        if numpy is None:
+            raise RuntimeError("NumPy is not installed")
+        if (width, height) == (self.width, self.height):
+            return self.copy()
+
+        support, kernel = _RESAMPLING_KERNELS[method]
+        rows, row_weights = _axis_weights(self.height, height, support, kernel)
+        columns, column_weights = _axis_weights(self.width, width, support, kernel)
+        pixels = _resample_axis(_premultiplied(self.as_array()), columns, column_weights, 1)
+        pixels = _resample_axis(pixels, rows, row_weights, 0)
+        return ImageBuffer.from_array(_unpremultiplied(pixels), self.order)
+
+    def alpha(self) -> bytes:
+        """Return the alpha channel as a packed Grayscale8 plane."""
+        return channel_plane(self.pixels, self.width, self.height, self.stride, 3)
+
+    def with_order(self, order: str) -> "ImageBuffer":
+        """Return this buffer in ``order``, swapping red and blue if needed."""
+        if order == self.order:
+            return self
+        if order not in CHANNEL_ORDERS:
+            raise ValueError(f"unknown channel order: {order!r}")
+        return ImageBuffer(bgra_to_rgba(self.tobytes()), self.width, self.height, order=order)
+
+
+class StripResampler:
+    """Filtered resize of an image that arrives in horizontal strips, top first.
+
+    Each output row is filtered from source rows on both sides of it, so a
+    strip boundary falling inside the filter support would leave a seam if
+    strips were resized on their own. The resampler keeps the few
+    column-resampled rows that the next output rows still need from earlier
+    strips; the output, however the input is cut into strips, is identical
+    to :meth:`ImageBuffer.resample` of the whole image. Needs NumPy; raises
+    ``RuntimeError`` without it.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        out_width: int,
+        out_height: int,
+        method: str = "bilinear",
+    ) -> None:
+        if method not in _RESAMPLING_KERNELS:
+            raise ValueError(f"unknown resampling method: {method!r}")
+        if numpy is None:
+            raise RuntimeError("NumPy is not installed")
+        support, kernel = _RESAMPLING_KERNELS[method]
+        self.width = width
+        self.height = height
+        self._rows, self._row_weights = _axis_weights(height, out_height, support, kernel)
+        self._columns, self._column_weights = _axis_weights(width, out_width, support, kernel)
+        # Source rows past which each output row needs nothing.
+        self._first_row = self._rows.min(axis=1)
+        self._last_row = self._rows.max(axis=1)
+        self._pending = numpy.zeros((0, out_width, RGBA_BYTES_PER_PIXEL), numpy.float32)
+        self._pending_start = 0
+        self._next_row = 0
+
+    def feed(self, strip: "ImageBuffer") -> "ImageBuffer":
+        """Add the next ``strip`` of source rows; return the output rows now complete.
+
+        The returned buffer may have no rows when the strip does not finish
+        any output row yet. All output rows are returned once the last
+        source row has been fed.
+        """
+        if strip.width != self.width:
+            raise ValueError("strip width does not match the image")
+        columns = _resample_axis(
+            _premultiplied(strip.as_array()), self._columns, self._column_weights, 1,
+        )
+        self._pending = numpy.concatenate((self._pending, columns))
+        received = self._pending_start + len(self._pending)
+
+        ready = int(numpy.searchsorted(self._last_row, received, side="left"))
+        begin, self._next_row = self._next_row, max(ready, self._next_row)
+        out_width = self._pending.shape[1]
+        if begin == self._next_row:
+            return ImageBuffer(bytearray(), out_width, 0, order=strip.order)
+
+        rows = self._rows[begin:self._next_row] - self._pending_start
+        pixels = _resample_axis(self._pending, rows, self._row_weights[begin:self._next_row], 0)
+        if self._next_row < len(self._rows):
+            # Rows above the next output row's support are no longer needed.
+            keep_from = int(self._first_row[self._next_row])
+            self._pending = self._pending[keep_from - self._pending_start:]
+            self._pending_start = keep_from
+        else:
+            self._pending = self._pending[:0]
+        return ImageBuffer.from_array(_unpremultiplied(pixels), strip.order)
+
+
+def edge_ramp(length: int, fade_start: bool, fade_end: bool, margin: int) -> list[float]:
+    """Per-pixel weights along one tile axis, ramping up over ``margin`` pixels.
+
+    Only the ends that border another tile fade; image borders keep full
+    weight so the outermost pixels are never dropped.
+    """
+    weights = []
+    for index in range(length):
+        weight = 1.0
+        if fade_start:
+            weight = min(weight, (index + 1) / (margin + 1))
+        if fade_end:
+            weight = min(weight, (length - index) / (margin + 1))
+        weights.append(weight)
+    return weights
+
+
+def blend_tiles(
+    tiles: Iterable[tuple[TileRect, ImageBuffer]],
+    width: int,
+    height: int,
+    margin: int,
+    order: str = "RGBA",
+) -> ImageBuffer:
+    """Assemble overlapping tiles into one image with feathered seams.
+
+    Each tile is weighted by :func:`edge_ramp` on the sides it shares with
+    the image interior and the overlaps are the weighted average. Pixels
+    covered by a single tile are copied unchanged.
+    """
+    placed = []
+    for rect, tile in tiles:
+        clipped = _clip(
+            TileRect(rect.x, rect.y, min(rect.width, tile.width), min(rect.height, tile.height)),
+            width,
+            height,
+        )
+        if clipped.width and clipped.height:
+            placed.append((clipped, tile.with_order(order)))
+
+    if numpy is not None:
+        return _blend_tiles_numpy(placed, width, height, margin, order)
+    return _blend_tiles_python(placed, width, height, margin, order)
+
+
+def _tile_weights(rect: TileRect, width: int, height: int, margin: int):
+    return (
+        edge_ramp(rect.width, rect.x > 0, rect.x + rect.width < width, margin),
+        edge_ramp(rect.height, rect.y > 0, rect.y + rect.height < height, margin),
+    )
+
+
+def _blend_tiles_numpy(placed, width, height, margin, order) -> ImageBuffer:
+    total = numpy.zeros((height, width, RGBA_BYTES_PER_PIXEL), dtype=numpy.float64)
+    weight_sum = numpy.zeros((height, width, 1), dtype=numpy.float64)
+    for rect, tile in placed:
+        weights_x, weights_y = _tile_weights(rect, width, height, margin)
+        weights = numpy.outer(
+            numpy.array(weights_y, dtype=numpy.float64),
+            numpy.array(weights_x, dtype=numpy.float64),
+        )[:, :, None]
+        pixels = tile.as_array()[:rect.height, :rect.width].astype(numpy.float64)
+        window = (slice(rect.y, rect.y + rect.height), slice(rect.x, rect.x + rect.width))
+        total[window] += pixels * weights
+        weight_sum[window] += weights
+
+    covered = weight_sum > 0
+    result = numpy.divide(total, weight_sum, out=numpy.zeros_like(total), where=covered)
+    return ImageBuffer.from_array(numpy.floor(result + 0.5).astype(numpy.uint8), order)
+
+
+def _blend_tiles_python(placed, width, height, margin, order) -> ImageBuffer:
+    result = ImageBuffer.blank(width, height, order)
+    coverage = bytearray(width * height)
+    for rect, _ in placed:
+        for row in range(rect.y, rect.y + rect.height):
+            begin = row * width + rect.x
+            coverage[begin:begin + rect.width] = coverage[begin:begin + rect.width].translate(_INCREMENT)
+
+    # Single-coverage runs are copied with slices; only overlaps need math.
+    totals: dict[int, list[float]] = {}
+    for rect, tile in placed:
+        weights_x, weights_y = _tile_weights(rect, width, height, margin)
+        for offset in range(rect.height):
+            row = rect.y + offset
+            counts = bytes(coverage[row * width + rect.x:row * width + rect.x + rect.width])
+            source = tile.row(offset)
+            target = row * result.stride + rect.x * RGBA_BYTES_PER_PIXEL
+            for run in _SINGLE_COVERAGE.finditer(counts):
+                begin, end = run.start() * RGBA_BYTES_PER_PIXEL, run.end() * RGBA_BYTES_PER_PIXEL
+                result.pixels[target + begin:target + end] = source[begin:end]
+            for run in _MULTI_COVERAGE.finditer(counts):
+                for column in range(run.start(), run.end()):
+                    weight = weights_x[column] * weights_y[offset]
+                    entry = totals.setdefault(row * width + rect.x + column, [0.0] * 5)
+                    pixel = source[column * RGBA_BYTES_PER_PIXEL:(column + 1) * RGBA_BYTES_PER_PIXEL]
+                    for channel in range(RGBA_BYTES_PER_PIXEL):
+                        entry[channel] += pixel[channel] * weight
+                    entry[4] += weight
+
+    for index, entry in totals.items():
+        weight = entry[4]
+        offset = index * RGBA_BYTES_PER_PIXEL
+        result.pixels[offset:offset + RGBA_BYTES_PER_PIXEL] = bytes(
+            min(int(entry[channel] / weight + 0.5), 255) for channel in range(RGBA_BYTES_PER_PIXEL)
+        )
+    return result
+
+
+def _triangle(x):
+    return numpy.maximum(1.0 - numpy.abs(x), 0.0)
+
+
+def _cubic(x):
+    # Keys' cubic convolution with a = -0.5 (Catmull-Rom).
+    x = numpy.abs(x)
+    near = (1.5 * x - 2.5) * x * x + 1.0
+    far = ((-0.5 * x + 2.5) * x - 4.0) * x + 2.0
+    return numpy.where(x < 1.0, near, numpy.where(x < 2.0, far, 0.0))
+
+
+def _lanczos3(x):
+    return numpy.where(numpy.abs(x) < 3.0, numpy.sinc(x) * numpy.sinc(x / 3.0), 0.0)
+
+
+_RESAMPLING_KERNELS = {
+    "bilinear": (1.0, _triangle),
+    "bicubic": (2.0, _cubic),
+    "lanczos": (3.0, _lanczos3),
+}
+
+
+def _axis_weights(in_size: int, out_size: int, support: float, kernel):
+    """Return source indices and normalised weights, one row per output pixel."""
+    scale = in_size / out_size
+    filter_scale = max(scale, 1.0)
+    radius = support * filter_scale
+    taps = math.ceil(radius) * 2 + 1
+    centers = (numpy.arange(out_size) + 0.5) * scale
+    first = numpy.floor(centers - radius).astype(numpy.int64)
+    indices = first[:, None] + numpy.arange(taps)[None, :]
+    weights = kernel((indices + 0.5 - centers[:, None]) / filter_scale)
+    # Samples past the edge repeat the edge pixel.
+    indices = numpy.clip(indices, 0, in_size - 1)
+    weights /= weights.sum(axis=1, keepdims=True)
+    return indices, weights.astype(numpy.float32)
+
+
+def _premultiplied(pixels):
+    pixels = pixels.astype(numpy.float32)
+    pixels[:, :, :3] *= pixels[:, :, 3:] / 255.0
+    return pixels
+
+
+def _unpremultiplied(pixels):
+    alpha = numpy.clip(pixels[:, :, 3:], 0.0, 255.0) / 255.0
+    numpy.divide(pixels[:, :, :3], alpha, out=pixels[:, :, :3], where=alpha > 0)
+    return numpy.floor(numpy.clip(pixels, 0.0, 255.0) + 0.5).astype(numpy.uint8)
+
+
+def _resample_axis(pixels, indices, weights, axis: int):
+    # One pass per tap keeps memory at a few output-sized float planes.
+    shape = (-1, 1, 1) if axis == 0 else (1, -1, 1)
+    result = None
+    for tap in range(indices.shape[1]):
+        taken = numpy.take(pixels, indices[:, tap], axis=axis)
+        term = taken * weights[:, tap].reshape(shape)
+        result = term if result is None else result + term
+    return result
+
+
+def _clip(rect: TileRect, width: int, height: int) -> TileRect:
+    left = min(max(rect.x, 0), width)
+    top = min(max(rect.y, 0), height)
+    right = min(max(rect.x + rect.width, left), width)
+    bottom = min(max(rect.y + rect.height, top), height)
+    return TileRect(left, top, right - left, bottom - top)
+
+
+def resampling_supported(method: str) -> bool:
+    """Return whether the ``method`` filter can run in this interpreter.
+
+    Bicubic and Lanczos need NumPy; Qt's smooth scaling stands in for
+    bilinear. Modes that are not filters, such as ``"transform_mask"``,
+    are always supported.
+    """
+    return method == "bilinear" or method not in _RESAMPLING_KERNELS or numpy is not None
+
+
+__all__ = [
+    "CHANNEL_ORDERS",
+    "ImageBuffer",
+    "StripResampler",
+    "blend_tiles",
+    "edge_ramp",
+    "resampling_supported",
+]
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+PNG_MAX_COMPRESSION = 9
+
+# What an uploaded image is used for; each role gets its own encoding.
+IMAGE_ROLE_INIT = "init"
+IMAGE_ROLE_MASK = "mask"
+IMAGE_ROLE_CONTROL = "control"
+IMAGE_ROLES = (IMAGE_ROLE_INIT, IMAGE_ROLE_MASK, IMAGE_ROLE_CONTROL)
+
+
+@dataclass(frozen=True)
+class ImageEncoding:
+    """Arguments for ``QImage.save``: format name, quality and bit depth.
+
+    ``mono`` asks for a 1-bit image; it is only set for binary masks.
+    """
+
+    fmt: str = "PNG"
+    quality: int = -1
+    mono: bool = False
+
+
+@dataclass(frozen=True)
+class UploadCodecPolicy:
+    """How each image role is encoded before it is sent to the server.
+
+    Masks are PNG at ``mask_png_compression``, written 1-bit when they are
+    binary and ``mono_masks`` is on. Init images are PNG at
+    ``png_compression``, or lossless WebP when ``lossless_webp`` is on and Qt
+    can write it. ControlNet and reference inputs follow the init images
+    unless ``control_jpeg_quality`` (1-100) opts them into JPEG.
+    """
+
+    png_compression: int = 3
+    mask_png_compression: int = 1
+    mono_masks: bool = True
+    lossless_webp: bool = False
+    control_jpeg_quality: int = 0
+    stream_min_megapixels: float = 64.0
+
+    @classmethod
+    def from_settings(cls, get: Callable[[str], Any]) -> "UploadCodecPolicy":
+        """Build a policy from ``uploads.*`` settings read through ``get``."""
+        return cls(
+            png_compression=int(get("uploads.png_compression")),
+            mask_png_compression=int(get("uploads.mask_png_compression")),
+            mono_masks=bool(get("uploads.mono_masks")),
+            lossless_webp=bool(get("uploads.lossless_webp")),
+            control_jpeg_quality=int(get("uploads.control_jpeg_quality")),
+            stream_min_megapixels=float(get("uploads.stream_min_megapixels")),
+        )
+
+    def should_stream(self, width: int, height: int) -> bool:
+        """Return whether a ``width`` x ``height`` upload should be streamed."""
+        return (
+            self.stream_min_megapixels > 0
+            and width * height >= self.stream_min_megapixels * 1_000_000
+        )
+
+    def encoding_for(
+        self,
+        role: str,
+        writable_formats: Iterable[str] = ("PNG",),
+        binary_mask: bool = False,
+    ) -> ImageEncoding:
+        """Return the encoding for an image of ``role``.
+
+        ``writable_formats`` are the upper-case format names the image writer
+        supports; formats missing from it fall back to PNG.
+        """
+        if role not in IMAGE_ROLES:
+            raise ValueError(f"unknown image role: {role!r}")
+        writable = {name.upper() for name in writable_formats}
+
+        if role == IMAGE_ROLE_MASK:
+            return ImageEncoding(
+                "PNG",
+                png_quality_for_compression(self.mask_png_compression),
+                mono=self.mono_masks and binary_mask,
+            )
+        if role == IMAGE_ROLE_CONTROL and self.control_jpeg_quality > 0 and "JPEG" in writable:
+            return ImageEncoding("JPEG", max(1, min(self.control_jpeg_quality, 100)))
+        if self.lossless_webp and "WEBP" in writable:
+            # Qt's WebP writer switches to lossless mode at quality 100.
+            return ImageEncoding("WEBP", 100)
+        return ImageEncoding("PNG", png_quality_for_compression(self.png_compression))
+
+
+def png_quality_for_compression(level: int) -> int:
+    """Map a zlib compression level (0-9) to Qt's PNG ``quality`` argument.
+
+    Qt derives the PNG compression as ``(100 - quality) * 9 / 91`` in integer
+    arithmetic, so this returns the highest quality value producing ``level``.
+    """
+    level = max(0, min(int(level), PNG_MAX_COMPRESSION))
+    return max(0, min(100, 100 - math.ceil(level * 91 / 9)))
+
+
+__all__ = [
+    "IMAGE_ROLES",
+    "IMAGE_ROLE_CONTROL",
+    "IMAGE_ROLE_INIT",
+    "IMAGE_ROLE_MASK",
+    "PNG_MAX_COMPRESSION",
+    "ImageEncoding",
+    "UploadCodecPolicy",
+    "png_quality_for_compression",
+]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Hashable
+
+LIVE_IDLE = "idle"
+LIVE_SUBMIT = "submit"
+LIVE_CANCEL = "cancel"
+
+
+@dataclass(frozen=True)
+class LiveTicket:
+    token: int
+    state: Hashable
+    submitted_at: float
+
+
+class LivePaintScheduler:
+    """Turn polled canvas states into at most one live request at a time.
+
+    ``poll`` is fed the current state of the watched region (anything
+    comparable, e.g. a document revision) and answers with what to do:
+    ``LIVE_SUBMIT`` once the state has been unchanged for ``idle_seconds``
+    and differs from the last one generated, ``LIVE_CANCEL`` once when the
+    state moves away from the request in flight, ``LIVE_IDLE`` otherwise.
+    Edits never queue: after a cancel the next submit carries the newest
+    state only.
+    """
+
+    def __init__(self, idle_seconds: float = 0.3) -> None:
+        self.idle_seconds = idle_seconds
+        self._next_token = 0
+        self.reset()
+
+    @property
+    def in_flight(self) -> LiveTicket | None:
+        return self._in_flight
+
+    def poll(self, state: Hashable, now: float) -> str:
+        if state != self._seen or self._changed_at is None:
+            self._seen = state
+            self._changed_at = now
+
+        if self._in_flight is not None:
+            if not self._cancelled and state != self._in_flight.state:
+                self._cancelled = True
+                return LIVE_CANCEL
+            return LIVE_IDLE
+
+        if state == self._generated or now - self._changed_at < self.idle_seconds:
+            return LIVE_IDLE
+        return LIVE_SUBMIT
+
+    def submit(self, state: Hashable, now: float) -> LiveTicket:
+        self._next_token += 1
+        self._in_flight = LiveTicket(self._next_token, state, now)
+        self._cancelled = False
+        self._generated = state
+        return self._in_flight
+
+    def finish(self, token: int, now: float) -> float | None:
+        """Close request ``token``; return its round trip if still current.
+
+        ``None`` means the result is stale (the region changed, the request
+        was cancelled, or the scheduler was reset) and should be dropped.
+        """
+        ticket = self._in_flight
+        if ticket is None or ticket.token != token:
+            return None
+        self._in_flight = None
+        if self._cancelled or ticket.state != self._seen:
+            # Forget it so that returning to this exact state generates again.
+            self._generated = None
+            return None
+        return now - ticket.submitted_at
+
+    def reset(self) -> None:
+        self._seen: Hashable | None = None
+        self._changed_at: float | None = None
+        self._generated: Hashable | None = None
+        self._in_flight: LiveTicket | None = None
+        self._cancelled = False
+
+
+__all__ = [
+    "LIVE_CANCEL",
+    "LIVE_IDLE",
+    "LIVE_SUBMIT",
+    "LivePaintScheduler",
+    "LiveTicket",
+]
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import ctypes
+from collections import deque
+
+from .generation_plan import TileRect
+
+try:
+    import numpy
+except ImportError:  # Krita's bundled Python usually ships without NumPy.
+    numpy = None
+
+# Masks are Grayscale8 planes (one byte per pixel, stride = width) held in
+# a bytearray and modified in place. Grow, shrink and feather keep grey
+# levels: grow and shrink are separable square max/min filters and feather
+# is a separable box blur run twice. They use NumPy when it is installed.
+# Without it, each row is packed into one Python int with a fixed-width
+# lane per pixel, so a max, min or running sum over a whole row is a few
+# C-level big-int operations; columns are processed the same way after a
+# bytes-slicing transpose. Both give identical results.
+
+_INVERT = bytes(255 - value for value in range(256))
+
+
+def mask_fill(mask: bytearray, value: int = 255) -> bytearray:
+    """Set every pixel of ``mask`` to ``value`` without allocating."""
+    if mask:
+        ctypes.memset((ctypes.c_char * len(mask)).from_buffer(mask), value, len(mask))
+    return mask
+
+
+def mask_clear(mask: bytearray) -> bytearray:
+    return mask_fill(mask, 0)
+
+
+def mask_invert(mask: bytearray) -> bytearray:
+    mask[:] = mask.translate(_INVERT)
+    return mask
+
+
+def mask_threshold(mask: bytearray, level: int = 128) -> bytearray:
+    """Make ``mask`` binary: 255 where a pixel is at least ``level``, else 0."""
+    mask[:] = mask.translate(_threshold_table(level))
+    return mask
+
+
+def is_binary_mask(mask) -> bool:
+    """Return whether every pixel of ``mask`` is either 0 or 255."""
+    return not bytes(mask).translate(None, b"\x00\xff")
+
+
+def mask_grow(mask: bytearray, width: int, height: int, radius: int) -> bytearray:
+    """Dilate the mask by a square of ``radius`` pixels (a max filter)."""
+    return _rank_filter(mask, width, height, radius, max, 0)
+
+
+def mask_shrink(mask: bytearray, width: int, height: int, radius: int) -> bytearray:
+    """Erode the mask by a square of ``radius`` pixels (a min filter).
+
+    Pixels outside the image count as masked, so a mask touching the border
+    does not shrink away from it.
+    """
+    return _rank_filter(mask, width, height, radius, min, 255)
+
+
+def mask_feather(mask: bytearray, width: int, height: int, radius: int) -> bytearray:
+    """Soften the mask edge into a smooth ramp about ``2 * radius`` pixels wide.
+
+    Two box blurs whose radii add up to ``radius`` give a piecewise quadratic
+    ramp; grey levels of soft masks are blurred, not thresholded. Pixels
+    outside the image repeat the nearest edge pixel.
+    """
+    first = radius // 2
+    for pass_radius in (first, radius - first):
+        _box_blur(mask, width, height, pass_radius)
+    return mask
+
+
+def alpha_to_bgra(alpha, out: bytearray | None = None) -> bytearray:
+    """Write ``alpha`` as the alpha of opaque-white BGRA pixels into ``out``.
+
+    ``out`` is reused when it has the right size, so repeated conversions of
+    same-sized masks allocate nothing.
+    """
+    size = len(alpha) * 4
+    if out is None or len(out) != size:
+        out = bytearray(size)
+    mask_fill(out)
+    out[3::4] = alpha
+    return out
+
+
+def mask_bounds(
+    mask,
+    width: int,
+    height: int,
+    stride: int | None = None,
+) -> TileRect | None:
+    """Return the tight bounding box of non-zero pixels, or ``None`` if empty."""
+    stride = width if stride is None else stride
+    top = bottom = None
+    left, right = width, 0
+    for row in range(height):
+        line = bytes(mask[row * stride:row * stride + width])
+        trimmed = line.lstrip(b"\x00")
+        if not trimmed:
+            continue
+        if top is None:
+            top = row
+        bottom = row
+        left = min(left, width - len(trimmed))
+        right = max(right, len(line.rstrip(b"\x00")))
+
+    if top is None:
+        return None
+    return TileRect(left, top, right - left, bottom - top + 1)
+
+
+def padded_crop(
+    bounds: TileRect,
+    padding: int,
+    width: int,
+    height: int,
+    alignment: int = 8,
+) -> TileRect:
+    """Grow ``bounds`` by ``padding`` and round its size up to ``alignment``.
+
+    The result is clipped to the image; when the aligned size does not fit it
+    is shifted back inside, and only clipped when larger than the image.
+    """
+    left = max(bounds.x - padding, 0)
+    top = max(bounds.y - padding, 0)
+    right = min(bounds.x + bounds.width + padding, width)
+    bottom = min(bounds.y + bounds.height + padding, height)
+
+    crop_width = min(_round_up(right - left, alignment), width)
+    crop_height = min(_round_up(bottom - top, alignment), height)
+    left = min(left, width - crop_width)
+    top = min(top, height - crop_height)
+    return TileRect(left, top, crop_width, crop_height)
+
+
+def _round_up(value: int, alignment: int) -> int:
+    if alignment <= 1:
+        return value
+    return -(-value // alignment) * alignment
+
+
+def _threshold_table(level: int) -> bytes:
+    return bytes(255 if value >= level else 0 for value in range(256))
+
+
+def _rank_filter(mask, width, height, radius, reduce, outside):
+    if radius <= 0 or not width or not height:
+        return mask
+    if numpy is not None:
+        plane = numpy.frombuffer(mask, numpy.uint8).reshape(height, width)
+        plane = _sliding_array(plane, radius, reduce, outside, axis=1)
+        mask[:] = _sliding_array(plane, radius, reduce, outside, axis=0).tobytes()
+        return mask
+
+    plane = _rank_columns(bytes(mask), width, height, radius, reduce, outside)
+    plane = _rank_columns(_transpose(plane, width, height), height, width, radius, reduce, outside)
+    mask[:] = _transpose(plane, height, width)
+    return mask
+
+
+def _rank_columns(plane: bytes, width, height, radius, reduce, outside) -> bytes:
+    """Max or min over ``2 * radius + 1`` rows around each row, by doubling."""
+    lanes = _RowLanes(width, 2)
+    fill = lanes.spread(outside)
+    rows = [fill] * radius + [lanes.widen(row) for row in _split_rows(plane, width, height)]
+    rows += [fill] * radius
+    covered, window = 1, 2 * radius + 1
+    while covered < window:
+        step = min(covered, window - covered)
+        # Ascending, so rows[index + step] still holds the previous pass.
+        for index in range(len(rows) - step):
+            rows[index] = lanes.select(rows[index], rows[index + step], reduce is max)
+        del rows[len(rows) - step:]
+        covered += step
+    return b"".join(lanes.narrow(row) for row in rows)
+
+
+def _sliding_array(plane, radius, reduce, outside, axis):
+    ufunc = numpy.maximum if reduce is max else numpy.minimum
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (radius, radius)
+    padded = numpy.pad(plane, pad, constant_values=outside)
+    length = padded.shape[axis]
+    covered, window = 1, 2 * radius + 1
+    while covered < window:
+        step = min(covered, window - covered)
+        head = [slice(None), slice(None)]
+        tail = [slice(None), slice(None)]
+        head[axis] = slice(0, length - step)
+        tail[axis] = slice(step, length)
+        # Written in place over the leading part of the padded buffer.
+        ufunc(padded[tuple(head)], padded[tuple(tail)], out=padded[tuple(head)])
+        length -= step
+        covered += step
+    keep = [slice(None), slice(None)]
+    keep[axis] = slice(0, length)
+    return padded[tuple(keep)]
+
+
+def _box_blur(mask, width, height, radius):
+    if radius <= 0 or not width or not height:
+        return
+    window = 2 * radius + 1
+    half = window // 2
+    if numpy is not None:
+        plane = numpy.frombuffer(mask, numpy.uint8).reshape(height, width)
+        for axis in (1, 0):
+            pad = [(0, 0), (0, 0)]
+            pad[axis] = (radius + 1, radius)
+            sums = numpy.pad(plane, pad, mode="edge").astype(numpy.uint32)
+            head = [slice(None), slice(None)]
+            head[axis] = slice(0, 1)
+            sums[tuple(head)] = 0
+            numpy.cumsum(sums, axis=axis, out=sums)
+            upper = [slice(None), slice(None)]
+            lower = [slice(None), slice(None)]
+            upper[axis] = slice(window, None)
+            lower[axis] = slice(0, -window)
+            plane = ((sums[tuple(upper)] - sums[tuple(lower)] + half) // window).astype(numpy.uint8)
+        mask[:] = plane.tobytes()
+        return
+
+    # Horizontal first, as above, so both backends round identically.
+    plane = _box_columns(_transpose(bytes(mask), width, height), height, width, radius)
+    mask[:] = _box_columns(_transpose(plane, height, width), width, height, radius)
+
+
+def _box_columns(plane: bytes, width, height, radius) -> bytes:
+    """Rounded mean of ``2 * radius + 1`` rows around each row, edges repeated."""
+    window = 2 * radius + 1
+    # Each lane holds a window sum times the fixed-point reciprocal ``scale``;
+    # its top byte is then exactly the rounded mean. Four-byte lanes are
+    # exact for windows below 256 rows, wider ones need eight.
+    lane_bytes = 4 if window < 256 else 8
+    shift = 8 * lane_bytes - 8
+    lanes = _RowLanes(width, lane_bytes)
+    scale = -(-(1 << shift) // window)
+    half = lanes.spread(window // 2)
+    rows = _split_rows(plane, width, height)
+    first, last = lanes.widen(rows[0]), lanes.widen(rows[-1])
+
+    # Widened rows inside the window, oldest first; edges repeat.
+    ring = deque([first] * radius)
+    for index in range(radius + 1):
+        ring.append(lanes.widen(rows[index]) if index < height else last)
+    total = sum(ring)
+    out = []
+    for y in range(height):
+        out.append(lanes.narrow((total + half) * scale, lane_bytes - 1))
+        incoming = y + radius + 1
+        ring.append(lanes.widen(rows[incoming]) if incoming < height else last)
+        total += ring[-1] - ring.popleft()
+    return b"".join(out)
+
+
+def _split_rows(plane: bytes, width: int, height: int) -> list[bytes]:
+    return [plane[start:start + width] for start in range(0, width * height, width)]
+
+
+def _transpose(plane: bytes, width: int, height: int) -> bytes:
+    # Column c is the strided slice plane[c::width]; each is one C-level copy.
+    return b"".join(plane[column::width] for column in range(width))
+
+
+class _RowLanes:
+    """Pack a row of bytes into an int with ``lane_bytes`` bytes per pixel.
+
+    Lanes are wide enough that per-lane arithmetic never carries into the
+    neighbouring pixel, so one int operation works on the whole row.
+    """
+
+    def __init__(self, count: int, lane_bytes: int) -> None:
+        self.count = count
+        self.lane_bytes = lane_bytes
+        self._ones = self.spread(1)
+        self._low = self._ones * 0xFF
+        self._borrow = self._ones << 8
+
+    def spread(self, value: int) -> int:
+        """Return ``value`` repeated in every lane."""
+        lane = value.to_bytes(self.lane_bytes, "little")
+        return int.from_bytes(lane * self.count, "little")
+
+    def widen(self, row: bytes) -> int:
+        packed = bytearray(self.count * self.lane_bytes)
+        packed[::self.lane_bytes] = row
+        return int.from_bytes(packed, "little")
+
+    def narrow(self, value: int, byte: int = 0) -> bytes:
+        """Return byte ``byte`` of every lane of ``value``."""
+        return value.to_bytes(self.count * self.lane_bytes, "little")[byte::self.lane_bytes]
+
+    def select(self, a: int, b: int, larger: bool) -> int:
+        """Per-pixel max (``larger``) or min of two widened rows; 2-byte lanes."""
+        # Bit 8 of each lane of 256 + a - b is set exactly where a >= b.
+        keep_a = (((a | self._borrow) - b) >> 8 & self._ones) * 0xFF
+        if not larger:
+            keep_a ^= self._low
+        return (a & keep_a) | (b & (keep_a ^ self._low))
+
+
+__all__ = [
+    "alpha_to_bgra",
+    "is_binary_mask",
+    "mask_clear",
+    "mask_feather",
+    "mask_fill",
+    "mask_grow",
+    "mask_bounds",
+    "mask_invert",
+    "mask_shrink",
+    "mask_threshold",
+    "padded_crop",
+]
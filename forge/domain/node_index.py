@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from typing import Any, Iterator
+
+
+class NodeIndex:
+    """Cached UUID and name lookups over one document's node tree.
+
+    Works on any node exposing ``uniqueId()``, ``name()``, ``type()``,
+    ``childNodes()`` and ``parentNode()``. The tree is walked once and
+    indexed; a cached UUID hit is re-checked against the node itself (still
+    attached, same id), so a removed node turns into a miss, and a miss
+    rebuilds the index with one full walk and retries.
+
+    Name lookups and the paint layer list also depend on nodes the user
+    adds or renames in Krita, which no cached entry can notice, so they
+    walk the tree for its signature (ids, names and types in tree order)
+    every time. Only a changed signature rebuilds the index and bumps
+    ``revision``; lists derived from the tree are computed once per
+    revision.
+    """
+
+    def __init__(self) -> None:
+        self._by_uuid: dict[str, Any] = {}
+        self._by_name: dict[str, Any] = {}
+        self._root_uuid: str | None = None
+        self._built = False
+        # (uuid, name, type) of every node, in tree order.
+        self._signature: tuple[tuple[str, str, str], ...] = ()
+        self._paintable: tuple[int, list[str]] | None = None
+        self.rebuilds = 0
+        self.revision = 0
+
+    def invalidate(self) -> None:
+        self._built = False
+
+    def rebuild(self, root) -> None:
+        """Walk the tree; re-index it when its signature has changed."""
+        nodes = list(walk_nodes(root))
+        signature = tuple((str(node.uniqueId()), node.name(), node.type()) for node in nodes)
+        self.rebuilds += 1
+        self._root_uuid = str(root.uniqueId())
+        if self._built and signature == self._signature:
+            return
+
+        by_uuid: dict[str, Any] = {}
+        by_name: dict[str, Any] = {}
+        for node, (uuid, name, _) in zip(nodes, signature):
+            by_uuid[uuid] = node
+            by_name.setdefault(name, node)
+        self._by_uuid = by_uuid
+        self._by_name = by_name
+        self._built = True
+        if signature != self._signature:
+            self._signature = signature
+            self.revision += 1
+
+    def find_by_uuid(self, root, uuid) -> Any | None:
+        key = str(uuid)
+        self._ensure_built(root)
+        node = self._by_uuid.get(key)
+        if node is not None and self._is_valid(node, key):
+            return node
+
+        self.rebuild(root)
+        return self._by_uuid.get(key)
+
+    def find_by_name(self, root, name: str) -> Any | None:
+        """Return the first node named ``name`` in tree order, or ``None``."""
+        self.rebuild(root)
+        return self._by_name.get(name)
+
+    def paintable_names(self, root) -> list[str]:
+        """Return the names of all paint layers, in tree order."""
+        self.rebuild(root)
+        if self._paintable is None or self._paintable[0] != self.revision:
+            names = [name for _, name, kind in self._signature if kind == "paintLayer"]
+            self._paintable = (self.revision, names)
+        return list(self._paintable[1])
+
+    def _ensure_built(self, root) -> None:
+        if not self._built:
+            self.rebuild(root)
+
+    def _is_valid(self, node, key: str) -> bool:
+        if str(node.uniqueId()) != key:
+            return False
+        return str(node.uniqueId()) == self._root_uuid or node.parentNode() is not None
+
+
+def walk_nodes(root) -> Iterator[Any]:
+    """Yield ``root`` and its descendants depth-first, parents before children."""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.childNodes()))
+
+
+__all__ = ["NodeIndex", "walk_nodes"]
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Mapping
+
+from .generation_plan import TileRect
+
+TILEABLE_DATA_KEYS = ("mask_img",)
+CONTROLNET_IMAGE_KEYS = ("image", "input_image", "mask", "mask_image")
+CONTROLNET_NESTED_IMAGE_KEYS = ("image", "mask")
+
+ImageTransform = Callable[[str], str]
+
+
+def map_payload_images(
+    data: Mapping[str, Any],
+    transform: ImageTransform,
+) -> dict[str, Any]:
+    """Return a copy of ``data`` with every tileable image passed through ``transform``.
+
+    Tileable images are the inpaint mask (``mask_img``) and the images and
+    masks of ControlNet units under ``alwayson_scripts.controlnet.args``.
+    Only the containers on the way to an image are copied; everything else is
+    shared with ``data``. The init image itself is not touched.
+    """
+    mapped = map_controlnet_images(data, transform)
+    for key in TILEABLE_DATA_KEYS:
+        if isinstance(mapped.get(key), str):
+            mapped[key] = transform(mapped[key])
+    return mapped
+
+
+def map_controlnet_images(
+    data: Mapping[str, Any],
+    transform: ImageTransform,
+) -> dict[str, Any]:
+    """Like :func:`map_payload_images`, restricted to ControlNet unit images."""
+    mapped = dict(data)
+    scripts = mapped.get("alwayson_scripts")
+    if not isinstance(scripts, dict):
+        return mapped
+    controlnet = scripts.get("controlnet")
+    if not isinstance(controlnet, dict) or not isinstance(controlnet.get("args"), list):
+        return mapped
+
+    mapped["alwayson_scripts"] = {
+        **scripts,
+        "controlnet": {
+            **controlnet,
+            "args": [_map_controlnet_unit(unit, transform) for unit in controlnet["args"]],
+        },
+    }
+    return mapped
+
+
+def scale_rect(
+    rect: TileRect,
+    source_size: tuple[int, int],
+    image_size: tuple[int, int],
+) -> TileRect:
+    """Map ``rect`` from a ``source_size`` image onto one of ``image_size``.
+
+    Edges are rounded outwards so the scaled rect always covers the tile,
+    and the result is clipped to the image.
+    """
+    source_width, source_height = source_size
+    image_width, image_height = image_size
+    if (source_width, source_height) == (image_width, image_height):
+        return rect
+    if source_width <= 0 or source_height <= 0:
+        raise ValueError("source size must be positive")
+
+    scale_x = image_width / source_width
+    scale_y = image_height / source_height
+    left = max(math.floor(rect.x * scale_x), 0)
+    top = max(math.floor(rect.y * scale_y), 0)
+    right = min(math.ceil((rect.x + rect.width) * scale_x), image_width)
+    bottom = min(math.ceil((rect.y + rect.height) * scale_y), image_height)
+    return TileRect(left, top, max(right - left, 0), max(bottom - top, 0))
+
+
+def _map_controlnet_unit(unit: Any, transform: ImageTransform) -> Any:
+    if not isinstance(unit, dict):
+        return unit
+
+    mapped = dict(unit)
+    for key in CONTROLNET_IMAGE_KEYS:
+        value = mapped.get(key)
+        if isinstance(value, str) and value:
+            mapped[key] = transform(value)
+        elif isinstance(value, dict):
+            mapped[key] = {
+                nested_key: (
+                    transform(nested_value)
+                    if nested_key in CONTROLNET_NESTED_IMAGE_KEYS
+                    and isinstance(nested_value, str)
+                    and nested_value
+                    else nested_value
+                )
+                for nested_key, nested_value in value.items()
+            }
+    return mapped
+
+
+__all__ = [
+    "CONTROLNET_IMAGE_KEYS",
+    "TILEABLE_DATA_KEYS",
+    "map_controlnet_images",
+    "map_payload_images",
+    "scale_rect",
+]
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+from .generation_plan import TileRect
+
+RGBA_BYTES_PER_PIXEL = 4
+# Krita's projectionPixelData and QImage.Format_ARGB32 are BGRA in memory.
+ARGB32_ALPHA_OFFSET = 3
+
+
+@dataclass(frozen=True)
+class DecodedImage:
+    """Decoded BGRA pixels with stride ``width * 4``, ready for ``setPixelData``."""
+
+    pixels: bytes
+    width: int
+    height: int
+
+
+def tile_view(
+    pixels,
+    stride: int,
+    rect: TileRect,
+    bytes_per_pixel: int = RGBA_BYTES_PER_PIXEL,
+) -> memoryview:
+    """Return a zero-copy view of ``rect`` inside a row-major pixel buffer.
+
+    The view starts at the rectangle's first pixel and ends after its last
+    one, so it keeps the parent ``stride`` as its bytes-per-line. Rows of the
+    view still contain the pixels right of the rectangle; consumers must use
+    ``stride`` rather than ``rect.width * bytes_per_pixel`` to step rows.
+    """
+    if rect.width <= 0 or rect.height <= 0:
+        return memoryview(b"")
+
+    start = rect.y * stride + rect.x * bytes_per_pixel
+    end = (rect.y + rect.height - 1) * stride + (rect.x + rect.width) * bytes_per_pixel
+    return memoryview(pixels)[start:end]
+
+
+def channel_plane(
+    pixels,
+    width: int,
+    height: int,
+    stride: int,
+    channel: int,
+    bytes_per_pixel: int = RGBA_BYTES_PER_PIXEL,
+) -> bytes:
+    """Extract one 8-bit channel as a packed plane with stride ``width``.
+
+    A tightly packed buffer is handled with a single strided slice; padded
+    rows are sliced one scanline at a time. Slicing ``bytes`` is several
+    times faster than a strided ``memoryview``, so other buffers are copied
+    to ``bytes`` first.
+    """
+    if not isinstance(pixels, (bytes, bytearray)):
+        pixels = bytes(pixels)
+
+    row_bytes = width * bytes_per_pixel
+    if stride == row_bytes:
+        return bytes(pixels[channel:height * row_bytes:bytes_per_pixel])
+
+    return b"".join(
+        pixels[row * stride + channel:row * stride + row_bytes:bytes_per_pixel]
+        for row in range(height)
+    )
+
+
+def scaled_size(
+    width: int,
+    height: int,
+    target_width: int = -1,
+    target_height: int = -1,
+) -> tuple[int, int]:
+    """Return the aspect-preserving size for a requested width and/or height.
+
+    Matches Qt's ``scaledToWidth(target_width)`` followed by
+    ``scaledToHeight(target_height)`` to the pixel, including the rounding
+    of the intermediate size: the height wins when both are given.
+    Negative targets leave that axis unconstrained.
+    """
+    if width <= 0 or height <= 0:
+        return width, height
+    if target_width > -1:
+        width, height = _qt_scaled(width, height, target_width / width)
+    if target_height > -1:
+        width, height = _qt_scaled(width, height, target_height / height)
+    return width, height
+
+
+def _qt_scaled(width: int, height: int, factor: float) -> tuple[int, int]:
+    # QImage.transformed() rounds each side half up (qRound), not half to even.
+    return max(math.floor(factor * width + 0.5), 1), max(math.floor(factor * height + 0.5), 1)
+
+
+def scaled_span(start: int, length: int, source: int, target: int) -> tuple[int, int]:
+    """Map ``[start, start + length)`` of a ``source``-long axis onto ``target``.
+
+    Consecutive spans map to consecutive, non-overlapping spans, so strips
+    scaled one at a time tile the scaled image exactly.
+    """
+    if source <= 0:
+        raise ValueError("source length must be positive")
+    return round(start * target / source), round((start + length) * target / source)
+
+
+def band_mask(
+    width: int, height: int, band: TileRect, *, padding: int = 0, feather: int = 0,
+) -> bytes:
+    """Build a Grayscale8 mask (stride ``width``) that is white inside ``band``.
+
+    ``band`` is first grown by ``padding`` on every side, then faded out
+    linearly over ``feather`` pixels beyond that, so an inpaint over the
+    mask blends into its surroundings instead of ending at a hard edge.
+    """
+    columns = _ramp(width, band.x - padding, band.x + band.width + padding, feather)
+    rows = _ramp(height, band.y - padding, band.y + band.height + padding, feather)
+    band_row = bytes(columns)
+    # Each row is the column ramp capped at that row's own ramp value.
+    return b"".join(
+        band_row if level == 255 else band_row.translate(_cap_table(level))
+        for level in rows
+    )
+
+
+def _ramp(length: int, start: int, end: int, feather: int) -> list[int]:
+    """Return 255 inside ``[start, end)``, falling linearly to 0 over ``feather``."""
+    levels = []
+    for position in range(length):
+        distance = start - position if position < start else position - end + 1
+        if distance <= 0:
+            levels.append(255)
+        elif distance <= feather:
+            levels.append(round(255 * (1 - distance / (feather + 1))))
+        else:
+            levels.append(0)
+    return levels
+
+
+def _cap_table(level: int) -> bytes:
+    return bytes(min(value, level) for value in range(256))
+
+
+__all__ = [
+    "ARGB32_ALPHA_OFFSET",
+    "DecodedImage",
+    "RGBA_BYTES_PER_PIXEL",
+    "band_mask",
+    "channel_plane",
+    "scaled_size",
+    "scaled_span",
+    "tile_view",
+]
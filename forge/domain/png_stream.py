@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import BinaryIO
+
+from .pixel_buffer import RGBA_BYTES_PER_PIXEL
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Compressed data is written out in IDAT chunks of about this size.
+IDAT_CHUNK_SIZE = 1 << 20
+
+_PNG_COLOR_TYPE_RGBA = 6
+_FILTER_NONE = b"\x00"
+
+
+class PngStreamWriter:
+    """Incremental RGBA8 PNG encoder writing to a binary ``sink``.
+
+    Rows are fed in strips with :meth:`write_rows` and compressed as they
+    arrive, so only one strip and zlib's window are held in memory. Rows use
+    PNG filter type 0, which keeps the per-row work to slicing in C.
+    """
+
+    def __init__(self, sink: BinaryIO, width: int, height: int, compression: int = 3) -> None:
+        if width <= 0 or height <= 0:
+            raise ValueError("PNG size must be positive")
+        self.sink = sink
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.bytes_written = 0
+        self._compressor = zlib.compressobj(max(0, min(int(compression), 9)))
+        self._pending = bytearray()
+
+        self._write(PNG_SIGNATURE)
+        self._write_chunk(
+            b"IHDR",
+            struct.pack(">IIBBBBB", width, height, 8, _PNG_COLOR_TYPE_RGBA, 0, 0, 0),
+        )
+
+    def write_rows(self, rgba) -> None:
+        """Append whole rows of tightly packed RGBA8 pixels."""
+        row_bytes = self.width * RGBA_BYTES_PER_PIXEL
+        rows, remainder = divmod(len(rgba), row_bytes)
+        if remainder:
+            raise ValueError("strip is not a whole number of rows")
+        if self.rows_written + rows > self.height:
+            raise ValueError("more rows than the image height")
+
+        view = memoryview(rgba)
+        filtered = b"".join(
+            _FILTER_NONE + view[offset:offset + row_bytes]
+            for offset in range(0, rows * row_bytes, row_bytes)
+        )
+        self._pending += self._compressor.compress(filtered)
+        self.rows_written += rows
+        self._write_idat(final=False)
+
+    def close(self) -> None:
+        if self.rows_written != self.height:
+            raise ValueError(
+                f"wrote {self.rows_written} of {self.height} rows before closing"
+            )
+        self._pending += self._compressor.flush()
+        self._write_idat(final=True)
+        self._write_chunk(b"IEND", b"")
+
+    def _write_idat(self, final: bool) -> None:
+        while len(self._pending) >= IDAT_CHUNK_SIZE or (final and self._pending):
+            self._write_chunk(b"IDAT", bytes(self._pending[:IDAT_CHUNK_SIZE]))
+            del self._pending[:IDAT_CHUNK_SIZE]
+
+    def _write_chunk(self, kind: bytes, payload: bytes) -> None:
+        self._write(struct.pack(">I", len(payload)))
+        self._write(kind)
+        self._write(payload)
+        self._write(struct.pack(">I", zlib.crc32(payload, zlib.crc32(kind))))
+
+    def _write(self, data: bytes) -> None:
+        self.sink.write(data)
+        self.bytes_written += len(data)
+
+
+def bgra_to_rgba(pixels) -> bytearray:
+    """Swap the red and blue bytes of BGRA8 pixels (Krita's RGBA layout)."""
+    rgba = bytearray(pixels)
+    rgba[0::4] = pixels[2::4]
+    rgba[2::4] = pixels[0::4]
+    return rgba
+
+
+__all__ = ["PNG_SIGNATURE", "PngStreamWriter", "bgra_to_rgba"]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from typing import Any, Generic, TypeVar
+
+FrameT = TypeVar("FrameT")
+
+
+def frame_fingerprint(frame_b64: str) -> bytes:
+    """Return a short content hash of an encoded preview frame."""
+    return hashlib.blake2b(frame_b64.encode("ascii", "replace"), digest_size=16).digest()
+
+
+class PreviewFrameGate:
+    """Decide which progress previews are worth decoding.
+
+    A frame is admitted only if its content differs from the last admitted
+    frame, so an unchanged preview is never decoded twice. How often frames
+    reach the canvas is up to :class:`PreviewThrottle`.
+    """
+
+    def __init__(self) -> None:
+        self._last_fingerprint: bytes | None = None
+
+    def admit(self, frame_b64: str) -> bool:
+        fingerprint = frame_fingerprint(frame_b64)
+        if fingerprint == self._last_fingerprint:
+            return False
+        self._last_fingerprint = fingerprint
+        return True
+
+    def reset(self) -> None:
+        self._last_fingerprint = None
+
+
+class PreviewThrottle:
+    """Space preview commits at least ``1 / max_fps`` seconds apart.
+
+    ``delay`` says how long to hold a ready frame; the caller commits it
+    once that has passed (a newer frame may replace it meanwhile) and calls
+    ``mark``. ``max_fps <= 0`` disables the cap.
+    """
+
+    def __init__(self, max_fps: float = 4.0) -> None:
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._last_commit: float | None = None
+
+    def delay(self, now: float) -> float:
+        if self._last_commit is None:
+            return 0.0
+        return max(self._last_commit + self.min_interval - now, 0.0)
+
+    def mark(self, now: float) -> None:
+        self._last_commit = now
+
+    def reset(self) -> None:
+        self._last_commit = None
+
+
+class LatestFrameSlot(Generic[FrameT]):
+    """Thread-safe single-frame mailbox between a decoder and the UI thread.
+
+    ``put`` replaces a frame that has not been taken yet, so a UI thread that
+    falls behind (or holds frames back to honour the frame rate cap) only
+    ever commits the newest frame. ``dropped`` counts the
+    frames that were replaced unseen.
+
+    Frames are tagged with the job they belong to. Only frames of the job
+    passed to :meth:`open` are kept; after :meth:`clear`, frames of the
+    finished job that are still being decoded are discarded on arrival.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._frame: FrameT | None = None
+        self._job: Any = None
+        self.dropped = 0
+
+    def open(self, job: Any) -> None:
+        """Empty the slot and accept frames of ``job`` from now on."""
+        with self._lock:
+            self._frame = None
+            self._job = job
+
+    def put(self, frame: FrameT, job: Any = None) -> bool:
+        """Store ``frame`` unless it belongs to another job than the open one."""
+        with self._lock:
+            if job != self._job:
+                return False
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            return True
+
+    def take(self) -> FrameT | None:
+        with self._lock:
+            frame, self._frame = self._frame, None
+            return frame
+
+    def clear(self) -> None:
+        """Empty the slot and stop accepting frames until the next :meth:`open`."""
+        with self._lock:
+            self._frame = None
+            self._job = None
+
+
+__all__ = ["LatestFrameSlot", "PreviewFrameGate", "PreviewThrottle", "frame_fingerprint"]
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import base64
+import json
+import uuid
+from typing import Any, BinaryIO, Iterator
+
+# Base64 is encoded in blocks of this many source bytes (a multiple of 3,
+# so the chunks concatenate into one valid base64 string).
+BASE64_BLOCK_SIZE = 3 * (1 << 18)
+
+
+class StreamedImage:
+    """An encoded image kept in a file and sent as base64 without loading it.
+
+    Stands in for a base64 string in generation data. The request body is
+    streamed from it with :class:`StreamedJsonBody`; anything that needs the
+    string itself can call :meth:`read_base64`.
+    """
+
+    def __init__(self, source: BinaryIO, size: int, width: int, height: int) -> None:
+        self.source = source
+        self.size = size
+        self.width = width
+        self.height = height
+
+    @property
+    def base64_length(self) -> int:
+        return 4 * -(-self.size // 3)
+
+    def iter_base64(self, block_size: int = BASE64_BLOCK_SIZE) -> Iterator[bytes]:
+        block_size -= block_size % 3
+        self.source.seek(0)
+        while True:
+            block = self.source.read(block_size)
+            if not block:
+                return
+            yield base64.b64encode(block)
+
+    def read_base64(self) -> str:
+        return b"".join(self.iter_base64()).decode("ascii")
+
+    @property
+    def closed(self) -> bool:
+        return self.source.closed
+
+    def close(self) -> None:
+        self.source.close()
+
+    # Payload builders deep-copy generation data. A stream stands for data
+    # on disk, not a value: copying would duplicate a large spool in memory
+    # and fails outright once it has rolled over to a real file.
+    def __copy__(self) -> "StreamedImage":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "StreamedImage":
+        return self
+
+    def __repr__(self) -> str:
+        return f"<streamed image {self.width}x{self.height}, {self.size} bytes>"
+
+
+def contains_streams(value: Any) -> bool:
+    """Return whether ``value`` holds a :class:`StreamedImage` at any depth."""
+    return next(iter_streams(value), None) is not None
+
+
+def iter_streams(value: Any) -> Iterator[StreamedImage]:
+    """Yield every :class:`StreamedImage` in ``value``, at any depth."""
+    if isinstance(value, StreamedImage):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from iter_streams(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from iter_streams(item)
+
+
+def json_default(value: Any) -> Any:
+    """``json.dump`` hook that writes streamed images as a short description."""
+    if isinstance(value, StreamedImage):
+        return repr(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StreamedJsonBody:
+    """A JSON request body with streamed images spliced in as base64 strings.
+
+    The rest of the payload is serialised once; iterating yields that text
+    around each image's base64 chunks, and can be repeated for retries.
+    ``length`` is the exact byte length for the ``Content-Length`` header.
+    """
+
+    def __init__(self, payload: Any) -> None:
+        streams: dict[str, StreamedImage] = {}
+        template = json.dumps(_replace_streams(payload, streams))
+
+        self._parts: list[bytes | StreamedImage] = []
+        for token, stream in streams.items():
+            before, template = template.split(json.dumps(token), 1)
+            self._parts.append(f'{before}"'.encode("utf-8"))
+            self._parts.append(stream)
+            template = f'"{template}'
+        self._parts.append(template.encode("utf-8"))
+
+    @property
+    def length(self) -> int:
+        return sum(
+            part.base64_length if isinstance(part, StreamedImage) else len(part)
+            for part in self._parts
+        )
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, StreamedImage):
+                yield from part.iter_base64()
+            else:
+                yield part
+
+
+def _replace_streams(value: Any, streams: dict[str, StreamedImage]) -> Any:
+    if isinstance(value, StreamedImage):
+        token = f"forge-stream-{uuid.uuid4().hex}"
+        streams[token] = value
+        return token
+    if isinstance(value, dict):
+        return {key: _replace_streams(item, streams) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_streams(item, streams) for item in value]
+    return value
+
+
+__all__ = [
+    "StreamedImage",
+    "StreamedJsonBody",
+    "contains_streams",
+    "iter_streams",
+    "json_default",
+]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+
+@dataclass(frozen=True)
+class MetricSummary:
+    count: int
+    total: float
+    last: float
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Telemetry:
+    """Thread-safe counters and measurements for plugin performance reporting.
+
+    Counters accumulate integer events (tiles skipped, cache hits). Metrics
+    record numeric samples such as durations in milliseconds or byte sizes
+    and keep a running count, total and last value.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = {}
+        self._metrics: dict[str, MetricSummary] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def record(self, name: str, value: float) -> None:
+        with self._lock:
+            previous = self._metrics.get(name)
+            if previous is None:
+                self._metrics[name] = MetricSummary(count=1, total=value, last=value)
+            else:
+                self._metrics[name] = MetricSummary(
+                    count=previous.count + 1,
+                    total=previous.total + value,
+                    last=value,
+                )
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        """Record the duration of the ``with`` block in milliseconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000.0)
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def metric(self, name: str) -> MetricSummary | None:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "metrics": {
+                    name: {
+                        "count": summary.count,
+                        "total": summary.total,
+                        "last": summary.last,
+                        "mean": summary.mean,
+                    }
+                    for name, summary in self._metrics.items()
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._metrics.clear()
+
+
+telemetry = Telemetry()
+
+
+__all__ = ["MetricSummary", "Telemetry", "telemetry"]
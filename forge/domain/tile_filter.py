@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+
+from .generation_plan import TileRect
+from .pixel_buffer import RGBA_BYTES_PER_PIXEL
+
+
+@dataclass(frozen=True)
+class TileSkipThresholds:
+    """Limits below which a tile is copied through instead of generated.
+
+    ``min_variance`` is the mean per-channel RGB variance in 8-bit units
+    squared. Coverages are fractions of sampled pixels in ``[0, 1]``; a
+    threshold of ``0`` disables that check.
+    """
+
+    min_variance: float = 1.0
+    min_alpha_coverage: float = 0.001
+    min_mask_coverage: float = 0.001
+    sample_step: int = 4
+
+
+@dataclass(frozen=True)
+class TileStats:
+    variance: float
+    alpha_coverage: float
+    mask_coverage: float | None = None
+
+
+def measure_tile(
+    pixels,
+    stride: int,
+    rect: TileRect,
+    *,
+    mask=None,
+    mask_stride: int = 0,
+    mask_inverted: bool = False,
+    sample_step: int = 4,
+) -> TileStats:
+    """Measure colour variance, alpha and mask coverage of one tile.
+
+    ``pixels`` is an RGBA8888 buffer (bytes, bytearray or memoryview) with
+    ``stride`` bytes per scanline; ``mask`` is an optional Grayscale8 buffer of
+    the same image size where non-zero marks the inpaint area. Every
+    ``sample_step``-th pixel on every ``sample_step``-th row is sampled, and
+    channels are picked with strided slices so the work stays in C.
+    """
+    step = max(sample_step, 1)
+    pixel_step = RGBA_BYTES_PER_PIXEL * step
+    row_begin = rect.x * RGBA_BYTES_PER_PIXEL
+    row_end = (rect.x + rect.width) * RGBA_BYTES_PER_PIXEL
+
+    channels = [bytearray(), bytearray(), bytearray()]
+    alpha = bytearray()
+    mask_samples = bytearray()
+
+    for row in range(rect.y, rect.y + rect.height, step):
+        offset = row * stride
+        scanline = pixels[offset + row_begin:offset + row_end]
+        for channel_index, channel in enumerate(channels):
+            channel.extend(scanline[channel_index::pixel_step])
+        alpha.extend(scanline[3::pixel_step])
+
+        if mask is not None:
+            mask_offset = row * mask_stride
+            mask_samples.extend(
+                mask[mask_offset + rect.x:mask_offset + rect.x + rect.width:step]
+            )
+
+    if not alpha:
+        return TileStats(variance=0.0, alpha_coverage=0.0, mask_coverage=0.0)
+
+    variance = sum(_variance(channel) for channel in channels) / len(channels)
+    alpha_coverage = 1.0 - alpha.count(0) / len(alpha)
+
+    mask_coverage = None
+    if mask is not None and mask_samples:
+        unmasked_value = 255 if mask_inverted else 0
+        mask_coverage = 1.0 - mask_samples.count(unmasked_value) / len(mask_samples)
+
+    return TileStats(
+        variance=variance,
+        alpha_coverage=alpha_coverage,
+        mask_coverage=mask_coverage,
+    )
+
+
+def tile_skip_reason(stats: TileStats, thresholds: TileSkipThresholds) -> str | None:
+    """Return why a tile can be skipped, or ``None`` if it must be generated.
+
+    A tile inside the inpaint mask is always generated: inpainting a flat or
+    empty area is a requested edit, not a no-op.
+    """
+    if stats.mask_coverage is not None:
+        if stats.mask_coverage < thresholds.min_mask_coverage:
+            return "unmasked"
+        return None
+    if stats.alpha_coverage < thresholds.min_alpha_coverage:
+        return "transparent"
+    if stats.variance < thresholds.min_variance:
+        return "flat"
+    return None
+
+
+def _variance(samples: bytearray) -> float:
+    if not samples:
+        return 0.0
+
+    histogram = Counter(samples)
+    count = len(samples)
+    total = sum(value * hits for value, hits in histogram.items())
+    total_squares = sum(value * value * hits for value, hits in histogram.items())
+    mean = total / count
+    return max(total_squares / count - mean * mean, 0.0)
+
+
+__all__ = [
+    "TileSkipThresholds",
+    "TileStats",
+    "measure_tile",
+    "tile_skip_reason",
+]
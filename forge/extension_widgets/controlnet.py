@@ -4,6 +4,7 @@ import logging
 from ..adapters.sd_api import SDAPI
 from ..settings_controller import SettingsController
 from ..adapters.krita_adapter import KritaAdapter
+from ..domain.image_codec import IMAGE_ROLE_CONTROL
 from ..widgets import ImageInWidget, CollapsibleWidget
 from ..widgets.mask import MaskWidget # I don't know why it needs to be special like this...
 
@@ -92,11 +93,11 @@ class ControlNetUnit(QWidget):
         self.use_mask.toggled.connect(lambda: self.update_img_in(use_mask=self.use_mask.isChecked()))
         self.layout().addWidget(self.use_mask)
 
-        self.img_in = ImageInWidget(self.settings_controller, self.api, 'input_image', self.size_dict)
+        self.img_in = ImageInWidget(self.settings_controller, self.api, 'input_image', self.size_dict, upload_role=IMAGE_ROLE_CONTROL)
         self.layout().addWidget(self.img_in)
         self.img_in.setVisible(not self.use_mask.isChecked())
 
-        self.mask_in = MaskWidget(self.settings_controller, self.api, self.size_dict)
+        self.mask_in = MaskWidget(self.settings_controller, self.api, self.size_dict, allow_crop=False)
         self.layout().addWidget(self.mask_in)
         self.mask_in.setVisible(self.use_mask.isChecked())
 
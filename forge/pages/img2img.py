@@ -14,7 +14,7 @@ class Img2ImgPage(QWidget):
         self.size_dict = {"x":0,"y":0,"w":0,"h":0}
         self.setLayout(QVBoxLayout())
 
-        self.img_in = ImageInWidget(self.settings_controller, self.api, 'img2img_img', self.size_dict)
+        self.img_in = ImageInWidget(self.settings_controller, self.api, 'img2img_img', self.size_dict, allow_incremental=True)
         self.layout().addWidget(self.img_in)
 
         self.color_correction = ColorCorrectionWidget(self.settings_controller, self.api)
@@ -66,6 +66,9 @@ class Img2ImgPage(QWidget):
         self.generate_widget = GenerateWidget(self.settings_controller, self.api, self.widgets, 'img2img', self.size_dict)
         self.layout().addWidget(self.generate_widget)
 
+        self.live_widget = LivePaintWidget(self.settings_controller, self.api, self.generate_widget, self.img_in)
+        self.layout().addWidget(self.live_widget)
+
         # History Panel
         self.history_widget = HistoryWidget(self.settings_controller, self.api)
         self.history_widget.reuse_required.connect(self.reuse_parameters)
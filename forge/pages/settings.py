@@ -3,10 +3,12 @@ from __future__ import annotations
 from ..qt_compat import (
     QComboBox, QCheckBox, QDoubleValidator, QFormLayout,
     QGroupBox, QLabel, QLineEdit, QPushButton, QSpinBox, QVBoxLayout,
-    QWidget, QThread, pyqtSignal,
+    QWidget, QThread, Qt, pyqtSignal,
 )
 
 from ..adapters.sd_api import SDAPI
+from ..domain.generation_plan import RESULT_RESAMPLING_MODES
+from ..domain.image_buffer import resampling_supported
 from ..settings_controller import SettingsController
 from ..version import __version__
 
@@ -89,6 +91,7 @@ class SettingsPage(QWidget):
         self._server_settings_group()
         self._size_group()
         self._previews_group()
+        self._uploads_group()
         self._prompt_group()
         self._version_group()
         self.layout().addStretch()
@@ -176,6 +179,30 @@ class SettingsPage(QWidget):
             "Largest size sent to Stable Diffusion before output is resized.",
         )
 
+        resampling_combo = QComboBox()
+        resampling_combo.addItems(RESULT_RESAMPLING_MODES)
+        for index, mode in enumerate(RESULT_RESAMPLING_MODES):
+            if not resampling_supported(mode):
+                # Without NumPy these would quietly run as bilinear.
+                resampling_combo.model().item(index).setEnabled(False)
+                resampling_combo.setItemData(
+                    index, "Needs NumPy, which is not installed.", Qt.ItemDataRole.ToolTipRole,
+                )
+        resampling = self.settings_controller.get("defaults.result_resampling")
+        resampling_combo.setCurrentText(
+            resampling if resampling_supported(resampling) else "bilinear"
+        )
+        resampling_combo.currentTextChanged.connect(
+            lambda text: self.settings_controller.set("defaults.result_resampling", text)
+        )
+        size_form.layout().addRow("Result Resampling", resampling_combo)
+        self.add_tooltip(
+            size_form,
+            "How results are fitted to the selection: a live transform mask, "
+            "or resampled directly with the chosen filter. Bicubic and Lanczos "
+            "need NumPy; without it they are unavailable and bilinear is used.",
+        )
+
         self.layout().addWidget(size_form)
 
     def _previews_group(self) -> None:
@@ -192,7 +219,7 @@ class SettingsPage(QWidget):
             str(self.settings_controller.get("previews.refresh_seconds"))
         )
         refresh_time.setPlaceholderText("1.0")
-        refresh_time.setValidator(QDoubleValidator(0.5, 10.0, 1))
+        refresh_time.setValidator(QDoubleValidator(0.1, 10.0, 1))
         refresh_time.textChanged.connect(
             lambda: self.settings_controller.set(
                 "previews.refresh_seconds",
@@ -205,8 +232,88 @@ class SettingsPage(QWidget):
             "How often Krita polls Stable Diffusion for progress and preview updates.",
         )
 
+        max_fps = QLineEdit(str(self.settings_controller.get("previews.max_fps")))
+        max_fps.setPlaceholderText("4.0")
+        max_fps.setValidator(QDoubleValidator(0.1, 30.0, 1))
+        max_fps.textChanged.connect(
+            lambda: self.settings_controller.set(
+                "previews.max_fps",
+                float(max_fps.text()) if max_fps.text() else 4.0,
+            )
+        )
+        previews_form.layout().addRow("Max Preview FPS", max_fps)
+        self.add_tooltip(
+            previews_form,
+            "Upper limit on preview redraws; unchanged previews are never redrawn. "
+            "Previews arrive once per refresh, so a refresh time below "
+            "1 / FPS is needed for this cap to matter.",
+        )
+
         self.layout().addWidget(previews_form)
 
+    def _uploads_group(self) -> None:
+        uploads_form = QGroupBox("Uploads")
+        uploads_form.setLayout(QFormLayout())
+
+        for settings_key, label, maximum, tooltip in [
+            (
+                "uploads.png_compression",
+                "PNG Compression",
+                9,
+                "zlib level (0-9) for init and ControlNet images. "
+                "Lower encodes faster, higher sends less data.",
+            ),
+            (
+                "uploads.mask_png_compression",
+                "Mask PNG Compression",
+                9,
+                "zlib level (0-9) for inpaint masks; masks compress well even at 1.",
+            ),
+            (
+                "uploads.control_jpeg_quality",
+                "ControlNet JPEG Quality",
+                100,
+                "Send ControlNet and reference inputs as JPEG at this quality. "
+                "0 keeps them lossless. JPEG drops transparency.",
+            ),
+            (
+                "uploads.stream_min_megapixels",
+                "Stream Uploads From (MP)",
+                1000,
+                "Init images of at least this many megapixels are encoded in "
+                "strips and streamed to the server instead of held in memory. "
+                "0 turns streaming off.",
+            ),
+        ]:
+            entry = QSpinBox()
+            entry.setRange(0, maximum)
+            entry.setValue(self.settings_controller.get(settings_key))
+            entry.valueChanged.connect(
+                lambda value, key=settings_key: self.settings_controller.set(key, value)
+            )
+            uploads_form.layout().addRow(label, entry)
+            self.add_tooltip(uploads_form, tooltip)
+
+        uploads_form.layout().addRow(
+            "1-bit Masks",
+            self.create_checkbox("uploads.mono_masks"),
+        )
+        self.add_tooltip(
+            uploads_form,
+            "Send masks that are only black and white as 1-bit PNG.",
+        )
+
+        uploads_form.layout().addRow(
+            "Lossless WebP",
+            self.create_checkbox("uploads.lossless_webp"),
+        )
+        self.add_tooltip(
+            uploads_form,
+            "Send images as lossless WebP instead of PNG when Qt can write WebP.",
+        )
+
+        self.layout().addWidget(uploads_form)
+
     def _prompt_group(self) -> None:
         prompt_form = QGroupBox("Prompts")
         prompt_form.setLayout(QFormLayout())
@@ -3,6 +3,7 @@ import json
 from ..adapters.sd_api import SDAPI
 from ..settings_controller import SettingsController
 from ..adapters.krita_adapter import KritaAdapter
+from ..domain.image_codec import IMAGE_ROLE_INIT, UploadCodecPolicy
 from ..widgets import PromptWidget, SeedWidget, CollapsibleWidget, ModelsWidget, GenerateWidget, ImageInWidget, DenoiseWidget, ExtensionWidget, MaskWidget, ColorCorrectionWidget
 
 class UpscalePage(QWidget):
@@ -116,7 +117,7 @@ class UpscalePage(QWidget):
             'upscaling_resize_h': self.settings_controller.get('upscale.height'),
             'upscaling_crop': self.settings_controller.get('upscale.crop_to_fit'),
             'upscaler_1': self.settings_controller.get('defaults.upscaler'),
-            'image': self.kc.qimage_to_b64_str(self.kc.get_canvas_img()),
+            'image': self._canvas_upload(),
         }
         # self.debug_text.setPlainText(json.dumps(data))
         # self.debug_text.setPlainText('%s' % type(data))
@@ -124,6 +125,14 @@ class UpscalePage(QWidget):
         self.upscale_btn.setDisabled(True)
         self.kc.run_as_thread(lambda: self.threadable_run(data), lambda: self.threadable_return())
 
+    def _canvas_upload(self):
+        policy = UploadCodecPolicy.from_settings(self.settings_controller.get)
+        x, y, width, height = self.kc.get_canvas_bounds()
+        if policy.should_stream(width, height):
+            streamed = self.kc.stream_projection(x, y, width, height, policy.png_compression)
+            if streamed is not None:
+                return streamed
+        return self.kc.encode_upload(self.kc.get_canvas_img(), IMAGE_ROLE_INIT, policy)
 
     def threadable_run(self, data):
         self.results = self.api.extra(data)
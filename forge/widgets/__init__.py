@@ -15,3 +15,4 @@ from .cfg import CFGWidget
 from .interrogate_model import InterrogateModelWidget
 from .interrogate import InterrogateWidget
 from .history import HistoryWidget
+from .live_paint import LivePaintWidget
@@ -1,7 +1,10 @@
 
 from ..qt_compat import *
+from ..domain.color_match import COLOR_MATCH_MODES
 from ..settings_controller import SettingsController
 
+COLOR_MATCH_LABELS = ['Off', 'Histogram', 'Lab Mean/Variance']
+
 class ColorCorrectionWidget(QWidget):
     def __init__(self, settings_controller:SettingsController, include_start=False, include_end=False):
         super().__init__()
@@ -9,6 +12,8 @@ class ColorCorrectionWidget(QWidget):
         self.setLayout(QVBoxLayout())
         self.layout().setContentsMargins(0,0,0,0)
         self.color_correct = self.settings_controller.get('defaults.color_correction')
+        self.local_match = self.settings_controller.get('defaults.local_color_match')
+        self.local_match_masked = self.settings_controller.get('defaults.local_color_match_masked')
 
         # Match Image Colors
         match_colors = QCheckBox('Match Image Colors')
@@ -16,16 +21,52 @@ class ColorCorrectionWidget(QWidget):
         match_colors.toggled.connect(lambda: self.update_match_colors(match_colors.isChecked()))
         self.layout().addWidget(match_colors)
 
+        # Local colour matching, applied to the results before they are inserted
+        local_row = QWidget()
+        local_row.setLayout(QHBoxLayout())
+        local_row.layout().setContentsMargins(0,0,0,0)
+        local_row.layout().addWidget(QLabel('Local Match'))
+        local_match = QComboBox()
+        local_match.addItems(COLOR_MATCH_LABELS)
+        local_match.setMinimumContentsLength(10)
+        if self.local_match in COLOR_MATCH_MODES:
+            local_match.setCurrentIndex(COLOR_MATCH_MODES.index(self.local_match))
+        local_match.setToolTip('Match result colors to the source image in the plugin, after generation. Histogram matches each channel\'s distribution; Lab matches mean and variance of lightness and color.')
+        local_match.currentIndexChanged.connect(lambda: self.update_local_match(COLOR_MATCH_MODES[local_match.currentIndex()]))
+        local_row.layout().addWidget(local_match)
+        self.layout().addWidget(local_row)
+
+        masked_only = QCheckBox('Local Match Masked Pixels Only')
+        masked_only.setToolTip('When inpainting, only adjust the pixels inside the mask.')
+        masked_only.setChecked(self.local_match_masked)
+        masked_only.toggled.connect(lambda: self.update_local_match_masked(masked_only.isChecked()))
+        self.layout().addWidget(masked_only)
+
     def update_match_colors(self, match):
         self.color_correct = match
 
+    def update_local_match(self, mode):
+        self.local_match = mode
+
+    def update_local_match_masked(self, masked):
+        self.local_match_masked = masked
+
     def save_settings(self):
         self.settings_controller.set('defaults.match_colors', self.color_correct)
+        self.settings_controller.set('defaults.local_color_match', self.local_match)
+        self.settings_controller.set('defaults.local_color_match_masked', self.local_match_masked)
 
     def get_generation_data(self):
         data = {
             'color_correction': self.color_correct,
         }
+        if self.local_match != COLOR_MATCH_MODES[0]:
+            data['FORGE'] = {
+                'color_match': {
+                    'mode': self.local_match,
+                    'masked': self.local_match_masked,
+                },
+            }
         self.save_settings()
         self.settings_controller.save()
-        return data
\ No newline at end of file
+        return data
@@ -1,11 +1,29 @@
 from __future__ import annotations
 
 import json
+import random
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-
-from ..qt_compat import QProgressBar, QPushButton, QVBoxLayout, QWidget, QTextEdit, QLabel
+from functools import partial
+
+from ..qt_compat import (
+    QAbstractSlider,
+    QCheckBox,
+    QComboBox,
+    QDoubleSpinBox,
+    QLabel,
+    QLineEdit,
+    QPlainTextEdit,
+    QProgressBar,
+    QPushButton,
+    QSpinBox,
+    QTextEdit,
+    QVBoxLayout,
+    QWidget,
+    pyqtSignal,
+)
 from krita import QTimer
 
 
@@ -23,17 +41,41 @@ class GenerationJob:
 from ..adapters.krita_adapter import KritaAdapter
 from ..adapters.sd_api import SDAPI
 from ..domain.generation_plan import (
+    GenerationPlan,
+    TileRect,
+    build_draft_plan,
     build_generation_plan,
+    draft_steps,
     merge_generation_data,
     prune_generation_results,
 )
 from ..domain.history_manager import HistoryManager
+from ..domain.image_codec import UploadCodecPolicy
+from ..domain.payload_tiler import map_controlnet_images
 from ..domain.model_registry import ModelFamily, ModelConfig, detect_model_family, get_model_config
+from ..domain.preview_pipeline import LatestFrameSlot, PreviewFrameGate, PreviewThrottle
 from ..domain.progress_state import parse_progress_state
+from ..domain.streamed_payload import iter_streams, json_default
+from ..domain.telemetry import telemetry
 from ..settings_controller import SettingsController
 
+# Input widgets whose edits count as a parameter change, with their signal.
+_PARAMETER_SIGNALS = (
+    (QLineEdit, "textChanged"),
+    (QTextEdit, "textChanged"),
+    (QPlainTextEdit, "textChanged"),
+    (QSpinBox, "valueChanged"),
+    (QDoubleSpinBox, "valueChanged"),
+    (QAbstractSlider, "valueChanged"),
+    (QComboBox, "currentIndexChanged"),
+    (QCheckBox, "toggled"),
+)
+
 
 class GenerateWidget(QWidget):
+    # Emitted from the preview decoder thread; delivered queued on the UI thread.
+    preview_ready = pyqtSignal()
+
     GENERATION_ENDPOINT_BY_MODE = {
         "txt2img": "txt2img",
         "img2img": "img2img",
@@ -58,6 +100,7 @@ class GenerateWidget(QWidget):
         self.kc = KritaAdapter()
         self.history_manager = HistoryManager()
         self.results = None
+        self.decoded_results = None
         self.is_generating = False
         self.abort = False
         self.finished = False
@@ -66,9 +109,33 @@ class GenerateWidget(QWidget):
         self._progress_timer_start = 0.0
         self._last_progress_change_time = 0.0
         self._last_progress_value = -1
+        self._preview_gate = PreviewFrameGate()
+        self._preview_throttle = PreviewThrottle()
+        self._preview_frames: LatestFrameSlot = LatestFrameSlot()
+        self.preview_ready.connect(self._commit_preview)
+        # Commits a frame held back by the throttle once its turn comes.
+        self._preview_commit_timer = QTimer()
+        self._preview_commit_timer.setSingleShot(True)
+        self._preview_commit_timer.timeout.connect(self._commit_preview)
+        self._preview_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="forge-preview-decode",
+        )
+        self.destroyed.connect(
+            partial(_close_preview_worker, self._preview_frames, self._preview_executor)
+        )
 
         self.job_queue: list[GenerationJob] = []
         self.current_job: GenerationJob | None = None
+        # Still set after a cancel, so its uploads are released on return.
+        self._sent_job: GenerationJob | None = None
+
+        # Draft-then-final: the final queued behind the latest draft, whether
+        # that draft is showing in the preview layer, and finals whose
+        # results must not be inserted because parameters changed.
+        self.draft_image = None
+        self._pending_final: str | None = None
+        self._draft_shown = False
+        self._superseded: set[str] = set()
 
         self.setLayout(QVBoxLayout())
         self.layout().setContentsMargins(0, 0, 0, 0)
@@ -85,6 +152,15 @@ class GenerateWidget(QWidget):
         self.generate_btn.clicked.connect(self.handle_generate_btn_click)
         self.layout().addWidget(self.generate_btn)
 
+        self.draft_cb = QCheckBox("Draft First")
+        self.draft_cb.setToolTip(
+            "Show a quick low-resolution draft with the same seed, then replace "
+            "it with the full render. Changing any setting cancels the full render."
+        )
+        self.draft_cb.setChecked(self.settings_controller.get("draft.enabled"))
+        self.draft_cb.toggled.connect(self._save_draft_enabled)
+        self.layout().addWidget(self.draft_cb)
+
         self.queue_status_label = QLabel("Queue: 0 jobs")
         self.layout().addWidget(self.queue_status_label)
 
@@ -100,6 +176,8 @@ class GenerateWidget(QWidget):
             )
             self.layout().addWidget(self.debug_data)
 
+        self._watch_parameter_changes()
+
     def handle_generate_btn_click(self) -> None:
         if self.is_generating:
             self.cancel()
@@ -109,23 +187,28 @@ class GenerateWidget(QWidget):
 
     def generate(self) -> None:
         """Build a generation job from current widget state and enqueue it."""
-        x, y, width, height = self._resolve_generation_bounds()
+        job = self.build_job()
+        if job is None:
+            return
+        if self.draft_cb.isChecked():
+            self._discard_pending_final()
+            draft, job = self._draft_pair(job)
+            self.job_queue.append(draft)
+            self._pending_final = job.id
+        self.job_queue.append(job)
+        self._update_queue_status()
 
-        family = detect_model_family(self.api.defaults.get("model", ""))
-        config = get_model_config(family)
+        if not self.is_generating:
+            self._start_next_job()
 
-        user_min = self.settings_controller.get("defaults.min_size")
-        user_max = self.settings_controller.get("defaults.max_size")
-        min_size = user_min if user_min else config.default_min_size
-        max_size = user_max if user_max else config.default_max_size
+    def build_job(self, list_of_widgets: list | None = None) -> GenerationJob | None:
+        """Collect widget payloads into a job; ``None`` when there is no prompt.
 
-        generation_plan = build_generation_plan(
-            width=width,
-            height=height,
-            min_size=min_size,
-            max_size=max_size,
-            enable_max_size=self.settings_controller.get("defaults.enable_max_size"),
-        )
+        ``list_of_widgets`` replaces this widget's own list, so callers such
+        as live painting can swap in their own image source.
+        """
+        x, y, width, height = self.resolve_generation_bounds()
+        generation_plan = self._build_generation_plan(width, height)
 
         base_data = {
             "width": generation_plan.request_width,
@@ -134,25 +217,49 @@ class GenerateWidget(QWidget):
         if self.settings_controller.get("server.save_imgs"):
             base_data["save_images"] = True
 
-        widget_payloads = [
-            widget.get_generation_data() for widget in self.list_of_widgets
-        ]
+        # Widgets upload at the size the server will generate at, not at
+        # full canvas resolution.
+        with KritaAdapter.upload_sizing(
+            lambda image_width, image_height: self._build_generation_plan(
+                image_width, image_height,
+            ).upload_size
+        ):
+            widget_payloads = [
+                widget.get_generation_data()
+                for widget in (list_of_widgets or self.list_of_widgets)
+            ]
         generation_data, processing_instructions = merge_generation_data(
             base_data=base_data,
             widget_payloads=widget_payloads,
         )
         prompt = generation_data.get("prompt", "").strip()
         if not prompt:
-            return
+            return None
         self._apply_flux_adjustments(generation_data)
 
+        crop = processing_instructions.pop("crop", None)
+        if isinstance(crop, dict):
+            # The mask widget uploads only the masked region; generate and
+            # place the result there, and cut ControlNet inputs to match.
+            crop_rect = TileRect(crop["x"] - x, crop["y"] - y, crop["w"], crop["h"])
+            generation_data = map_controlnet_images(
+                generation_data,
+                lambda image_b64: self.kc.crop_b64_image(
+                    image_b64, crop_rect, (width, height),
+                ),
+            )
+            x, y, width, height = crop["x"], crop["y"], crop["w"], crop["h"]
+            generation_plan = self._build_generation_plan(width, height)
+            generation_data["width"] = generation_plan.request_width
+            generation_data["height"] = generation_plan.request_height
+
         if generation_plan.resize is not None:
             processing_instructions["resize"] = {
                 "width": generation_plan.resize.width,
                 "height": generation_plan.resize.height,
             }
 
-        job = GenerationJob(
+        return GenerationJob(
             id=uuid.uuid4().hex,
             data=generation_data,
             x=x,
@@ -162,11 +269,91 @@ class GenerateWidget(QWidget):
             processing_instructions=processing_instructions,
             timestamp=time.time(),
         )
-        self.job_queue.append(job)
+
+    def _draft_pair(self, job: GenerationJob) -> tuple[GenerationJob, GenerationJob]:
+        """Split ``job`` into a quick draft and the full render, sharing one seed."""
+        data = dict(job.data)
+        # A random seed is fixed here so the draft previews the final.
+        if data.get("seed", -1) == -1:
+            data["seed"] = random.randrange(2 ** 32)
+        if data.get("subseed_strength") and data.get("subseed", -1) == -1:
+            data["subseed"] = random.randrange(2 ** 32)
+        final = GenerationJob(**{**vars(job), "data": data})
+
+        plan = build_draft_plan(
+            GenerationPlan(data["width"], data["height"], job.width, job.height, None),
+            self.settings_controller.get("draft.scale"),
+        )
+        draft_data = {
+            **data,
+            "width": plan.request_width,
+            "height": plan.request_height,
+            "sampling_steps": draft_steps(
+                data.get("sampling_steps", 20),
+                self.settings_controller.get("draft.steps_fraction"),
+            ),
+            "batch_count": 1,
+            "batch_size": 1,
+            "enable_hr": False,
+            "save_images": False,
+        }
+        draft = GenerationJob(
+            id=uuid.uuid4().hex,
+            data=draft_data,
+            x=job.x,
+            y=job.y,
+            width=job.width,
+            height=job.height,
+            processing_instructions={**job.processing_instructions, "draft": True},
+            timestamp=job.timestamp,
+        )
+        return draft, final
+
+    def _discard_pending_final(self) -> None:
+        """Drop the full render queued behind the last draft, interrupting it if running."""
+        final_id, self._pending_final = self._pending_final, None
+        if final_id is None:
+            return
+        telemetry.increment("draft.finals_cancelled")
+        dropped = [job for job in self.job_queue if job.id == final_id]
+        self.job_queue = [job for job in self.job_queue if job.id != final_id]
+        for job in dropped:
+            self._release_streams(job)
+        if self.current_job is not None and self.current_job.id == final_id:
+            self._superseded.add(final_id)
+            self.api.interrupt()
         self._update_queue_status()
 
-        if not self.is_generating:
-            self._start_next_job()
+    def _watch_parameter_changes(self) -> None:
+        for widget in self.list_of_widgets:
+            for kind, signal in _PARAMETER_SIGNALS:
+                for child in widget.findChildren(kind):
+                    getattr(child, signal).connect(self._on_parameters_changed)
+
+    def _on_parameters_changed(self, *_) -> None:
+        # The final would no longer match what the user is looking at.
+        self._discard_pending_final()
+
+    def _save_draft_enabled(self, enabled: bool) -> None:
+        self.settings_controller.set("draft.enabled", enabled)
+        self.settings_controller.debounced_save()
+
+    def _build_generation_plan(self, width: int, height: int):
+        family = detect_model_family(self.api.defaults.get("model", ""))
+        config = get_model_config(family)
+
+        user_min = self.settings_controller.get("defaults.min_size")
+        user_max = self.settings_controller.get("defaults.max_size")
+        min_size = user_min if user_min else config.default_min_size
+        max_size = user_max if user_max else config.default_max_size
+
+        return build_generation_plan(
+            width=width,
+            height=height,
+            min_size=min_size,
+            max_size=max_size,
+            enable_max_size=self.settings_controller.get("defaults.enable_max_size"),
+        )
 
     def _start_next_job(self) -> None:
         """Dequeue the next job and begin generation."""
@@ -175,6 +362,7 @@ class GenerateWidget(QWidget):
 
         job = self.job_queue.pop(0)
         self.current_job = job
+        self._sent_job = job
         self.abort = False
         self.finished = False
         self.is_generating = True
@@ -187,7 +375,9 @@ class GenerateWidget(QWidget):
 
         if self.debug:
             self.debug_data.setPlainText(
-                json.dumps(self.api.build_payload(job.data), indent=2)
+                json.dumps(
+                    self.api.build_payload(job.data), indent=2, default=json_default,
+                )
             )
 
         try:
@@ -196,7 +386,9 @@ class GenerateWidget(QWidget):
                 self.kc.create_new_doc()
 
             self.kc.run_as_thread(
-                lambda: self.threadable_run(job.data),
+                lambda: self.threadable_run(
+                    job.data, job.width, job.height, job.processing_instructions,
+                ),
                 lambda: self.threadable_return(
                     job.x,
                     job.y,
@@ -221,6 +413,11 @@ class GenerateWidget(QWidget):
             self._progress_timer_start = time.time()
             self._last_progress_change_time = time.time()
             self._last_progress_value = -1
+            self._preview_gate = PreviewFrameGate()
+            self._preview_throttle = PreviewThrottle(
+                self.settings_controller.get("previews.max_fps")
+            )
+            self._preview_frames.open(job.id)
             self.progress_timer.start(refresh_ms)
 
         except Exception as error:
@@ -235,7 +432,7 @@ class GenerateWidget(QWidget):
                 f"Forge SD - Error generating {self.mode}: {error}"
             ) from error
 
-    def _resolve_generation_bounds(self) -> tuple[int, int, int, int]:
+    def resolve_generation_bounds(self) -> tuple[int, int, int, int]:
         x = self.size_dict["x"]
         y = self.size_dict["y"]
         width = self.size_dict["w"]
@@ -268,7 +465,7 @@ class GenerateWidget(QWidget):
         if self.abort or self.finished or not progress_state.is_active:
             self.abort = False
             self.finished = False
-            self._stop_generation_loop()
+            self._stop_generation_loop(delete_preview=not self._draft_shown)
             return
 
         elapsed = time.time() - self._progress_timer_start
@@ -286,11 +483,15 @@ class GenerateWidget(QWidget):
 
         self.update_progress_bar(progress_state.percent)
 
-        if not self.settings_controller.get("previews.enabled"):
+        if not self.settings_controller.get("previews.enabled") or self._draft_shown:
+            # A shown draft stays until the final replaces it; early frames
+            # of the final would only look worse.
             return
 
         if progress_state.current_image is None:
             return
+        if not self._preview_gate.admit(progress_state.current_image):
+            return
 
         preview_width = width
         preview_height = height
@@ -299,21 +500,101 @@ class GenerateWidget(QWidget):
             preview_width = resize.get("width", preview_width)
             preview_height = resize.get("height", preview_height)
 
-        self.kc.update_preview_layer(
+        if self.current_job is None:
+            return
+        self._preview_executor.submit(
+            self._decode_preview,
+            self.current_job.id,
             progress_state.current_image,
-            x,
-            y,
             preview_width,
             preview_height,
         )
 
-    def threadable_run(self, data: dict) -> None:
+    def _decode_preview(self, job_id: str, image_b64: str, width: int, height: int) -> None:
+        """Decode a preview frame of ``job_id`` on the preview worker into the frame slot.
+
+        Frames of a job whose generation loop has stopped are dropped by the
+        slot; a kept frame signals the UI thread to commit it right away.
+        """
+        if self._preview_frames.put(
+            KritaAdapter.decode_preview(image_b64, width, height), job_id,
+        ):
+            self.preview_ready.emit()
+
+    def _commit_preview(self) -> None:
+        """Show the newest decoded frame, at most ``previews.max_fps`` times a second."""
+        job = self.current_job
+        if job is None or not self.is_generating or self._draft_shown:
+            return
+        delay = self._preview_throttle.delay(time.monotonic())
+        if delay > 0:
+            # Hold the frame in the slot; a newer one may replace it meanwhile.
+            if not self._preview_commit_timer.isActive():
+                self._preview_commit_timer.start(int(delay * 1000) + 1)
+            return
+
+        frame = self._preview_frames.take()
+        if frame is None:
+            return
+        self.kc.apply_preview_image(frame, job.x, job.y)
+        self._preview_throttle.mark(time.monotonic())
+
+    def threadable_run(
+        self,
+        data: dict,
+        width: int = -1,
+        height: int = -1,
+        processing_instructions: dict | None = None,
+    ) -> None:
         endpoint_name = self.GENERATION_ENDPOINT_BY_MODE.get(self.mode)
         if endpoint_name is None:
             raise RuntimeError(f"Unsupported generation mode: {self.mode}")
 
         run_generation = getattr(self.api, endpoint_name)
-        self.results = run_generation(data)
+        feather = (processing_instructions or {}).get("feather_mask")
+        if feather and isinstance(data.get("mask_img"), str):
+            data = {
+                **data,
+                "mask_img": KritaAdapter.feather_mask_upload(
+                    data["mask_img"],
+                    feather,
+                    UploadCodecPolicy.from_settings(self.settings_controller.get),
+                ),
+            }
+        self.decoded_results = None
+        self.draft_image = None
+        self.results = prune_generation_results(run_generation(data))
+        if (processing_instructions or {}).get("draft"):
+            # Drafts are only shown in the preview layer, at the region size.
+            images = self.results.get("images") if isinstance(self.results, dict) else None
+            if images and isinstance(images[0], str):
+                self.draft_image = KritaAdapter.decode_preview(images[0], width, height)
+            return
+        # Decode on this worker thread so the UI thread only inserts layers.
+        self.decoded_results = KritaAdapter.decode_results(
+            self.results,
+            width,
+            height,
+            self.settings_controller.get("defaults.result_resampling"),
+        )
+        color_match = (processing_instructions or {}).get("color_match")
+        if isinstance(color_match, dict):
+            self.decoded_results = self._match_result_colors(data, color_match)
+
+    def _match_result_colors(self, data: dict, color_match: dict):
+        """Colour-match the decoded results to the uploaded source image."""
+        reference = data.get("img2img_img") or data.get("inpaint_img")
+        if not isinstance(reference, str):
+            # Streamed sources are not kept in memory; leave results as they are.
+            return self.decoded_results
+        mask = data.get("mask_img") if color_match.get("masked") else None
+        return KritaAdapter.match_result_colors(
+            self.decoded_results,
+            reference,
+            color_match.get("mode", "off"),
+            mask if isinstance(mask, str) else None,
+            invert_mask=bool(data.get("inpainting_mask_invert")),
+        )
 
     def threadable_return(
         self,
@@ -323,25 +604,53 @@ class GenerateWidget(QWidget):
         height: int,
         processing_instructions: dict,
     ) -> None:
+        job = self.current_job
+        superseded = job is not None and job.id in self._superseded
         try:
             layer_adapter = KritaAdapter()
-            if self.results is not None:
+            if processing_instructions.get("draft"):
                 self.finished = True
-                self.results = prune_generation_results(self.results)
+                if self.draft_image is not None:
+                    self.kc.apply_preview_image(self.draft_image, x, y)
+                    self._draft_shown = True
+            elif superseded:
+                self._superseded.discard(job.id)
+                self._draft_shown = False
+            elif self.results is not None:
+                self.finished = True
+                if job is not None and job.id == self._pending_final:
+                    self._pending_final = None
+                decoded_results = self.decoded_results or self.results
+                resample = self.settings_controller.get("defaults.result_resampling")
 
                 below_layer_uuid = processing_instructions.get("results_below_layer_uuid")
                 if below_layer_uuid:
                     below_layer = layer_adapter.get_layer_from_uuid(below_layer_uuid)
                     layer_adapter.results_to_layers(
-                        self.results,
+                        decoded_results,
                         x,
                         y,
                         width,
                         height,
                         below_layer=below_layer,
+                        resample=resample,
                     )
                 else:
-                    layer_adapter.results_to_layers(self.results, x, y, width, height)
+                    layer_adapter.results_to_layers(
+                        decoded_results, x, y, width, height, resample=resample,
+                    )
+                # Drop the draft or progress preview in the same UI call that
+                # inserted the results, so the canvas never shows neither and
+                # the projection below is of the results alone.
+                self._draft_shown = False
+                self.kc.delete_preview_layer()
+
+                region = processing_instructions.get("incremental_region")
+                if isinstance(region, dict):
+                    # Later edits are diffed against the region as it looks now.
+                    layer_adapter.remember_projection(
+                        region["x"], region["y"], region["w"], region["h"],
+                    )
 
                 # Save to history (async thumbnail write, non-blocking)
                 if "images" in self.results and len(self.results["images"]) > 0:
@@ -355,9 +664,15 @@ class GenerateWidget(QWidget):
                     f"{self.debug_data.toPlainText()}\nThreadable return had no results"
                 )
         finally:
+            if not self.job_queue and self._pending_final is None:
+                # Nothing will replace the draft any more.
+                self._draft_shown = False
             self._restore_hidden_layers()
+            if self._sent_job is not None:
+                self._release_streams(self._sent_job)
+                self._sent_job = None
             self.current_job = None
-            self._stop_generation_loop()
+            self._stop_generation_loop(delete_preview=not self._draft_shown)
             self.update()
 
             if self.job_queue and not self.abort:
@@ -369,9 +684,13 @@ class GenerateWidget(QWidget):
                 self._update_queue_status()
                 self.update()
 
-    def _stop_generation_loop(self) -> None:
+    def _stop_generation_loop(self, delete_preview: bool = True) -> None:
         self.update_progress_bar(0)
-        self.kc.delete_preview_layer()
+        self._preview_frames.clear()
+        self._preview_commit_timer.stop()
+        if delete_preview:
+            self._draft_shown = False
+            self.kc.delete_preview_layer()
         if self.progress_timer is not None:
             self.progress_timer.stop()
         self.is_generating = False
@@ -382,7 +701,10 @@ class GenerateWidget(QWidget):
             self.api.interrupt()
             self.abort = True
             self.current_job = None
+            for job in self.job_queue:
+                self._release_streams(job)
             self.job_queue.clear()
+            self._pending_final = None
             self.generate_btn.setText("Generate")
             self.progress_bar.setHidden(True)
             self._stop_generation_loop()
@@ -393,6 +715,22 @@ class GenerateWidget(QWidget):
                 f"Forge SD - Exception trying to interrupt: {error}"
             ) from error
 
+    def _release_streams(self, job: GenerationJob) -> None:
+        """Close the spooled uploads of ``job`` that no queued job still sends.
+
+        A draft and its final share streams, and the image input reuses its
+        stream until it is closed.
+        """
+        in_use = {
+            id(stream)
+            for queued in self.job_queue + [self.current_job]
+            if queued is not None and queued is not job
+            for stream in iter_streams(queued.data)
+        }
+        for stream in iter_streams(job.data):
+            if id(stream) not in in_use:
+                stream.close()
+
     def _update_queue_status(self) -> None:
         """Update the queue status label and clear button visibility."""
         queued = len(self.job_queue)
@@ -407,7 +745,9 @@ class GenerateWidget(QWidget):
 
     def _clear_queue(self) -> None:
         """Remove all queued jobs without cancelling the current one."""
-        self.job_queue.clear()
+        queued, self.job_queue = self.job_queue, []
+        for job in queued:
+            self._release_streams(job)
         self._update_queue_status()
 
     def _restore_hidden_layers(self) -> None:
@@ -462,3 +802,12 @@ class GenerateWidget(QWidget):
         if self._detect_turbo_lora(prompt):
             data["steps"] = min(data.get("steps", 20), 8)
             # Keep CFG as set by user or model config
+
+
+def _close_preview_worker(
+    frames: LatestFrameSlot, executor: ThreadPoolExecutor, *_,
+) -> None:
+    # Bound to the slot and executor rather than the widget, which is gone by
+    # the time ``destroyed`` fires. A decode still running is dropped on arrival.
+    frames.clear()
+    executor.shutdown(wait=False)
@@ -16,6 +16,8 @@ from ..qt_compat import (
 
 from ..adapters.krita_adapter import KritaAdapter
 from ..adapters.sd_api import SDAPI
+from ..domain.image_codec import IMAGE_ROLE_INIT, IMAGE_ROLE_MASK, UploadCodecPolicy
+from ..domain.streamed_payload import StreamedImage
 from ..settings_controller import SettingsController
 
 
@@ -29,6 +31,8 @@ class ImageInWidget(QWidget):
         key: str,
         size_dict: dict | None = None,
         hide_refresh: bool = True,
+        upload_role: str = IMAGE_ROLE_INIT,
+        allow_incremental: bool = False,
     ) -> None:
         super().__init__()
         self.settings_controller = settings_controller
@@ -36,9 +40,13 @@ class ImageInWidget(QWidget):
         self.key = key
         self.size_dict = size_dict or {"x": 0, "y": 0, "w": 0, "h": 0}
         self.hide_refresh = hide_refresh
+        self.upload_role = upload_role
+        self.allow_incremental = allow_incremental
         self.selection_mode = "canvas"
         self.kc = KritaAdapter()
         self.image: QImage | None = None
+        self.streamed: StreamedImage | None = None
+        self.streamed_region: tuple[int, int, int, int] | None = None
 
         self.setLayout(QVBoxLayout())
         self.layout().setContentsMargins(0, 0, 0, 0)
@@ -81,10 +89,21 @@ class ImageInWidget(QWidget):
         if not self.hide_refresh:
             self.layout().addWidget(self.refresh_before_gen_cb)
 
+        self.incremental_cb = QCheckBox("Only re-render changed area")
+        self.incremental_cb.setToolTip(
+            "After a result lands, later edits are sent as an inpaint of just "
+            "the changed area instead of the whole region."
+        )
+        self.incremental_cb.setChecked(self.settings_controller.get("incremental.enabled"))
+        self.incremental_cb.toggled.connect(self._save_incremental)
+        if self.allow_incremental:
+            self.layout().addWidget(self.incremental_cb)
+
     def clear_previews(self) -> None:
         self.preview_list.clear()
         self.preview_list.addItem(QListWidgetItem(QIcon(), "No Image Selected"))
         self.image = None
+        self.streamed = None
 
     def get_selection_img(self) -> None:
         self.selection_mode = "selection"
@@ -94,7 +113,7 @@ class ImageInWidget(QWidget):
             self.size_dict["w"],
             self.size_dict["h"],
         ) = self.kc.get_selection_bounds()
-        self.get_img()
+        self.get_img(fresh=True)
 
     def get_layer_img(self) -> None:
         self.selection_mode = "layer"
@@ -104,7 +123,7 @@ class ImageInWidget(QWidget):
             self.size_dict["w"],
             self.size_dict["h"],
         ) = self.kc.get_layer_bounds()
-        self.get_img()
+        self.get_img(fresh=True)
 
     def get_canvas_img(self) -> None:
         self.selection_mode = "canvas"
@@ -114,17 +133,35 @@ class ImageInWidget(QWidget):
             self.size_dict["w"],
             self.size_dict["h"],
         ) = self.kc.get_canvas_bounds()
-        self.get_img()
+        self.get_img(fresh=True)
 
-    def get_img(self, selection_mode: str | None = None) -> None:
+    def get_img(self, selection_mode: str | None = None, fresh: bool = False) -> None:
         selection_mode = selection_mode or self.selection_mode
+        self.streamed = None
+
+        x, y, width, height = self.kc.bounds_for_mode(selection_mode)
+        policy = UploadCodecPolicy.from_settings(self.settings_controller.get)
+        if self.upload_role == IMAGE_ROLE_INIT and policy.should_stream(width, height):
+            # Very large regions are encoded strip by strip right away and
+            # never held as a full-size QImage.
+            self.streamed = self.kc.stream_projection(
+                x, y, width, height, policy.png_compression,
+            )
+            self.streamed_region = (x, y, width, height)
+        if self.streamed is not None:
+            self.image = None
+            self.preview_list.clear()
+            self.preview_list.addItem(
+                QListWidgetItem(QIcon(), f"{width} x {height} (streamed)")
+            )
+            return
 
         if selection_mode == "selection":
-            self.image = self.kc.get_selection_img()
+            self.image = self.kc.get_selection_img(fresh=fresh)
         elif selection_mode == "layer":
-            self.image = self.kc.get_selected_layer_img()
+            self.image = self.kc.get_selected_layer_img(fresh=fresh)
         else:
-            self.image = self.kc.get_canvas_img()
+            self.image = self.kc.get_canvas_img(fresh=fresh)
 
         self.preview_list.clear()
         self.preview_list.addItem(
@@ -135,14 +172,80 @@ class ImageInWidget(QWidget):
         if self.refresh_before_gen_cb.isChecked():
             self._refresh_image_before_generation()
 
-        if self.image is None:
+        if self.streamed is not None and self.streamed.closed:
+            # The last job's spool was released once it was sent.
+            self.get_img()
+
+        if self.image is None and self.streamed is None:
             _, _, selection_width, selection_height = self.kc.get_selection_bounds()
             if selection_width > 0 and selection_height > 0:
                 self.get_selection_img()
             else:
                 self.get_canvas_img()
 
-        return {self.key: self.kc.qimage_to_b64_str(self.image) if self.image else None}
+        policy = UploadCodecPolicy.from_settings(self.settings_controller.get)
+        if self.streamed is not None:
+            return {self.key: self._streamed_upload(policy)}
+        if self.image is None:
+            return {self.key: None}
+        if self.allow_incremental and self.incremental_cb.isChecked():
+            return self._incremental_upload(policy)
+        return {self.key: self.kc.encode_upload(self.image, self.upload_role, policy)}
+
+    def _incremental_upload(self, policy: UploadCodecPolicy) -> dict:
+        """Send only the area changed since the last result, as an inpaint.
+
+        The region is remembered once its results land; until then, or when
+        most of it changed, the whole image is sent as usual.
+        """
+        x, y = self.size_dict["x"], self.size_dict["y"]
+        width, height = self.image.width(), self.image.height()
+        forge_data = {"incremental_region": {"x": x, "y": y, "w": width, "h": height}}
+        dirty = self.kc.dirty_update(
+            x,
+            y,
+            width,
+            height,
+            self.settings_controller.get("incremental.padding"),
+            self.settings_controller.get("incremental.feather"),
+        )
+        if dirty is None:
+            return {
+                self.key: self.kc.encode_upload(self.image, self.upload_role, policy),
+                "FORGE": forge_data,
+            }
+
+        update, image, mask = dirty
+        forge_data["crop"] = {
+            "x": x + update.rect.x,
+            "y": y + update.rect.y,
+            "w": update.rect.width,
+            "h": update.rect.height,
+        }
+        return {
+            self.key: self.kc.encode_upload(image, self.upload_role, policy),
+            "mask_img": self.kc.encode_upload(mask, IMAGE_ROLE_MASK, policy),
+            "mask_blur": 0,  # the mask is feathered already
+            "inpainting_fill": 1,  # original
+            "inpaint_full_res": 0,
+            "inpainting_mask_invert": 0,
+            "FORGE": forge_data,
+        }
+
+    def _save_incremental(self, enabled: bool) -> None:
+        self.settings_controller.set("incremental.enabled", enabled)
+        self.settings_controller.debounced_save()
+
+    def _streamed_upload(self, policy: UploadCodecPolicy) -> StreamedImage:
+        """Re-stream the region at the upload size when the plan shrinks it."""
+        x, y, width, height = self.streamed_region
+        target = self.kc.upload_size(width, height)
+        if target == (self.streamed.width, self.streamed.height):
+            return self.streamed
+        resized = self.kc.stream_projection(
+            x, y, width, height, policy.png_compression, target,
+        )
+        return resized if resized is not None else self.streamed
 
     def _refresh_image_before_generation(self) -> None:
         clear_selection = False
@@ -4,6 +4,7 @@ import json
 from ..adapters.sd_api import SDAPI
 from ..settings_controller import SettingsController
 from ..adapters.krita_adapter import KritaAdapter
+from ..domain.streamed_payload import json_default
 from ..widgets import PromptWidget
 from ..widgets import ImageInWidget
 from ..widgets import InterrogateModelWidget
@@ -75,7 +76,7 @@ class InterrogateWidget(QWidget):
 
         # TODO: Check settings for anything that changes the parameters, such as limiting generation size, HR Fix, upscaling, clip skip, etc
         if self.debug:
-            self.debug_data.setPlainText("%s" % json.dumps(data))
+            self.debug_data.setPlainText("%s" % json.dumps(data, default=json_default))
             # return
 
         self.interrogate_btn.setText("Interrogating...")
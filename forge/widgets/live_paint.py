@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..qt_compat import QCheckBox, QHBoxLayout, QLabel, QSpinBox, QVBoxLayout, QWidget
+from krita import QTimer
+
+from ..adapters.krita_adapter import KritaAdapter
+from ..adapters.sd_api import SDAPI
+from ..domain.generation_plan import prune_generation_results
+from ..domain.image_codec import IMAGE_ROLE_INIT, UploadCodecPolicy
+from ..domain.live_session import LIVE_CANCEL, LIVE_SUBMIT, LivePaintScheduler
+from ..domain.preview_pipeline import LatestFrameSlot
+from ..domain.telemetry import telemetry
+from ..settings_controller import SettingsController
+from .generate import GenerateWidget, GenerationJob
+from .image_in import ImageInWidget
+
+logger = logging.getLogger(__name__)
+
+
+class LivePaintWidget(QWidget):
+    """Regenerate the img2img region with a quick pass while the user paints.
+
+    The region is polled for edits; once it has been still for the debounce
+    interval a low-step img2img of just that region is sent and the result
+    shown in a preview layer. An edit while a request is running interrupts
+    it instead of queueing another, so only the newest canvas state is ever
+    generated. Regular generation pauses live mode.
+    """
+
+    def __init__(
+        self,
+        settings_controller: SettingsController,
+        api: SDAPI,
+        generate_widget: GenerateWidget,
+        image_in: ImageInWidget,
+    ) -> None:
+        super().__init__()
+        self.settings_controller = settings_controller
+        self.api = api
+        self.generate_widget = generate_widget
+        self.image_in = image_in
+
+        # Owns the live preview layer, separate from the generate widget's.
+        self.kc = KritaAdapter()
+        self.scheduler = LivePaintScheduler(
+            self.settings_controller.get("live.debounce_ms") / 1000
+        )
+        self._source = None
+        self._results: LatestFrameSlot = LatestFrameSlot()
+        # One worker runs the request, the other can interrupt it meanwhile.
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="forge-live")
+        self._timer = QTimer()
+        self._timer.timeout.connect(self.tick)
+
+        self.setLayout(QVBoxLayout())
+        self.layout().setContentsMargins(0, 0, 0, 0)
+
+        self.live_cb = QCheckBox("Live Painting")
+        self.live_cb.setToolTip(
+            "Regenerate the selected region in a preview layer shortly after each edit."
+        )
+        self.live_cb.toggled.connect(self.set_live)
+        self.layout().addWidget(self.live_cb)
+
+        steps_row = QWidget()
+        steps_row.setLayout(QHBoxLayout())
+        steps_row.layout().setContentsMargins(0, 0, 0, 0)
+        steps_row.layout().addWidget(QLabel("Live Steps"))
+        self.steps_box = QSpinBox()
+        self.steps_box.setMinimum(1)
+        self.steps_box.setMaximum(30)
+        self.steps_box.setValue(self.settings_controller.get("live.steps"))
+        self.steps_box.setToolTip("Sampling steps for live results; turbo models need only a few.")
+        self.steps_box.valueChanged.connect(self.save_settings)
+        steps_row.layout().addWidget(self.steps_box)
+        self.status_label = QLabel("")
+        steps_row.layout().addWidget(self.status_label)
+        self.layout().addWidget(steps_row)
+
+    def save_settings(self) -> None:
+        self.settings_controller.set("live.steps", self.steps_box.value())
+        self.settings_controller.debounced_save()
+
+    def set_live(self, enabled: bool) -> None:
+        in_flight = self.scheduler.in_flight is not None
+        self.scheduler.reset()
+        self._results.clear()
+        if enabled:
+            self._timer.start(self.settings_controller.get("live.poll_ms"))
+            self.status_label.setText("Live: waiting")
+            return
+
+        self._timer.stop()
+        if in_flight:
+            self._executor.submit(self.api.interrupt)
+        self.kc.delete_preview_layer()
+        self.status_label.setText("")
+
+    def tick(self) -> None:
+        finished = self._results.take()
+        if finished is not None:
+            self._commit(*finished)
+
+        if self.generate_widget.is_generating:
+            return
+        region = self.generate_widget.resolve_generation_bounds()
+        if region[2] <= 0 or region[3] <= 0:
+            return
+
+        state = (region, self.kc.live_revision(*region))
+        action = self.scheduler.poll(state, time.monotonic())
+        if action == LIVE_CANCEL:
+            telemetry.increment("live.cancelled")
+            self._executor.submit(self.api.interrupt)
+        elif action == LIVE_SUBMIT:
+            self._submit(state, region)
+
+    def get_generation_data(self) -> dict:
+        """Stand in for the image input with the live capture and few steps."""
+        policy = UploadCodecPolicy.from_settings(self.settings_controller.get)
+        return {
+            self.image_in.key: self.kc.encode_upload(self._source, IMAGE_ROLE_INIT, policy),
+            "sampling_steps": self.steps_box.value(),
+            "batch_count": 1,
+            "batch_size": 1,
+        }
+
+    def _submit(self, state, region: tuple[int, int, int, int]) -> None:
+        ticket = self.scheduler.submit(state, time.monotonic())
+        self._source = self.kc.capture_live_source(*region)
+        try:
+            widgets = [
+                widget
+                for widget in self.generate_widget.list_of_widgets
+                if widget is not self.image_in
+            ]
+            job = self.generate_widget.build_job(widgets + [self])
+        finally:
+            self._source = None
+        if job is None:
+            # No prompt yet; wait for the next edit rather than retrying.
+            self.scheduler.finish(ticket.token, time.monotonic())
+            self.status_label.setText("Live: enter a prompt")
+            return
+
+        telemetry.increment("live.submitted")
+        self.status_label.setText("Live: generating")
+        self._executor.submit(self._run, ticket.token, job)
+
+    def _run(self, token: int, job: GenerationJob) -> None:
+        """Generate on a live worker and leave the decoded result for the UI thread."""
+        image = None
+        try:
+            with telemetry.timed("live.request_ms"):
+                results = prune_generation_results(self.api.img2img(job.data))
+            images = results.get("images") if isinstance(results, dict) else None
+            if images and isinstance(images[0], str):
+                image = KritaAdapter.decode_preview(images[0], job.width, job.height)
+        except Exception:
+            logger.exception("Live img2img request failed")
+        self._results.put((token, job, image))
+
+    def _commit(self, token: int, job: GenerationJob, image) -> None:
+        round_trip = self.scheduler.finish(token, time.monotonic())
+        if round_trip is None:
+            telemetry.increment("live.stale_dropped")
+            return
+        if image is None:
+            self.status_label.setText("Live: no result")
+            return
+
+        telemetry.record("live.round_trip_ms", round_trip * 1000.0)
+        self.kc.apply_preview_image(image, job.x, job.y)
+        self.status_label.setText(f"Live: {round_trip * 1000.0:.0f} ms")
@@ -23,6 +23,20 @@ from ..qt_compat import (
 )
 
 from ..adapters.krita_adapter import KritaAdapter
+from ..domain.image_codec import (
+    IMAGE_ROLE_CONTROL,
+    IMAGE_ROLE_INIT,
+    IMAGE_ROLE_MASK,
+    UploadCodecPolicy,
+)
+from ..domain.mask_ops import (
+    mask_feather,
+    mask_grow,
+    mask_invert,
+    mask_shrink,
+    padded_crop,
+)
+from ..domain.telemetry import telemetry
 from ..adapters.sd_api import SDAPI
 from ..settings_controller import SettingsController
 from ..widgets import CollapsibleWidget
@@ -36,11 +50,13 @@ class MaskWidget(QWidget):
         settings_controller: SettingsController,
         api: SDAPI,
         size_dict: dict,
+        allow_crop: bool = True,
     ) -> None:
         super().__init__()
         self.settings_controller = settings_controller
         self.api = api
         self.size_dict = size_dict
+        self.allow_crop = allow_crop
         self.kc = KritaAdapter()
 
         self.variables = {
@@ -61,6 +77,9 @@ class MaskWidget(QWidget):
             "reference_layer": self.settings_controller.get(
                 "inpaint.reference_layer", ""
             ),
+            "mask_op_radius": self.settings_controller.get("inpaint.mask_op_radius"),
+            "local_feather": self.settings_controller.get("inpaint.local_feather"),
+            "crop_to_mask": self.settings_controller.get("inpaint.crop_to_mask"),
         }
 
         self.selection_mode = "canvas"
@@ -139,6 +158,35 @@ class MaskWidget(QWidget):
 
         self.layout().addWidget(mask_row)
 
+        ops_row = QWidget()
+        ops_row.setLayout(QHBoxLayout())
+        ops_row.layout().setContentsMargins(0, 0, 0, 0)
+
+        radius_box = QSpinBox()
+        radius_box.setRange(1, 256)
+        radius_box.setSuffix("px")
+        radius_box.setToolTip("Radius used by Grow, Shrink and Feather.")
+        radius_box.setValue(self.variables["mask_op_radius"])
+        radius_box.valueChanged.connect(
+            lambda: self._update_variable("mask_op_radius", radius_box.value())
+        )
+        ops_row.layout().addWidget(radius_box)
+
+        for label, tooltip, operation in (
+            ("Invert", "Invert the mask layer.", self._invert_operation),
+            ("Grow", "Expand the mask by the radius.", self._grow_operation),
+            ("Shrink", "Contract the mask by the radius.", self._shrink_operation),
+            ("Feather", "Soften the mask edge over the radius.", self._feather_operation),
+        ):
+            button = QPushButton(label)
+            button.setToolTip(tooltip)
+            button.clicked.connect(
+                lambda _checked=False, op=operation: self._apply_mask_operation(op())
+            )
+            ops_row.layout().addWidget(button)
+
+        self.layout().addWidget(ops_row)
+
         self._brush_poll_timer = QTimer(self)
         self._brush_poll_timer.setInterval(500)
         self._brush_poll_timer.timeout.connect(self._poll_brush_size)
@@ -211,6 +259,27 @@ class MaskWidget(QWidget):
         )
         form.layout().addRow("Mask Blur", blur_box)
 
+        local_feather = QCheckBox("Blur mask locally")
+        local_feather.setToolTip(
+            "Feather the mask in Krita by the Mask Blur radius instead of on the server."
+        )
+        local_feather.setChecked(self.variables["local_feather"])
+        local_feather.stateChanged.connect(
+            lambda: self._update_variable("local_feather", local_feather.isChecked())
+        )
+        form.layout().addRow("", local_feather)
+
+        crop_to_mask = QCheckBox("Send only the masked area")
+        crop_to_mask.setToolTip(
+            "Upload just the mask's bounding box plus padding instead of the whole "
+            "image, and place the result back at that spot."
+        )
+        crop_to_mask.setChecked(self.variables["crop_to_mask"])
+        crop_to_mask.stateChanged.connect(
+            lambda: self._update_variable("crop_to_mask", crop_to_mask.isChecked())
+        )
+        form.layout().addRow("", crop_to_mask)
+
         mask_mode = QComboBox()
         mask_mode.addItems(["Inpaint masked", "Inpaint not masked"])
         mask_mode.setMinimumContentsLength(10)
@@ -312,6 +381,29 @@ class MaskWidget(QWidget):
             return
         self.kc.fill_mask_layer(layer)
 
+    def _invert_operation(self):
+        return lambda mask, width, height: mask_invert(mask)
+
+    def _grow_operation(self):
+        radius = self.variables["mask_op_radius"]
+        return lambda mask, width, height: mask_grow(mask, width, height, radius)
+
+    def _shrink_operation(self):
+        radius = self.variables["mask_op_radius"]
+        return lambda mask, width, height: mask_shrink(mask, width, height, radius)
+
+    def _feather_operation(self):
+        radius = self.variables["mask_op_radius"]
+        return lambda mask, width, height: mask_feather(mask, width, height, radius)
+
+    def _apply_mask_operation(self, operation) -> None:
+        if self.mask_uuid is None:
+            return
+        layer = self.kc.get_layer_from_uuid(self.mask_uuid)
+        if layer is None:
+            return
+        self.kc.apply_mask_operation(operation, layer)
+
     def _poll_brush_size(self) -> None:
         size = self.kc.get_active_brush_size()
         if size > 0:
@@ -363,7 +455,7 @@ class MaskWidget(QWidget):
         self.update_size_dict(mode)
 
         self.mask_uuid = self.kc.get_active_layer_uuid()
-        self.mask, self.image = self.kc.get_mask_and_image(mode)
+        self.mask, self.image = self.kc.get_mask_and_image(mode, fresh=True)
         self.update_preview_icons()
 
     def save_settings(self) -> None:
@@ -388,6 +480,15 @@ class MaskWidget(QWidget):
         self.settings_controller.set(
             "inpaint.reference_layer", self.variables["reference_layer"]
         )
+        self.settings_controller.set(
+            "inpaint.mask_op_radius", self.variables["mask_op_radius"]
+        )
+        self.settings_controller.set(
+            "inpaint.local_feather", self.variables["local_feather"]
+        )
+        self.settings_controller.set(
+            "inpaint.crop_to_mask", self.variables["crop_to_mask"]
+        )
         self.settings_controller.save()
 
     def get_generation_data(self) -> dict:
@@ -415,10 +516,28 @@ class MaskWidget(QWidget):
             "inpaint_full_res_padding": self.variables["mask_padding"],
         }
 
-        if self.image is not None:
-            data["inpaint_img"] = self.kc.qimage_to_b64_str(self.image)
-        if self.mask is not None:
-            data["mask_img"] = self.kc.qimage_to_b64_str(self.mask)
+        forge_data = {}
+        image, mask = self.image, self.mask
+        crop = self._mask_crop()
+        if crop is not None:
+            image = image.copy(crop.x, crop.y, crop.width, crop.height)
+            mask = mask.copy(crop.x, crop.y, crop.width, crop.height)
+            forge_data["crop"] = {
+                "x": self.size_dict["x"] + crop.x,
+                "y": self.size_dict["y"] + crop.y,
+                "w": crop.width,
+                "h": crop.height,
+            }
+
+        policy = UploadCodecPolicy.from_settings(self.settings_controller.get)
+        if image is not None:
+            data["inpaint_img"] = self.kc.encode_upload(image, IMAGE_ROLE_INIT, policy)
+        if mask is not None:
+            if self.variables["local_feather"] and self.variables["mask_blur"] > 0:
+                # Feathered on the generation worker (see GenerateWidget.threadable_run).
+                forge_data["feather_mask"] = self.variables["mask_blur"]
+                data["mask_blur"] = 0
+            data["mask_img"] = self.kc.encode_upload(mask, IMAGE_ROLE_MASK, policy)
 
         ref_layer_name = self.variables.get("reference_layer", "")
         if ref_layer_name:
@@ -426,10 +545,14 @@ class MaskWidget(QWidget):
             if ref_node is not None:
                 ref_image = self.kc.get_layer_projection_image(ref_node)
                 if not ref_image.isNull():
-                    data["reference_image"] = self.kc.qimage_to_b64_str(ref_image)
+                    data["reference_image"] = self.kc.encode_upload(
+                        ref_image, IMAGE_ROLE_CONTROL, policy,
+                    )
 
         if self.variables["results_below_mask"] and self.mask_uuid is not None:
-            data["FORGE"] = {"results_below_layer_uuid": self.mask_uuid}
+            forge_data["results_below_layer_uuid"] = self.mask_uuid
+        if forge_data:
+            data["FORGE"] = forge_data
 
         if self.variables["hide_mask_on_gen"] and self.mask_uuid is not None:
             layer = self.kc.get_layer_from_uuid(self.mask_uuid)
@@ -439,6 +562,44 @@ class MaskWidget(QWidget):
 
         return data
 
+    def _mask_crop(self):
+        """Return the padded mask bounds to upload, or ``None`` for the full image.
+
+        Only used for "Inpaint masked"; the crop also covers the mask blur so
+        feathered edges are not cut off.
+        """
+        if (
+            not self.allow_crop
+            or not self.variables["crop_to_mask"]
+            or self.variables["mask_mode"] != 0
+            or self.image is None
+            or self.mask is None
+        ):
+            return None
+
+        width, height = self.mask.width(), self.mask.height()
+        bounds = self.kc.mask_image_bounds(self.mask)
+        if bounds is None:
+            return None
+
+        crop = padded_crop(
+            bounds,
+            self.variables["mask_padding"] + self.variables["mask_blur"],
+            width,
+            height,
+        )
+        if crop.width * crop.height >= width * height:
+            return None
+
+        telemetry.increment("inpaint.cropped_uploads")
+        telemetry.increment(
+            "inpaint.pixels_saved", width * height - crop.width * crop.height,
+        )
+        telemetry.record(
+            "inpaint.crop_area_ratio", crop.width * crop.height / (width * height),
+        )
+        return crop
+
     def restore_hidden_layers(self) -> None:
         for uuid_str in self._hidden_layer_uuids:
             layer = self.kc.get_layer_from_uuid(uuid_str)
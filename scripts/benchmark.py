@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Time the plugin's hot paths outside Krita.
+
+Each benchmark prints one line per size with the wall time of the best
+run and the peak Python allocation (tracemalloc) of a separate run, so
+the numbers quoted in commits can be reproduced on any machine.
+
+Benchmarks that touch QImage need PyQt5; the Krita runtime is stubbed.
+
+Usage:
+    python scripts/benchmark.py mask-ops
+    python scripts/benchmark.py mask-ops --sizes 1024 4096 --no-numpy
+    python scripts/benchmark.py alpha-mask
+    python scripts/benchmark.py composite --sizes 2048 4096 8192 --layers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+import types
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Resolve the project root (parent of scripts/)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _install_stubs() -> None:
+    """Stub the Krita runtime so forge imports outside the application."""
+    krita = types.ModuleType("krita")
+    for name in ("DockWidget", "DockWidgetFactory", "DockWidgetFactoryBase", "Krita",
+                 "QTimer", "QUuid", "Selection"):
+        setattr(krita, name, MagicMock())
+    sys.modules.setdefault("krita", krita)
+    docker = types.ModuleType("forge.forge")
+    docker.ForgeDocker = object
+    sys.modules.setdefault("forge.forge", docker)
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def measure(fn, repeat: int) -> tuple[float, int]:
+    """Return (best seconds, peak traced bytes) for calling fn()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def report(name: str, size: int, seconds: float, peak: int) -> None:
+    print(f"{name:<14} {size:>5}²  {seconds:7.3f} s  peak {peak / 2**20:7.1f} MiB")
+
+
+def bench_mask_ops(args: argparse.Namespace) -> None:
+    """Grow, shrink and feather a square mask at --radius."""
+    from forge.domain import mask_ops
+
+    if args.no_numpy:
+        mask_ops.numpy = None
+    print(f"mask ops, radius {args.radius}, numpy={'off' if mask_ops.numpy is None else 'on'}")
+    for size in args.sizes:
+        inset = size // 4
+        row = bytes(inset) + b"\xff" * (size - 2 * inset) + bytes(inset)
+        source = bytes(size * inset) + row * (size - 2 * inset) + bytes(size * inset)
+        for op in (mask_ops.mask_grow, mask_ops.mask_shrink, mask_ops.mask_feather):
+            seconds, peak = measure(
+                lambda: op(bytearray(source), size, size, args.radius), args.repeat,
+            )
+            report(op.__name__, size, seconds, peak)
+
+
+def bench_alpha_mask(args: argparse.Namespace) -> None:
+    """Build an inpaint mask from the alpha of Krita BGRA pixel data."""
+    from forge.adapters.krita_adapter import KritaAdapter
+    from forge.domain import image_buffer
+    from forge.qt_compat import QImage, qAlpha, qRgb
+
+    if args.no_numpy:
+        image_buffer.numpy = None
+
+    def per_pixel(pixels: bytes, width: int, height: int) -> QImage:
+        # The loop alpha_to_mask used before it read the alpha plane directly.
+        image = QImage(pixels, width, height, QImage.Format.Format_ARGB32)
+        for x in range(width):
+            for y in range(height):
+                alpha = qAlpha(image.pixel(x, y))
+                image.setPixel(x, y, qRgb(alpha, alpha, alpha))
+        return image
+
+    print(f"alpha_to_mask, numpy={'off' if image_buffer.numpy is None else 'on'}")
+    for size in args.sizes:
+        pixels = bytes(range(256)) * (size * size * 4 // 256)
+        seconds, peak = measure(lambda: KritaAdapter.alpha_to_mask(pixels, size, size), args.repeat)
+        report("alpha_to_mask", size, seconds, peak)
+        if size <= 1024:
+            # The per-pixel loop is far too slow to time at larger sizes.
+            seconds, peak = measure(lambda: per_pixel(pixels, size, size), 1)
+            report("per-pixel", size, seconds, peak)
+
+
+def bench_composite(args: argparse.Namespace) -> None:
+    """Composite a --region square without the mask layer, on a synthetic stack.
+
+    Hiding the mask layer makes Krita recomposite the whole document twice
+    (hide, then show again). Krita is not available here, so that cost is
+    approximated by the same QPainter compositing over the whole document,
+    twice. Krita's own compositor is multi-threaded, so treat the ratio as
+    an upper bound.
+    """
+    from forge.adapters.krita_adapter import KritaAdapter
+    from forge.qt_compat import QColor
+
+    class Node:
+        def __init__(self, uid, children=(), mode="normal", opacity=255):
+            self.uid, self.children, self.mode, self.alpha = uid, list(children), mode, opacity
+            self.parent = None
+            for child in self.children:
+                child.parent = self
+
+        def uniqueId(self): return self.uid
+        def type(self): return "grouplayer" if self.children else "paintlayer"
+        def childNodes(self): return self.children
+        def parentNode(self): return self.parent
+        def visible(self): return True
+        def opacity(self): return self.alpha
+        def blendingMode(self): return self.mode
+        def inheritAlpha(self): return False
+        def passThroughMode(self): return False
+
+        def projectionPixelData(self, x, y, width, height):
+            # Krita hands out a fresh copy of the region on every call.
+            return bytes(range(256)) * (width * height * 4 // 256)
+
+    class Document:
+        def __init__(self, root): self.root = root
+        def colorModel(self): return "RGBA"
+        def colorDepth(self): return "U8"
+        def rootNode(self): return self.root
+        def backgroundColor(self): return QColor(255, 255, 255)
+
+    mask = Node("mask")
+    group = Node("group", [Node("under"), mask, Node("shade", mode="multiply", opacity=180)])
+    extra = [Node(f"layer{index}", mode="screen" if index % 2 else "normal")
+             for index in range(max(args.layers - 4, 0))]
+    document = Document(Node("root", [Node("bg"), group] + extra))
+    adapter = KritaAdapter()
+
+    print(f"composite_without, {args.layers} layers, {args.region}² region")
+    for size in args.sizes:
+        region = min(args.region, size)
+        seconds, peak = measure(
+            lambda: adapter.composite_without(document, mask, 0, 0, region, region),
+            args.repeat,
+        )
+        report("region", size, seconds, peak)
+        seconds, peak = measure(
+            lambda: [adapter.composite_without(document, mask, 0, 0, size, size)
+                     for _ in range(2)],
+            1,
+        )
+        report("hide (approx)", size, seconds, peak)
+
+
+BENCHMARKS = {
+    "alpha-mask": bench_alpha_mask,
+    "composite": bench_composite,
+    "mask-ops": bench_mask_ops,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1024, 4096, 8192],
+                        help="Square edge lengths in pixels")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size")
+    parser.add_argument("--radius", type=int, default=16, help="Mask radius (mask-ops)")
+    parser.add_argument("--region", type=int, default=1024,
+                        help="Composited region edge (composite)")
+    parser.add_argument("--layers", type=int, default=8, help="Layer count (composite)")
+    parser.add_argument("--no-numpy", action="store_true",
+                        help="Force the pure-Python fallbacks")
+    args = parser.parse_args()
+
+    _install_stubs()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,16 @@ This file is loaded by pytest before any test module is collected.
 
 from __future__ import annotations
 
+import os
+import subprocess
 import sys
+import textwrap
 import types
+from pathlib import Path
 from unittest.mock import MagicMock
 
+import pytest
+
 # ---------------------------------------------------------------------------
 # Mock the Krita application runtime
 # ---------------------------------------------------------------------------
@@ -66,3 +72,53 @@ if "forge.qt_compat" not in sys.modules:
     ):
         setattr(_qt_compat, _name, MagicMock())
     sys.modules["forge.qt_compat"] = _qt_compat
+
+# ---------------------------------------------------------------------------
+# Real Qt, for the few tests that must check what Qt actually writes or reads.
+# The mocks above own this interpreter's PyQt5, so these run in a subprocess.
+# ---------------------------------------------------------------------------
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_REAL_QT_PRELUDE = """
+import sys, types
+from unittest.mock import MagicMock
+_krita = types.ModuleType("krita")
+for _name in ("DockWidget", "DockWidgetFactory", "DockWidgetFactoryBase", "Krita",
+              "QTimer", "QUuid", "Selection"):
+    setattr(_krita, _name, MagicMock())
+sys.modules["krita"] = _krita
+_forge_module = types.ModuleType("forge.forge")
+_forge_module.ForgeDocker = object
+sys.modules["forge.forge"] = _forge_module
+"""
+
+
+def _run_real_qt(code: str) -> str:
+    env = {**os.environ, "QT_QPA_PLATFORM": "offscreen", "PYTHONPATH": str(_REPO_ROOT)}
+    completed = subprocess.run(
+        [sys.executable, "-c", _REAL_QT_PRELUDE + textwrap.dedent(code)],
+        cwd=_REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if completed.returncode != 0:
+        raise AssertionError(completed.stderr)
+    return completed.stdout
+
+
+@pytest.fixture(scope="session")
+def real_qt():
+    """Return a runner executing a snippet against the real PyQt5.
+
+    The runner returns the snippet's stdout and fails on a non-zero exit.
+    Tests using it are skipped when PyQt5 is not installed.
+    """
+    probe = subprocess.run(
+        [sys.executable, "-c", "import PyQt5.QtGui"], capture_output=True,
+    )
+    if probe.returncode != 0:
+        pytest.skip("PyQt5 is not installed")
+    return _run_real_qt
@@ -0,0 +1,131 @@
+"""Unit tests for forge.domain.capture_cache — revision-checked reuse of
+canvas captures, checksum sampling and the adapter's document revision.
+"""
+
+from __future__ import annotations
+
+from forge.domain.capture_cache import (
+    CaptureCache,
+    DocumentRevision,
+    sample_offsets,
+    sample_step,
+)
+
+
+def _revision(checksum: bytes = b"a", structure: tuple = (("root", True, 1.0),)):
+    return DocumentRevision(
+        modified=True, active_node="layer", structure=structure, checksum=checksum,
+    )
+
+
+class TestSampleOffsets:
+    def test_includes_last(self):
+        assert sample_offsets(10, 20, 8) == [10, 18, 26, 29]
+
+    def test_exact_multiple(self):
+        assert sample_offsets(0, 9, 8) == [0, 8]
+
+    def test_empty(self):
+        assert sample_offsets(0, 0, 8) == []
+
+    def test_step_below_one(self):
+        assert sample_offsets(0, 3, 0) == [0, 1, 2]
+
+
+class TestSampleStep:
+    def test_small_region_is_read_whole(self):
+        assert sample_step(512, 512, 1024 * 1024) == 1
+
+    def test_sample_stays_near_budget(self):
+        budget = 1024 * 1024
+        for width, height in ((4096, 4096), (8192, 8192), (16384, 1024)):
+            step = sample_step(width, height, budget)
+            rows = len(sample_offsets(0, height, step))
+            columns = len(sample_offsets(0, width, step))
+            assert (rows * width + columns * height) * 4 <= 2 * budget
+
+
+class TestCaptureCache:
+    def test_hit_on_same_revision(self):
+        cache = CaptureCache()
+        cache.put("canvas", _revision(), "image")
+        assert cache.get("canvas", _revision()) == "image"
+        assert cache.hits == 1
+
+    def test_checksum_change_misses_and_drops(self):
+        cache = CaptureCache()
+        cache.put("canvas", _revision(), "image")
+        assert cache.get("canvas", _revision(checksum=b"b")) is None
+        assert cache.get("canvas", _revision()) is None
+        assert cache.misses == 2
+
+    def test_structure_change_misses(self):
+        cache = CaptureCache()
+        cache.put("canvas", _revision(), "image")
+        hidden = _revision(structure=(("root", False, 1.0),))
+        assert cache.get("canvas", hidden) is None
+
+    def test_regions_are_separate(self):
+        cache = CaptureCache()
+        cache.put("canvas", _revision(), "canvas image")
+        cache.put("selection", _revision(), "selection image")
+        assert cache.get("canvas", _revision()) == "canvas image"
+        assert cache.get("selection", _revision()) == "selection image"
+
+    def test_evicts_least_recently_used(self):
+        cache = CaptureCache(max_entries=2)
+        cache.put("a", _revision(), 1)
+        cache.put("b", _revision(), 2)
+        cache.get("a", _revision())
+        cache.put("c", _revision(), 3)
+        assert cache.get("b", _revision()) is None
+        assert cache.get("a", _revision()) == 1
+
+    def test_invalidate(self):
+        cache = CaptureCache()
+        cache.put("a", _revision(), 1)
+        cache.invalidate()
+        assert len(cache) == 0
+
+
+class TestDocumentRevision:
+    def test_small_region_counts_every_pixel(self, real_qt):
+        # A region within the sample budget is hashed whole, so one changed
+        # pixel off every 8th row and column still changes the revision.
+        output = real_qt("""
+            from unittest.mock import MagicMock
+            from forge.adapters.krita_adapter import KritaAdapter
+            from forge.qt_compat import QByteArray
+
+            width, height = 40, 30
+            canvas = bytearray(width * height * 4)
+
+            def pixel_data(x, y, w, h):
+                return QByteArray(b"".join(
+                    bytes(canvas[(row * width + x) * 4:(row * width + x + w) * 4])
+                    for row in range(y, y + h)
+                ))
+
+            document = MagicMock()
+            document.rootNode.return_value.childNodes.return_value = []
+            document.modified.return_value = False
+            document.pixelData.side_effect = pixel_data
+            before = KritaAdapter._document_revision(document, 0, 0, width, height)
+            canvas[(3 * width + 3) * 4] = 1
+            after = KritaAdapter._document_revision(document, 0, 0, width, height)
+            print(before == after)
+        """)
+        assert output.strip() == "False"
+
+    def test_fresh_capture_skips_revision(self, real_qt):
+        output = real_qt("""
+            from unittest.mock import MagicMock
+            from forge.adapters.krita_adapter import KritaAdapter
+
+            document = MagicMock()
+            adapter = KritaAdapter()
+            adapter._ensure_document = lambda: document
+            adapter.capture_projection(0, 0, 64, 64, fresh=True)
+            print(document.projection.call_count, document.pixelData.call_count)
+        """)
+        assert output.split() == ["1", "0"]
@@ -0,0 +1,123 @@
+"""Unit tests for forge.domain.color_match — histogram and Lab colour
+transfer of results onto the source image, with optional masking.
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from forge.domain import color_match, image_buffer
+from forge.domain.color_match import (
+    COLOR_MATCH_HISTOGRAM,
+    COLOR_MATCH_LAB,
+    COLOR_MATCH_OFF,
+    channel_histograms,
+    histogram_luts,
+    match_colors,
+)
+from forge.domain.image_buffer import ImageBuffer
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(image_buffer, "numpy", None)
+    return request.param
+
+
+def _image(values, order="RGBA"):
+    """One-row image from (r, g, b, a) tuples."""
+    return ImageBuffer(bytearray(b"".join(bytes(value) for value in values)), len(values), 1, order=order)
+
+
+def _pixels(buffer):
+    data = buffer.tobytes()
+    return [tuple(data[offset:offset + 4]) for offset in range(0, len(data), 4)]
+
+
+def _random_image(count, low, high, seed):
+    rng = random.Random(seed)
+    return _image([
+        (rng.randint(low, high), rng.randint(low, high), rng.randint(low, high), 255)
+        for _ in range(count)
+    ])
+
+
+def _mean(buffer, channel):
+    data = buffer.tobytes()[channel::4]
+    return sum(data) / len(data)
+
+
+class TestHistogramMatch:
+    def test_off_returns_result_unchanged(self):
+        result = _image([(1, 2, 3, 4)])
+        assert match_colors(result, _image([(9, 9, 9, 9)]), COLOR_MATCH_OFF) is result
+
+    def test_unknown_mode_raises(self):
+        with pytest.raises(ValueError):
+            match_colors(_image([(0, 0, 0, 0)]), _image([(0, 0, 0, 0)]), "median")
+
+    def test_maps_levels_onto_reference_levels(self, backend):
+        result = _image([(10, 10, 10, 255), (20, 20, 20, 255)] * 2)
+        reference = _image([(100, 50, 5, 255), (200, 60, 6, 255)] * 2)
+        matched = match_colors(result, reference, COLOR_MATCH_HISTOGRAM)
+        assert _pixels(matched)[:2] == [(100, 50, 5, 255), (200, 60, 6, 255)]
+
+    def test_alpha_is_left_alone(self, backend):
+        result = _image([(10, 10, 10, 7), (20, 20, 20, 9)])
+        matched = match_colors(result, _image([(200, 200, 200, 255)] * 2), COLOR_MATCH_HISTOGRAM)
+        assert [pixel[3] for pixel in _pixels(matched)] == [7, 9]
+
+    def test_identity_when_histograms_match(self, backend):
+        image = _random_image(64, 0, 255, seed=1)
+        luts = histogram_luts(image, image)
+        data = image.tobytes()
+        for channel, lut in enumerate(luts):
+            assert data[channel::4].translate(lut) == data[channel::4]
+
+    def test_reference_order_is_converted(self, backend):
+        result = _image([(10, 10, 10, 255)], order="BGRA")
+        reference = _image([(200, 100, 50, 255)])  # R=200, G=100, B=50
+        matched = match_colors(result, reference, COLOR_MATCH_HISTOGRAM)
+        assert _pixels(matched) == [(50, 100, 200, 255)]
+
+    def test_histograms_sample_large_images(self, monkeypatch):
+        monkeypatch.setattr(color_match, "COLOR_MATCH_MAX_SAMPLES", 4)
+        image = _image([(value, 0, 0, 255) for value in range(16)])
+        assert sum(channel_histograms(image)[0]) == 4
+
+
+class TestLabTransfer:
+    def test_moves_mean_towards_reference(self, backend):
+        result = _random_image(256, 20, 90, seed=2)
+        reference = _random_image(256, 150, 230, seed=3)
+        matched = match_colors(result, reference, COLOR_MATCH_LAB)
+        for channel in range(3):
+            assert abs(_mean(matched, channel) - _mean(reference, channel)) < 12
+
+    def test_self_transfer_is_identity(self, backend):
+        image = _random_image(128, 0, 255, seed=4)
+        matched = match_colors(image, image, COLOR_MATCH_LAB)
+        assert max(abs(a - b) for a, b in zip(matched.tobytes(), image.tobytes())) <= 1
+
+
+class TestMask:
+    def test_only_masked_pixels_change(self, backend):
+        result = _image([(10, 10, 10, 255), (20, 20, 20, 255), (10, 10, 10, 255)])
+        reference = _image([(100, 100, 100, 255), (200, 200, 200, 255), (100, 100, 100, 255)])
+        matched = match_colors(result, reference, COLOR_MATCH_HISTOGRAM, mask=bytes([0, 255, 0]))
+        assert _pixels(matched) == [(10, 10, 10, 255), (200, 200, 200, 255), (10, 10, 10, 255)]
+
+    def test_feathered_mask_blends(self, backend):
+        result = _image([(0, 0, 0, 255), (0, 0, 0, 255)])
+        reference = _image([(254, 254, 254, 255), (254, 254, 254, 255)])
+        matched = match_colors(result, reference, COLOR_MATCH_HISTOGRAM, mask=bytes([128, 255]))
+        assert _pixels(matched) == [(127, 127, 127, 255), (254, 254, 254, 255)]
+
+    def test_mask_size_must_match(self):
+        with pytest.raises(ValueError):
+            match_colors(_image([(0, 0, 0, 0)]), _image([(0, 0, 0, 0)]), COLOR_MATCH_HISTOGRAM, b"\x00\x00")
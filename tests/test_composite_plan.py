@@ -0,0 +1,251 @@
+"""Unit tests for forge.domain.composite_plan — planning a projection with
+one layer left out, and the cases that must fall back to hiding it.
+"""
+
+from __future__ import annotations
+
+from forge.domain.composite_plan import COMPOSITE_MODES, plan_composite_without
+
+
+class _Node:
+    def __init__(
+        self,
+        uid,
+        node_type="paintlayer",
+        children=(),
+        visible=True,
+        opacity=255,
+        mode="normal",
+        inherit_alpha=False,
+        pass_through=False,
+    ):
+        self.uid = uid
+        self.node_type = node_type
+        self.children = list(children)
+        self.parent = None
+        self.is_visible = visible
+        self.alpha = opacity
+        self.mode = mode
+        self.inherits = inherit_alpha
+        self.pass_through = pass_through
+        for child in self.children:
+            child.parent = self
+
+    def uniqueId(self):
+        return self.uid
+
+    def type(self):
+        return self.node_type
+
+    def childNodes(self):
+        return list(self.children)
+
+    def parentNode(self):
+        return self.parent
+
+    def visible(self):
+        return self.is_visible
+
+    def opacity(self):
+        return self.alpha
+
+    def blendingMode(self):
+        return self.mode
+
+    def inheritAlpha(self):
+        return self.inherits
+
+    def passThroughMode(self):
+        return self.pass_through
+
+
+def _ids(steps):
+    return [
+        (step.node.uid, _ids(step.children)) if step.children is not None else step.node.uid
+        for step in steps
+    ]
+
+
+class TestPlanCompositeWithout:
+    def test_skips_excluded_and_hidden(self):
+        mask = _Node("mask")
+        root = _Node("root", "grouplayer", [
+            _Node("bg"), _Node("hidden", visible=False), mask, _Node("top"),
+        ])
+        assert _ids(plan_composite_without(root, mask)) == ["bg", "top"]
+
+    def test_rebuilds_only_the_group_holding_the_mask(self):
+        mask = _Node("mask")
+        group = _Node("group", "grouplayer", [_Node("inner"), mask], opacity=128)
+        root = _Node("root", "grouplayer", [_Node("bg"), group, _Node("other", "grouplayer")])
+        steps = plan_composite_without(root, mask)
+        assert _ids(steps) == ["bg", ("group", ["inner"]), "other"]
+        assert steps[1].opacity == 128 / 255
+
+    def test_layer_masks_are_skipped(self):
+        mask = _Node("mask")
+        root = _Node("root", "grouplayer", [_Node("sel", "selectionmask"), _Node("bg"), mask])
+        assert _ids(plan_composite_without(root, mask)) == ["bg"]
+
+    def test_unsupported_blend_mode_falls_back(self):
+        mask = _Node("mask")
+        root = _Node("root", "grouplayer", [_Node("bg", mode="luminosity"), mask])
+        assert plan_composite_without(root, mask) is None
+
+    def test_add_falls_back(self):
+        mask = _Node("mask")
+        root = _Node("root", "grouplayer", [_Node("bg"), _Node("glow", mode="add"), mask])
+        assert plan_composite_without(root, mask) is None
+
+    def test_supported_blend_mode(self):
+        mask = _Node("mask")
+        root = _Node("root", "grouplayer", [_Node("bg"), _Node("shade", mode="multiply"), mask])
+        assert [step.mode for step in plan_composite_without(root, mask)] == ["normal", "multiply"]
+
+    def test_filter_layer_falls_back(self):
+        mask = _Node("mask")
+        root = _Node("root", "grouplayer", [_Node("bg"), _Node("levels", "filterlayer"), mask])
+        assert plan_composite_without(root, mask) is None
+
+    def test_inherit_alpha_falls_back(self):
+        mask = _Node("mask")
+        root = _Node("root", "grouplayer", [_Node("bg"), _Node("clip", inherit_alpha=True), mask])
+        assert plan_composite_without(root, mask) is None
+
+    def test_pass_through_group_falls_back(self):
+        mask = _Node("mask")
+        group = _Node("group", "grouplayer", [mask], pass_through=True)
+        root = _Node("root", "grouplayer", [_Node("bg"), group])
+        assert plan_composite_without(root, mask) is None
+
+    def test_masked_group_falls_back(self):
+        mask = _Node("mask")
+        group = _Node("group", "grouplayer", [_Node("fx", "filtermask"), mask])
+        root = _Node("root", "grouplayer", [group])
+        assert plan_composite_without(root, mask) is None
+
+    def test_node_outside_root_falls_back(self):
+        mask = _Node("mask")
+        root = _Node("root", "grouplayer", [_Node("bg")])
+        assert plan_composite_without(root, mask) is None
+
+
+class TestPaintComposite:
+    def test_matches_hiding_the_layer(self, real_qt):
+        # The fake document composites visible layers with Krita's formula
+        # for separable blend modes, so _projection_with_hidden reads what
+        # Krita would show with the mask layer hidden.
+        output = real_qt("""
+            import math
+            from forge.adapters.krita_adapter import KritaAdapter
+            from forge.domain.composite_plan import COMPOSITE_MODES
+            from forge.qt_compat import QByteArray, QColor, QImage
+
+            def hard_light(s, b):
+                return b * 2 * s if s <= 0.5 else b + (2 * s - 1) - b * (2 * s - 1)
+
+            def soft_light(s, b):
+                if s <= 0.5:
+                    return b - (1 - 2 * s) * b * (1 - b)
+                d = ((16 * b - 12) * b + 4) * b if b <= 0.25 else math.sqrt(b)
+                return b + (2 * s - 1) * (d - b)
+
+            BLEND = {
+                "normal": lambda s, b: s,
+                "multiply": lambda s, b: s * b,
+                "screen": lambda s, b: s + b - s * b,
+                "overlay": lambda s, b: hard_light(b, s),
+                "darken": min,
+                "lighten": max,
+                "dodge": lambda s, b: 0.0 if b == 0 else 1.0 if s >= 1 else min(1.0, b / (1 - s)),
+                "burn": lambda s, b: 1.0 if b >= 1 else 0.0 if s <= 0 else 1 - min(1.0, (1 - b) / s),
+                "hard_light": hard_light,
+                "soft_light_svg": soft_light,
+                "diff": lambda s, b: abs(b - s),
+                "exclusion": lambda s, b: b + s - 2 * b * s,
+            }
+
+            def blend(src, dst, mode, opacity):
+                out = []
+                for (*source, sa), (*backdrop, da) in zip(src, dst):
+                    sa *= opacity
+                    alpha = sa + da - sa * da
+                    if not alpha:
+                        out.append((0.0, 0.0, 0.0, 0.0))
+                        continue
+                    out.append(tuple(
+                        (s * sa * (1 - da) + b * da * (1 - sa) + BLEND[mode](s, b) * sa * da) / alpha
+                        for s, b in zip(source, backdrop)
+                    ) + (alpha,))
+                return out
+
+            def bgra(pixels):
+                return bytes(
+                    round(v * 255) for r, g, b, a in pixels for v in (b, g, r, a)
+                )
+
+            class Node:
+                def __init__(self, uid, pixels=None, children=(), mode="normal", opacity=255):
+                    self.uid, self.pixels, self.children = uid, pixels, list(children)
+                    self.mode, self.alpha, self.shown, self.parent = mode, opacity, True, None
+                    for child in self.children:
+                        child.parent = self
+                def uniqueId(self): return self.uid
+                def type(self): return "grouplayer" if self.pixels is None else "paintlayer"
+                def childNodes(self): return self.children
+                def parentNode(self): return self.parent
+                def visible(self): return self.shown
+                def setVisible(self, shown): self.shown = shown
+                def opacity(self): return self.alpha
+                def blendingMode(self): return self.mode
+                def inheritAlpha(self): return False
+                def passThroughMode(self): return False
+                def composite(self):
+                    if self.pixels is not None:
+                        return self.pixels
+                    out = [(0.0, 0.0, 0.0, 0.0)] * WIDTH
+                    for child in self.children:
+                        if child.shown:
+                            out = blend(child.composite(), out, child.mode, child.alpha / 255)
+                    return out
+                def projectionPixelData(self, x, y, w, h):
+                    return QByteArray(bgra(self.composite()))
+
+            class Document:
+                def __init__(self, root): self.root = root
+                def colorModel(self): return "RGBA"
+                def colorDepth(self): return "U8"
+                def rootNode(self): return self.root
+                def refreshProjection(self): pass
+                def backgroundColor(self): return QColor(0, 0, 0, 0)
+                def projection(self, x, y, w, h):
+                    pixels = bgra(self.root.composite())
+                    return QImage(pixels, w, h, w * 4, QImage.Format.Format_ARGB32).copy()
+
+            def flat(image):
+                image = image.convertToFormat(QImage.Format.Format_ARGB32)
+                return bytes(image.constBits().asstring(image.sizeInBytes()))
+
+            # Backdrop pixels cover dark, mid and light values, opaque and not.
+            levels = (0.0, 0.2, 0.45, 0.55, 0.8, 1.0)
+            under = [(r, g, 0.1, a) for r in levels for g in (0.3, 0.9) for a in (1.0, 0.6)]
+            WIDTH = len(under)
+            top = [(1 - r, g / 2 + 0.25, 0.7, (1.0, 0.7, 0.85)[i % 3])
+                   for i, (r, g, _, _) in enumerate(under)]
+            adapter = KritaAdapter()
+            for mode in COMPOSITE_MODES:
+                mask = Node("mask", [(1.0, 1.0, 1.0, 1.0)] * WIDTH)
+                group = Node("group", children=[
+                    Node("under", under), mask, Node("top", top, mode=mode, opacity=179),
+                ], opacity=230)
+                document = Document(Node("root", children=[
+                    Node("bg", [(0.5, 0.5, 0.5, 1.0)] * WIDTH), group,
+                ]))
+                got = flat(adapter.composite_without(document, mask, 0, 0, WIDTH, 1))
+                hidden = adapter._projection_with_hidden(document, mask, 0, 0, WIDTH, 1)
+                print(mode, max(abs(a - b) for a, b in zip(got, flat(hidden))))
+        """)
+        errors = dict(line.split() for line in output.splitlines())
+        assert errors.keys() == set(COMPOSITE_MODES)
+        # 8-bit premultiplied rounding, nothing more.
+        assert max(map(int, errors.values())) <= 3
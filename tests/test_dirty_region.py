@@ -0,0 +1,97 @@
+"""Unit tests for forge.domain.dirty_region — tiled comparison of two
+projections and planning a masked partial re-render of the changes.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from forge.domain import image_buffer
+from forge.domain.dirty_region import (
+    DirtyUpdate,
+    changed_tiles,
+    dirty_mask,
+    plan_dirty_update,
+)
+from forge.domain.generation_plan import TileRect
+from forge.domain.image_buffer import ImageBuffer
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(image_buffer, "numpy", None)
+    return request.param
+
+
+def _image(width, height, value=0, order="RGBA"):
+    return ImageBuffer(bytearray([value] * width * height * 4), width, height, order=order)
+
+
+def _set_pixel(buffer, x, y, pixel):
+    offset = y * buffer.stride + x * 4
+    buffer.pixels[offset:offset + 4] = bytes(pixel)
+
+
+class TestChangedTiles:
+    def test_identical_images_have_no_changes(self, backend):
+        assert changed_tiles(_image(64, 64), _image(64, 64), tile=16) == []
+
+    def test_reports_cell_of_changed_pixel(self, backend):
+        after = _image(64, 64)
+        _set_pixel(after, 40, 5, (9, 0, 0, 0))
+        assert changed_tiles(_image(64, 64), after, tile=16) == [TileRect(32, 0, 16, 16)]
+
+    def test_edge_cells_are_clipped(self, backend):
+        after = _image(40, 20)
+        _set_pixel(after, 39, 19, (0, 0, 0, 1))
+        assert changed_tiles(_image(40, 20), after, tile=16) == [TileRect(32, 16, 8, 4)]
+
+    def test_threshold_ignores_small_differences(self, backend):
+        after = _image(32, 32, value=10)
+        _set_pixel(after, 0, 0, (12, 10, 10, 10))
+        _set_pixel(after, 20, 20, (30, 10, 10, 10))
+        assert changed_tiles(_image(32, 32, value=10), after, tile=16, threshold=2) == [
+            TileRect(16, 16, 16, 16),
+        ]
+
+    def test_channel_order_is_matched(self, backend):
+        before = _image(16, 16, order="BGRA")
+        _set_pixel(before, 0, 0, (1, 2, 3, 4))
+        after = _image(16, 16)
+        _set_pixel(after, 0, 0, (3, 2, 1, 4))
+        assert changed_tiles(before, after, tile=16) == []
+
+    def test_size_mismatch_raises(self):
+        with pytest.raises(ValueError):
+            changed_tiles(_image(16, 16), _image(16, 8))
+
+
+class TestPlanDirtyUpdate:
+    def test_nothing_changed(self):
+        assert plan_dirty_update([], 512, 512, padding=32) is None
+
+    def test_pads_bounding_box_of_changes(self):
+        tiles = [TileRect(64, 64, 32, 32), TileRect(128, 96, 32, 32)]
+        update = plan_dirty_update(tiles, 512, 512, padding=32)
+        assert update.rect == TileRect(32, 32, 160, 128)
+        assert update.tiles == (TileRect(32, 32, 32, 32), TileRect(96, 64, 32, 32))
+
+    def test_large_changes_fall_back_to_full_region(self):
+        tiles = [TileRect(0, 0, 32, 32), TileRect(480, 480, 32, 32)]
+        assert plan_dirty_update(tiles, 512, 512, padding=0) is None
+
+
+class TestDirtyMask:
+    def test_changed_cells_are_white(self):
+        update = DirtyUpdate(TileRect(0, 0, 4, 2), (TileRect(2, 0, 2, 2),))
+        assert dirty_mask(update, feather=0) == bytearray([0, 0, 255, 255] * 2)
+
+    def test_feather_softens_the_edge(self):
+        update = DirtyUpdate(TileRect(0, 0, 32, 32), (TileRect(8, 8, 16, 16),))
+        mask = dirty_mask(update, feather=4)
+        assert mask[16 * 32 + 16] == 255
+        assert mask[0] == 0
+        assert 0 < mask[16 * 32 + 8] < 255
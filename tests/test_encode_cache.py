@@ -0,0 +1,70 @@
+"""Unit tests for forge.domain.encode_cache — pixel fingerprints and the
+size-bounded LRU of encoded images.
+"""
+
+from __future__ import annotations
+
+from forge.domain.encode_cache import EncodedImageCache, pixel_fingerprint
+
+
+class TestPixelFingerprint:
+    def test_same_pixels_same_key(self):
+        assert pixel_fingerprint(b"abcd", 1, 1, 4, "rgba") == pixel_fingerprint(
+            bytearray(b"abcd"), 1, 1, 4, "rgba",
+        )
+
+    def test_content_changes_key(self):
+        assert pixel_fingerprint(b"abcd", 1, 1, 4, "rgba") != pixel_fingerprint(
+            b"abce", 1, 1, 4, "rgba",
+        )
+
+    def test_layout_changes_key(self):
+        assert pixel_fingerprint(b"abcd", 1, 1, 4, "rgba") != pixel_fingerprint(
+            b"abcd", 2, 2, 1, "gray",
+        )
+
+
+class TestEncodedImageCache:
+    def test_miss_then_hit(self):
+        cache = EncodedImageCache()
+        calls = []
+
+        def encode():
+            calls.append(1)
+            return "encoded"
+
+        assert cache.get_or_encode("k", encode) == "encoded"
+        assert cache.get_or_encode("k", encode) == "encoded"
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = EncodedImageCache(max_bytes=6)
+        cache.put("a", "aaa")
+        cache.put("b", "bbb")
+        cache.get("a")
+        cache.put("c", "ccc")
+        assert cache.get("b") is None
+        assert cache.get("a") == "aaa"
+        assert cache.get("c") == "ccc"
+        assert cache.evictions == 1
+        assert cache.size_bytes == 6
+
+    def test_oversized_value_is_not_stored(self):
+        cache = EncodedImageCache(max_bytes=2)
+        cache.put("a", "aaa")
+        assert len(cache) == 0
+        assert cache.size_bytes == 0
+
+    def test_replacing_value_updates_size(self):
+        cache = EncodedImageCache()
+        cache.put("a", "aaa")
+        cache.put("a", "a")
+        assert cache.size_bytes == 1
+
+    def test_clear(self):
+        cache = EncodedImageCache()
+        cache.put("a", "aaa")
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.size_bytes == 0
@@ -8,9 +8,16 @@ import pytest
 
 from forge.domain.generation_plan import (
     FORGE_PROCESSING_KEY,
+    LATENT_ALIGNMENT,
     GenerationPlan,
     ResizeInstruction,
+    TileLayout,
+    TileRect,
+    build_draft_plan,
     build_generation_plan,
+    build_seam_strips,
+    build_tile_layout,
+    draft_steps,
     merge_generation_data,
     prune_generation_results,
     scale_to_target_max,
@@ -107,12 +114,185 @@ class TestBuildGenerationPlan:
         assert plan.output_width == 300
         assert plan.output_height == 600
 
+    def test_upload_size_is_request_size_when_shrinking(self):
+        plan = build_generation_plan(
+            width=6000, height=4000,
+            min_size=512, max_size=2048, enable_max_size=True,
+        )
+        assert plan.upload_size == (plan.request_width, plan.request_height)
+        assert plan.upload_size[0] < 6000
+
+    def test_upload_size_never_scales_up(self):
+        plan = build_generation_plan(
+            width=300, height=600,
+            min_size=512, max_size=2048, enable_max_size=False,
+        )
+        assert plan.upload_size == (300, 600)
+
+
+# ---------------------------------------------------------------------------
+# build_draft_plan / draft_steps
+# ---------------------------------------------------------------------------
+
+
+class TestBuildDraftPlan:
+    def test_halves_request_and_keeps_output(self):
+        plan = build_generation_plan(
+            width=1024, height=768,
+            min_size=512, max_size=2048, enable_max_size=False,
+        )
+        draft = build_draft_plan(plan, 0.5)
+        assert (draft.request_width, draft.request_height) == (512, 384)
+        assert (draft.output_width, draft.output_height) == (1024, 768)
+        assert draft.resize == ResizeInstruction(width=1024, height=768)
+
+    def test_scales_the_planned_request_not_the_output(self):
+        plan = build_generation_plan(
+            width=300, height=600,
+            min_size=512, max_size=2048, enable_max_size=False,
+        )
+        draft = build_draft_plan(plan, 0.5)
+        assert (draft.request_width, draft.request_height) == (256, 512)
+        assert (draft.output_width, draft.output_height) == (300, 600)
+
+    def test_sides_are_aligned_and_never_zero(self):
+        plan = GenerationPlan(100, 30, 100, 30, None)
+        draft = build_draft_plan(plan, 0.1, alignment=8)
+        assert (draft.request_width, draft.request_height) == (8, 8)
+
+    @pytest.mark.parametrize("scale", [0, -0.5, 1.5])
+    def test_invalid_scale_raises(self, scale):
+        plan = GenerationPlan(512, 512, 512, 512, None)
+        with pytest.raises(ValueError):
+            build_draft_plan(plan, scale)
+
+
+class TestDraftSteps:
+    def test_fraction_rounds_up(self):
+        assert draft_steps(30, 0.25) == 8
+
+    def test_at_least_one_step(self):
+        assert draft_steps(4, 0.1) == 1
+
+
+# ---------------------------------------------------------------------------
+# build_tile_layout
+# ---------------------------------------------------------------------------
+
+
+def _covered(layout: TileLayout) -> bool:
+    covered_x = set()
+    covered_y = set()
+    for tile in layout.tiles:
+        covered_x.update(range(tile.x, tile.x + tile.width))
+        covered_y.update(range(tile.y, tile.y + tile.height))
+    return (
+        covered_x == set(range(layout.image_width))
+        and covered_y == set(range(layout.image_height))
+    )
+
+
+class TestBuildTileLayout:
+    """Tile planning covers the image with few, uniform, aligned tiles."""
+
+    def test_small_image_is_single_tile(self):
+        layout = build_tile_layout(1000, 800, min_size=512, max_size=2048)
+        assert layout.tile_count == 1
+        assert (layout.tile_width, layout.tile_height) == (1000, 800)
+        assert layout.overlap == 0
+
+    def test_tiles_cover_image_without_slivers(self):
+        layout = build_tile_layout(5000, 3000, min_size=512, max_size=2048)
+        assert (layout.columns, layout.rows) == (3, 2)
+        assert layout.tile_count == 6
+        assert _covered(layout)
+        assert all(
+            (tile.width, tile.height) == (layout.tile_width, layout.tile_height)
+            for tile in layout.tiles
+        )
+        last = layout.tiles[-1]
+        assert last.x + last.width == 5000
+        assert last.y + last.height == 3000
+
+    def test_tile_sides_are_latent_aligned(self):
+        layout = build_tile_layout(3000, 3000, min_size=512, max_size=1024)
+        assert layout.tile_width % LATENT_ALIGNMENT == 0
+        assert layout.tile_height % LATENT_ALIGNMENT == 0
+        assert layout.tile_width <= 1024
+
+    def test_just_over_max_uses_two_balanced_tiles(self):
+        layout = build_tile_layout(2100, 1000, min_size=512, max_size=2048)
+        assert (layout.columns, layout.rows) == (2, 1)
+        assert layout.tile_width == 1088
+        assert layout.tile_height == 1000
+        assert _covered(layout)
+
+    def test_min_overlap_is_respected(self):
+        layout = build_tile_layout(
+            4096, 4096, min_size=512, max_size=1024, min_overlap=96,
+        )
+        assert layout.overlap_x >= 96
+        assert layout.overlap_y >= 96
+        assert layout.overlap == min(layout.overlap_x, layout.overlap_y)
+
+    def test_follows_aspect_ratio(self):
+        layout = build_tile_layout(6000, 1500, min_size=512, max_size=2048)
+        assert layout.rows == 1
+        assert layout.columns == 3
+        assert layout.overlap == layout.overlap_x
+
+    def test_min_size_raises_tile_side(self):
+        layout = build_tile_layout(1300, 1300, min_size=1024, max_size=1024)
+        assert layout.tile_width == 1024
+        assert _covered(layout)
+
+    def test_invalid_size_raises(self):
+        with pytest.raises(ValueError):
+            build_tile_layout(0, 512, min_size=512, max_size=2048)
+
 
 # ---------------------------------------------------------------------------
 # scale_to_target_min
 # ---------------------------------------------------------------------------
 
 
+class TestBuildSeamStrips:
+    def test_single_column_has_no_vertical_seams(self):
+        layout = build_tile_layout(1000, 3000, min_size=512, max_size=1024)
+        assert build_seam_strips(layout, vertical=True) == ()
+
+    def test_one_strip_per_row_for_each_vertical_seam(self):
+        layout = build_tile_layout(3000, 2000, min_size=512, max_size=1024)
+        strips = build_seam_strips(layout, vertical=True)
+        assert len(strips) == (layout.columns - 1) * layout.rows
+
+    def test_strips_are_centred_on_the_overlap(self):
+        layout = build_tile_layout(5000, 3000, min_size=512, max_size=1536)
+        strips = build_seam_strips(layout, vertical=True, band=64, context=64)
+        offsets = sorted({tile.x for tile in layout.tiles})
+        seam = (offsets[0] + layout.tile_width + offsets[1]) // 2
+        first = strips[0]
+        assert first.rect.width == 192
+        assert first.rect.height == layout.tile_height
+        assert first.rect.x + first.band.x + first.band.width // 2 == seam
+
+    def test_horizontal_strips_span_tile_width(self):
+        layout = build_tile_layout(2000, 3000, min_size=512, max_size=1024)
+        strips = build_seam_strips(layout, vertical=False)
+        assert len(strips) == (layout.rows - 1) * layout.columns
+        assert all(strip.rect.width == layout.tile_width for strip in strips)
+        assert all(strip.band.height == 64 for strip in strips)
+
+    def test_strips_stay_inside_image(self):
+        layout = build_tile_layout(1100, 900, min_size=512, max_size=1024)
+        for vertical in (True, False):
+            for strip in build_seam_strips(layout, vertical=vertical, context=300):
+                assert strip.rect.x >= 0 and strip.rect.y >= 0
+                assert strip.rect.x + strip.rect.width <= layout.image_width
+                assert strip.rect.y + strip.rect.height <= layout.image_height
+                assert isinstance(strip.band, TileRect)
+
+
 class TestScaleToTargetMin:
     """Min-size scaling preserves aspect ratio."""
 
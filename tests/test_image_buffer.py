@@ -0,0 +1,323 @@
+"""Unit tests for forge.domain.image_buffer — the RGBA pixel buffer and
+feathered tile blending, with and without NumPy.
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from forge.domain import image_buffer
+from forge.domain.generation_plan import TileRect
+from forge.domain.image_buffer import (
+    ImageBuffer,
+    StripResampler,
+    blend_tiles,
+    edge_ramp,
+    resampling_supported,
+)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(image_buffer, "numpy", None)
+    return request.param
+
+
+def _solid(width, height, rgba):
+    return ImageBuffer(bytearray(bytes(rgba) * (width * height)), width, height)
+
+
+def _random(width, height, seed=0):
+    rng = random.Random(seed)
+    return ImageBuffer(bytearray(rng.getrandbits(8) for _ in range(width * height * 4)), width, height)
+
+
+def _pixel(buffer, x, y):
+    offset = y * buffer.stride + x * 4
+    return tuple(buffer.pixels[offset:offset + 4])
+
+
+class TestImageBuffer:
+    def test_defaults_stride_to_row_size(self):
+        assert ImageBuffer(bytes(24), 3, 2).stride == 12
+
+    def test_rejects_short_buffer_and_stride(self):
+        with pytest.raises(ValueError):
+            ImageBuffer(bytes(23), 3, 2)
+        with pytest.raises(ValueError):
+            ImageBuffer(bytes(24), 3, 2, stride=8)
+        with pytest.raises(ValueError):
+            ImageBuffer(bytes(24), 3, 2, order="ARGB")
+
+    def test_wraps_without_copying(self):
+        pixels = bytearray(16)
+        buffer = ImageBuffer(pixels, 2, 2)
+        pixels[0] = 7
+        assert buffer.pixels[0] == 7
+
+    def test_tobytes_drops_row_padding(self):
+        padded = ImageBuffer(b"\x01" * 4 + b"\xee" * 4 + b"\x02" * 4 + b"\xee" * 4, 1, 2, stride=8)
+        assert padded.tobytes() == b"\x01" * 4 + b"\x02" * 4
+
+    def test_crop_clips_to_image(self, backend):
+        buffer = _random(5, 4)
+        crop = buffer.crop(TileRect(3, 2, 10, 10))
+        assert (crop.width, crop.height) == (2, 2)
+        assert _pixel(crop, 1, 1) == _pixel(buffer, 4, 3)
+
+    def test_paste_clips_and_converts_order(self, backend):
+        target = ImageBuffer.blank(3, 3)
+        source = ImageBuffer(bytes([3, 2, 1, 4]) * 4, 2, 2, order="BGRA")
+        target.paste(source, 2, -1)
+        assert _pixel(target, 2, 0) == (1, 2, 3, 4)
+        assert _pixel(target, 1, 0) == (0, 0, 0, 0)
+        assert _pixel(target, 2, 1) == (0, 0, 0, 0)
+
+    def test_resize_matches_between_backends(self, backend, monkeypatch):
+        buffer = _random(7, 5, seed=3)
+        resized = buffer.resize(11, 3)
+        assert (resized.width, resized.height) == (11, 3)
+        monkeypatch.setattr(image_buffer, "numpy", None)
+        assert resized.tobytes() == buffer.resize(11, 3).tobytes()
+
+    def test_resize_same_size_is_identity(self, backend):
+        buffer = _random(6, 4)
+        assert buffer.resize(6, 4).tobytes() == buffer.tobytes()
+
+    def test_alpha_plane(self):
+        buffer = ImageBuffer(bytes([1, 2, 3, 40, 5, 6, 7, 80]), 2, 1)
+        assert buffer.alpha() == bytes([40, 80])
+
+    def test_with_order_swaps_red_and_blue(self):
+        buffer = ImageBuffer(bytes([1, 2, 3, 4]), 1, 1)
+        assert buffer.with_order("BGRA").tobytes() == bytes([3, 2, 1, 4])
+        assert buffer.with_order("RGBA") is buffer
+
+    def test_as_array_views_padded_rows(self):
+        numpy = pytest.importorskip("numpy")
+        buffer = ImageBuffer(bytes(range(8)) + bytes(4) + bytes(range(8, 16)) + bytes(4), 2, 2, stride=12)
+        array = buffer.as_array()
+        assert array.shape == (2, 2, 4)
+        assert numpy.array_equal(array[1, 0], [8, 9, 10, 11])
+
+
+class TestResample:
+    @pytest.mark.parametrize("method", ["bilinear", "bicubic", "lanczos"])
+    def test_solid_colour_is_preserved(self, method):
+        pytest.importorskip("numpy")
+        result = _solid(9, 7, (10, 200, 30, 255)).resample(20, 3, method)
+        assert (result.width, result.height) == (20, 3)
+        assert set(result.tobytes()[i:i + 4] for i in range(0, 20 * 3 * 4, 4)) == {
+            bytes((10, 200, 30, 255)),
+        }
+
+    def test_downscale_averages(self):
+        pytest.importorskip("numpy")
+        # One-pixel stripes average to mid grey once the filter is widened.
+        stripes = ImageBuffer(bytearray(bytes((0, 0, 0, 255, 255, 255, 255, 255)) * 32), 16, 4)
+        result = stripes.resample(4, 4, "bilinear")
+        assert all(abs(_pixel(result, x, 1)[0] - 128) <= 8 for x in (1, 2))
+
+    def test_transparent_pixels_do_not_bleed(self):
+        pytest.importorskip("numpy")
+        pixels = bytes((255, 0, 0, 255)) + bytes((0, 255, 0, 0))
+        result = ImageBuffer(bytearray(pixels * 2), 2, 2).resample(5, 2, "lanczos")
+        assert all(_pixel(result, x, 0)[1] == 0 for x in range(5))
+
+    def test_keeps_channel_order(self):
+        pytest.importorskip("numpy")
+        buffer = ImageBuffer(bytearray(bytes((1, 2, 3, 255)) * 4), 2, 2, order="BGRA")
+        assert buffer.resample(3, 3, "bicubic").order == "BGRA"
+
+    def test_needs_numpy(self, monkeypatch):
+        monkeypatch.setattr(image_buffer, "numpy", None)
+        with pytest.raises(RuntimeError):
+            _solid(2, 2, (0, 0, 0, 255)).resample(4, 4, "bicubic")
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            _solid(2, 2, (0, 0, 0, 255)).resample(4, 4, "box")
+
+    @pytest.mark.parametrize("method", ["transform_mask", "bilinear", "bicubic", "lanczos"])
+    def test_every_mode_is_supported_with_numpy(self, method):
+        pytest.importorskip("numpy")
+        assert resampling_supported(method)
+
+    def test_filters_beyond_bilinear_need_numpy(self, monkeypatch):
+        monkeypatch.setattr(image_buffer, "numpy", None)
+        assert resampling_supported("transform_mask")
+        assert resampling_supported("bilinear")
+        assert not resampling_supported("bicubic")
+        assert not resampling_supported("lanczos")
+
+
+class TestStripResampler:
+    def _streamed(self, buffer, out_width, out_height, strip_rows, method="bilinear"):
+        resampler = StripResampler(buffer.width, buffer.height, out_width, out_height, method)
+        return b"".join(
+            resampler.feed(buffer.crop(TileRect(0, top, buffer.width, strip_rows))).tobytes()
+            for top in range(0, buffer.height, strip_rows)
+        )
+
+    @pytest.mark.parametrize("strip_rows", [1, 3, 7, 40])
+    @pytest.mark.parametrize("method", ["bilinear", "lanczos"])
+    def test_matches_whole_image_resample(self, strip_rows, method):
+        pytest.importorskip("numpy")
+        buffer = _random(13, 40, seed=7)
+        expected = buffer.resample(9, 17, method).tobytes()
+        assert self._streamed(buffer, 9, 17, strip_rows, method) == expected
+
+    def test_upscale_matches_whole_image_resample(self):
+        pytest.importorskip("numpy")
+        buffer = _random(6, 5, seed=8)
+        assert self._streamed(buffer, 11, 12, 2) == buffer.resample(11, 12).tobytes()
+
+    def test_streamed_projection_has_no_strip_seams(self, real_qt):
+        pytest.importorskip("numpy")
+        output = real_qt("""
+            import base64, random
+            from unittest.mock import MagicMock
+            from forge.adapters import krita_adapter
+            from forge.adapters.krita_adapter import KritaAdapter
+            from forge.domain.image_buffer import ImageBuffer
+            from forge.qt_compat import QByteArray, QImage
+
+            width, height = 24, 37
+            rng = random.Random(3)
+            canvas = bytes(rng.getrandbits(8) for _ in range(width * height * 4))
+
+            def pixel_data(x, y, w, h):
+                return QByteArray(canvas[y * width * 4:(y + h) * width * 4])
+
+            document = MagicMock()
+            document.colorModel.return_value = "RGBA"
+            document.colorDepth.return_value = "U8"
+            document.pixelData.side_effect = pixel_data
+            adapter = KritaAdapter()
+            adapter._ensure_document = lambda: document
+            # Five source rows per strip.
+            krita_adapter._STREAM_STRIP_BYTES = width * 4 * 5
+            streamed = adapter.stream_projection(0, 0, width, height, 1, (10, 15))
+            image = QImage.fromData(base64.b64decode(streamed.read_base64()))
+            image = image.convertToFormat(QImage.Format.Format_RGBA8888)
+            got = bytes(image.constBits().asstring(image.sizeInBytes()))
+            whole = ImageBuffer(canvas, width, height, order="BGRA").resample(10, 15)
+            print(got == whole.with_order("RGBA").tobytes())
+        """)
+        assert output.strip() == "True"
+
+    def test_streamed_projection_without_numpy_reads_strips(self, real_qt):
+        output = real_qt("""
+            import base64, random
+            from unittest.mock import MagicMock
+            from forge.adapters import krita_adapter
+            from forge.adapters.krita_adapter import KritaAdapter
+            from forge.domain import image_buffer
+            from forge.qt_compat import QByteArray, QImage
+
+            image_buffer.numpy = None
+            width, height = 24, 37
+            rng = random.Random(3)
+            canvas = bytes(rng.getrandbits(8) for _ in range(width * height * 4))
+            reads = []
+
+            def pixel_data(x, y, w, h):
+                reads.append(h)
+                return QByteArray(canvas[y * width * 4:(y + h) * width * 4])
+
+            document = MagicMock()
+            document.colorModel.return_value = "RGBA"
+            document.colorDepth.return_value = "U8"
+            document.pixelData.side_effect = pixel_data
+            adapter = KritaAdapter()
+            adapter._ensure_document = lambda: document
+
+            def streamed(strip_rows, size):
+                krita_adapter._STREAM_STRIP_BYTES = width * 4 * strip_rows
+                image = adapter.stream_projection(0, 0, width, height, 1, size)
+                image = QImage.fromData(base64.b64decode(image.read_base64()))
+                return bytes(image.constBits().asstring(image.sizeInBytes()))
+
+            for size in ((10, 15), (50, 80)):
+                whole = streamed(height, size)
+                reads.clear()
+                strips = streamed(5, size)
+                # Upscales may round differently by one level at most.
+                print(max(reads), max(abs(a - b) for a, b in zip(whole, strips)))
+        """)
+        assert output.split() == ["5", "0", "5", "1"]
+
+    def test_keeps_channel_order(self):
+        pytest.importorskip("numpy")
+        strip = ImageBuffer(bytearray(bytes((1, 2, 3, 255)) * 8), 2, 4, order="BGRA")
+        assert StripResampler(2, 4, 1, 2).feed(strip).order == "BGRA"
+
+    def test_rejects_wrong_strip_width(self):
+        pytest.importorskip("numpy")
+        with pytest.raises(ValueError):
+            StripResampler(4, 4, 2, 2).feed(_solid(3, 1, (0, 0, 0, 255)))
+
+    def test_needs_numpy(self, monkeypatch):
+        monkeypatch.setattr(image_buffer, "numpy", None)
+        with pytest.raises(RuntimeError):
+            StripResampler(4, 4, 2, 2)
+
+
+class TestEdgeRamp:
+    def test_image_borders_keep_full_weight(self):
+        assert edge_ramp(4, False, False, 2) == [1.0] * 4
+
+    def test_inner_edges_ramp_over_margin(self):
+        assert edge_ramp(5, True, True, 2) == pytest.approx([1 / 3, 2 / 3, 1.0, 2 / 3, 1 / 3])
+
+
+class TestBlendTiles:
+    def test_single_coverage_is_copied(self, backend):
+        left, right = _random(4, 3, seed=1), _random(4, 3, seed=2)
+        result = blend_tiles(
+            [(TileRect(0, 0, 4, 3), left), (TileRect(2, 0, 4, 3), right)], 6, 3, 1,
+        )
+        for y in range(3):
+            assert _pixel(result, 0, y) == _pixel(left, 0, y)
+            assert _pixel(result, 5, y) == _pixel(right, 3, y)
+
+    def test_overlap_is_linear_cross_fade(self, backend):
+        black, white = _solid(4, 1, (0, 0, 0, 255)), _solid(4, 1, (255, 255, 255, 255))
+        result = blend_tiles(
+            [(TileRect(0, 0, 4, 1), black), (TileRect(1, 0, 4, 1), white)], 5, 1, 3,
+        )
+        reds = [_pixel(result, x, 0)[0] for x in range(5)]
+        assert reds == [0, 64, 128, 191, 255]
+
+    def test_uncovered_pixels_stay_transparent(self, backend):
+        result = blend_tiles([(TileRect(0, 0, 2, 2), _solid(2, 2, (9, 9, 9, 9)))], 3, 2, 4)
+        assert _pixel(result, 2, 1) == (0, 0, 0, 0)
+        assert _pixel(result, 1, 1) == (9, 9, 9, 9)
+
+    def test_tiles_clip_to_canvas_and_tile_size(self, backend):
+        tile = _solid(2, 2, (1, 2, 3, 4))
+        result = blend_tiles([(TileRect(1, 1, 8, 8), tile)], 4, 4, 2)
+        assert _pixel(result, 2, 2) == (1, 2, 3, 4)
+        assert _pixel(result, 3, 3) == (0, 0, 0, 0)
+
+    def test_backends_agree_on_grid(self, monkeypatch):
+        pytest.importorskip("numpy")
+        tiles = [
+            (TileRect(x, y, 12, 10), _random(12, 10, seed=x * 31 + y))
+            for x in (0, 8)
+            for y in (0, 6)
+        ]
+        expected = blend_tiles(tiles, 20, 16, 2).tobytes()
+        monkeypatch.setattr(image_buffer, "numpy", None)
+        assert blend_tiles(tiles, 20, 16, 2).tobytes() == expected
+
+    def test_converts_tile_order(self, backend):
+        tile = ImageBuffer(bytes([3, 2, 1, 4]), 1, 1, order="BGRA")
+        result = blend_tiles([(TileRect(0, 0, 1, 1), tile)], 1, 1, 1)
+        assert result.order == "RGBA"
+        assert _pixel(result, 0, 0) == (1, 2, 3, 4)
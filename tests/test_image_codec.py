@@ -0,0 +1,194 @@
+"""Unit tests for forge.domain.image_codec — encoder parameter mapping and
+the per-role upload codec policy.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from forge.domain.image_codec import (
+    IMAGE_ROLE_CONTROL,
+    IMAGE_ROLE_INIT,
+    IMAGE_ROLE_MASK,
+    ImageEncoding,
+    UploadCodecPolicy,
+    png_quality_for_compression,
+)
+
+
+def _qt_png_compression(quality: int) -> int:
+    # Mirrors Qt 5.15's QPngHandler mapping from quality to zlib level.
+    return (100 - quality) * 9 // 91
+
+
+class TestPngQualityForCompression:
+    @pytest.mark.parametrize("level", range(10))
+    def test_round_trips_through_qt_mapping(self, level):
+        assert _qt_png_compression(png_quality_for_compression(level)) == level
+
+    def test_clamps_out_of_range(self):
+        assert png_quality_for_compression(-3) == png_quality_for_compression(0)
+        assert png_quality_for_compression(42) == png_quality_for_compression(9)
+
+    def test_qt_writes_the_requested_zlib_level(self, real_qt):
+        # Recompressing the inflated IDAT stream at the right zlib level
+        # reproduces Qt's output byte for byte; level 0 is stored as is.
+        output = real_qt("""
+            import json, struct, zlib
+            from forge.domain.image_codec import png_quality_for_compression
+            from forge.qt_compat import QBuffer, QByteArray, QImage, QIODevice
+
+            image = QImage(128, 128, QImage.Format.Format_RGBA8888)
+            for y in range(128):
+                for x in range(128):
+                    image.setPixel(x, y, 0xFF000000 | (x * y) % 251 << 16 | x << 8 | (x ^ y))
+
+            def idat(level):
+                data = QByteArray()
+                buffer = QBuffer(data)
+                buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+                image.save(buffer, "PNG", png_quality_for_compression(level))
+                png, offset, chunks = bytes(data), 8, b""
+                while offset < len(png):
+                    (length,) = struct.unpack(">I", png[offset:offset + 4])
+                    if png[offset + 4:offset + 8] == b"IDAT":
+                        chunks += png[offset + 8:offset + 8 + length]
+                    offset += 12 + length
+                return chunks
+
+            def matching_levels(stream):
+                raw = zlib.decompress(stream)
+                levels = []
+                for level in range(1, 10):
+                    for strategy in (zlib.Z_FILTERED, zlib.Z_DEFAULT_STRATEGY):
+                        encoder = zlib.compressobj(level, zlib.DEFLATED, 15, 8, strategy)
+                        if encoder.compress(raw) + encoder.flush() == stream:
+                            levels.append(level)
+                return len(stream) >= len(raw), levels
+
+            print(json.dumps([matching_levels(idat(level)) for level in range(10)]))
+        """)
+        results = json.loads(output)
+        stored, _ = results[0]
+        assert stored
+        for level, (stored, levels) in enumerate(results[1:], start=1):
+            assert not stored
+            assert level in levels
+
+
+class TestUploadCodecPolicy:
+    def test_mask_is_fast_png(self):
+        encoding = UploadCodecPolicy(mask_png_compression=1).encoding_for(IMAGE_ROLE_MASK)
+        assert encoding == ImageEncoding("PNG", png_quality_for_compression(1))
+
+    def test_default_mask_upload_size(self, real_qt):
+        output = real_qt("""
+            import base64
+            from forge.adapters.krita_adapter import KritaAdapter
+            from forge.domain.image_codec import IMAGE_ROLE_MASK, UploadCodecPolicy
+            from forge.qt_compat import QColor, QImage, QPainter, Qt
+
+            mask = QImage(2048, 2048, QImage.Format.Format_Grayscale8)
+            mask.fill(0)
+            painter = QPainter(mask)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(255, 255, 255))
+            painter.drawEllipse(300, 400, 1200, 900)
+            painter.end()
+
+            policy = UploadCodecPolicy()
+            for binary in (True, False):
+                encoding = policy.encoding_for(IMAGE_ROLE_MASK, binary_mask=binary)
+                encoded = KritaAdapter.qimage_to_b64_str(mask, encoding)
+                print(len(base64.b64decode(encoded)))
+        """)
+        mono_bytes, grey_bytes = map(int, output.split())
+        # Uncompressed, the 8-bit mask alone is over 4 MiB.
+        assert mono_bytes < 16 * 1024
+        assert grey_bytes < 48 * 1024
+
+    def test_feathered_mask_upload_keeps_grey_levels(self, real_qt):
+        output = real_qt("""
+            import base64
+            from forge.adapters.krita_adapter import KritaAdapter
+            from forge.domain.image_codec import IMAGE_ROLE_MASK, UploadCodecPolicy
+            from forge.qt_compat import QColor, QImage, QPainter
+
+            mask = QImage(64, 16, QImage.Format.Format_Grayscale8)
+            mask.fill(0)
+            painter = QPainter(mask)
+            painter.fillRect(0, 0, 32, 16, QColor(255, 255, 255))
+            painter.end()
+            policy = UploadCodecPolicy()
+            binary = KritaAdapter.encode_upload(mask, IMAGE_ROLE_MASK, policy)
+            feathered = QImage.fromData(
+                base64.b64decode(KritaAdapter.feather_mask_upload(binary, 4, policy)),
+            ).convertToFormat(QImage.Format.Format_Grayscale8)
+            print(feathered.width(), feathered.height())
+            print(*(feathered.pixelColor(x, 8).value() for x in range(64)))
+        """)
+        size, row = output.splitlines()
+        assert size == "64 16"
+        values = list(map(int, row.split()))
+        assert values[0] == 255 and values[-1] == 0
+        assert values == sorted(values, reverse=True)
+        assert 0 < values[31] < 255 and 0 < values[32] < 255
+
+    def test_binary_mask_is_mono(self):
+        policy = UploadCodecPolicy()
+        assert policy.encoding_for(IMAGE_ROLE_MASK, binary_mask=True).mono
+        assert not policy.encoding_for(IMAGE_ROLE_MASK, binary_mask=False).mono
+
+    def test_mono_masks_can_be_disabled(self):
+        policy = UploadCodecPolicy(mono_masks=False)
+        assert not policy.encoding_for(IMAGE_ROLE_MASK, binary_mask=True).mono
+
+    def test_init_uses_png_level(self):
+        encoding = UploadCodecPolicy(png_compression=6).encoding_for(IMAGE_ROLE_INIT)
+        assert encoding == ImageEncoding("PNG", png_quality_for_compression(6))
+
+    def test_lossless_webp_when_writable(self):
+        policy = UploadCodecPolicy(lossless_webp=True)
+        assert policy.encoding_for(IMAGE_ROLE_INIT, ("png", "webp")) == ImageEncoding("WEBP", 100)
+
+    def test_webp_falls_back_to_png(self):
+        policy = UploadCodecPolicy(lossless_webp=True)
+        assert policy.encoding_for(IMAGE_ROLE_INIT, ("PNG",)).fmt == "PNG"
+
+    def test_control_jpeg_is_opt_in(self):
+        formats = ("PNG", "JPEG")
+        assert UploadCodecPolicy().encoding_for(IMAGE_ROLE_CONTROL, formats).fmt == "PNG"
+        encoding = UploadCodecPolicy(control_jpeg_quality=85).encoding_for(
+            IMAGE_ROLE_CONTROL, formats,
+        )
+        assert encoding == ImageEncoding("JPEG", 85)
+
+    def test_jpeg_only_for_control(self):
+        policy = UploadCodecPolicy(control_jpeg_quality=85)
+        assert policy.encoding_for(IMAGE_ROLE_INIT, ("PNG", "JPEG")).fmt == "PNG"
+
+    def test_unknown_role(self):
+        with pytest.raises(ValueError):
+            UploadCodecPolicy().encoding_for("thumbnail")
+
+    def test_from_settings(self):
+        settings = {
+            "uploads.png_compression": 5,
+            "uploads.mask_png_compression": 2,
+            "uploads.mono_masks": False,
+            "uploads.lossless_webp": True,
+            "uploads.control_jpeg_quality": 90,
+            "uploads.stream_min_megapixels": 16,
+        }
+        policy = UploadCodecPolicy.from_settings(settings.__getitem__)
+        assert policy == UploadCodecPolicy(5, 2, False, True, 90, 16.0)
+
+    def test_should_stream_at_threshold(self):
+        policy = UploadCodecPolicy(stream_min_megapixels=4)
+        assert not policy.should_stream(1999, 2000)
+        assert policy.should_stream(2000, 2000)
+
+    def test_streaming_can_be_disabled(self):
+        assert not UploadCodecPolicy(stream_min_megapixels=0).should_stream(16384, 16384)
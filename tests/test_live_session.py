@@ -0,0 +1,90 @@
+"""Unit tests for forge.domain.live_session — debouncing canvas edits into
+live requests and cancelling requests made stale by newer edits.
+"""
+
+from __future__ import annotations
+
+from forge.domain.live_session import (
+    LIVE_CANCEL,
+    LIVE_IDLE,
+    LIVE_SUBMIT,
+    LivePaintScheduler,
+)
+
+
+def _submitted(scheduler, state, now):
+    assert scheduler.poll(state, now) == LIVE_SUBMIT
+    return scheduler.submit(state, now)
+
+
+class TestDebounce:
+    def test_waits_for_idle_interval(self):
+        scheduler = LivePaintScheduler(idle_seconds=0.3)
+        assert scheduler.poll("a", 0.0) == LIVE_IDLE
+        assert scheduler.poll("a", 0.2) == LIVE_IDLE
+        assert scheduler.poll("a", 0.3) == LIVE_SUBMIT
+
+    def test_each_edit_restarts_interval(self):
+        scheduler = LivePaintScheduler(idle_seconds=0.3)
+        scheduler.poll("a", 0.0)
+        assert scheduler.poll("b", 0.25) == LIVE_IDLE
+        assert scheduler.poll("b", 0.5) == LIVE_IDLE
+        assert scheduler.poll("b", 0.55) == LIVE_SUBMIT
+
+    def test_generated_state_is_not_resubmitted(self):
+        scheduler = LivePaintScheduler(idle_seconds=0.3)
+        scheduler.poll("a", 0.0)
+        ticket = _submitted(scheduler, "a", 0.3)
+        assert scheduler.finish(ticket.token, 0.8) is not None
+        assert scheduler.poll("a", 5.0) == LIVE_IDLE
+
+
+class TestInFlight:
+    def test_reports_round_trip_of_current_result(self):
+        scheduler = LivePaintScheduler(idle_seconds=0.3)
+        scheduler.poll("a", 0.0)
+        ticket = _submitted(scheduler, "a", 0.3)
+        assert scheduler.in_flight == ticket
+        assert scheduler.finish(ticket.token, 0.75) == 0.45
+        assert scheduler.in_flight is None
+
+    def test_no_second_request_while_one_is_running(self):
+        scheduler = LivePaintScheduler(idle_seconds=0.0)
+        scheduler.poll("a", 0.0)
+        scheduler.submit("a", 0.0)
+        assert scheduler.poll("a", 1.0) == LIVE_IDLE
+
+    def test_newer_edit_cancels_once(self):
+        scheduler = LivePaintScheduler(idle_seconds=0.3)
+        scheduler.poll("a", 0.0)
+        _submitted(scheduler, "a", 0.3)
+        assert scheduler.poll("b", 0.4) == LIVE_CANCEL
+        assert scheduler.poll("c", 0.5) == LIVE_IDLE
+
+    def test_cancelled_result_is_dropped_and_newest_state_follows(self):
+        scheduler = LivePaintScheduler(idle_seconds=0.3)
+        scheduler.poll("a", 0.0)
+        ticket = _submitted(scheduler, "a", 0.3)
+        scheduler.poll("b", 0.4)
+        scheduler.poll("c", 0.5)
+        assert scheduler.finish(ticket.token, 0.6) is None
+        assert scheduler.poll("c", 0.7) == LIVE_IDLE
+        assert scheduler.poll("c", 0.8) == LIVE_SUBMIT
+
+    def test_returning_to_dropped_state_generates_again(self):
+        scheduler = LivePaintScheduler(idle_seconds=0.3)
+        scheduler.poll("a", 0.0)
+        ticket = _submitted(scheduler, "a", 0.3)
+        scheduler.poll("b", 0.4)
+        scheduler.poll("a", 0.5)
+        assert scheduler.finish(ticket.token, 0.6) is None
+        assert scheduler.poll("a", 0.8) == LIVE_SUBMIT
+
+    def test_reset_makes_running_request_stale(self):
+        scheduler = LivePaintScheduler(idle_seconds=0.3)
+        scheduler.poll("a", 0.0)
+        ticket = _submitted(scheduler, "a", 0.3)
+        scheduler.reset()
+        assert scheduler.finish(ticket.token, 0.5) is None
+        second = scheduler.submit("a", 1.0)
+        assert second.token != ticket.token
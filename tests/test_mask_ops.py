@@ -0,0 +1,185 @@
+"""Unit tests for forge.domain.mask_ops — in-place Grayscale8 mask fill,
+invert, threshold, grow/shrink, feather and BGRA conversion.
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from forge.domain import mask_ops
+from forge.domain.generation_plan import TileRect
+from forge.domain.mask_ops import (
+    alpha_to_bgra,
+    is_binary_mask,
+    mask_bounds,
+    mask_clear,
+    mask_feather,
+    mask_fill,
+    mask_grow,
+    mask_invert,
+    mask_shrink,
+    mask_threshold,
+    padded_crop,
+)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(mask_ops, "numpy", None)
+    return request.param
+
+
+def _dot(width: int, height: int, x: int, y: int) -> bytearray:
+    mask = bytearray(width * height)
+    mask[y * width + x] = 255
+    return mask
+
+
+def _rows(mask: bytearray, width: int) -> list[bytes]:
+    return [bytes(mask[i:i + width]) for i in range(0, len(mask), width)]
+
+
+class TestPointOperations:
+    def test_fill_is_in_place(self):
+        mask = bytearray(5)
+        assert mask_fill(mask, 7) is mask
+        assert mask == bytearray([7] * 5)
+
+    def test_clear(self):
+        assert mask_clear(bytearray(b"\xff\x10")) == bytearray(2)
+
+    def test_invert(self):
+        assert mask_invert(bytearray([0, 100, 255])) == bytearray([255, 155, 0])
+
+    def test_threshold(self):
+        assert mask_threshold(bytearray([0, 127, 128, 255])) == bytearray([0, 0, 255, 255])
+
+    def test_is_binary(self):
+        assert is_binary_mask(bytearray([0, 255, 255, 0]))
+        assert is_binary_mask(b"")
+        assert not is_binary_mask(bytearray([0, 128, 255]))
+
+
+class TestMorphology:
+    def test_grow_square(self, backend):
+        mask = mask_grow(_dot(5, 5, 2, 2), 5, 5, 1)
+        assert _rows(mask, 5) == [
+            bytes(5),
+            bytes([0, 255, 255, 255, 0]),
+            bytes([0, 255, 255, 255, 0]),
+            bytes([0, 255, 255, 255, 0]),
+            bytes(5),
+        ]
+
+    def test_grow_does_not_wrap_rows(self, backend):
+        mask = mask_grow(_dot(4, 3, 3, 0), 4, 3, 1)
+        assert _rows(mask, 4) == [
+            bytes([0, 0, 255, 255]),
+            bytes([0, 0, 255, 255]),
+            bytes(4),
+        ]
+
+    def test_shrink_keeps_image_border(self, backend):
+        mask = bytearray(b"\xff" * 16)
+        mask[5] = 0
+        mask = mask_shrink(mask, 4, 4, 1)
+        assert _rows(mask, 4) == [
+            bytes([0, 0, 0, 255]),
+            bytes([0, 0, 0, 255]),
+            bytes([0, 0, 0, 255]),
+            bytes([255] * 4),
+        ]
+
+    def test_shrink_undoes_grow_of_square(self, backend):
+        mask = bytearray(49)
+        for row in range(2, 5):
+            mask[row * 7 + 2:row * 7 + 5] = b"\xff" * 3
+        original = bytearray(mask)
+        mask_shrink(mask_grow(mask, 7, 7, 1), 7, 7, 1)
+        assert mask == original
+
+    def test_grey_levels_are_kept(self, backend):
+        mask = bytearray([0, 0, 90, 0, 0])
+        assert mask_grow(mask, 5, 1, 1) == bytearray([0, 90, 90, 90, 0])
+        assert mask_shrink(bytearray([255, 200, 90, 200, 255]), 5, 1, 1) == bytearray(
+            [200, 90, 90, 90, 200]
+        )
+
+    @pytest.mark.parametrize("operation", [mask_grow, mask_shrink, mask_feather])
+    @pytest.mark.parametrize("width,height,radius", [(23, 17, 3), (5, 40, 9), (31, 3, 300)])
+    def test_backends_agree(self, operation, width, height, radius, monkeypatch):
+        # The last case exceeds both image sides and, for feather, a 256-wide box.
+        pytest.importorskip("numpy")
+        rng = random.Random(5)
+        mask = bytearray(rng.getrandbits(8) for _ in range(width * height))
+        expected = operation(bytearray(mask), width, height, radius)
+        monkeypatch.setattr(mask_ops, "numpy", None)
+        assert operation(bytearray(mask), width, height, radius) == expected
+
+
+class TestFeather:
+    def test_ramp_across_edge(self, backend):
+        mask = bytearray((b"\xff" * 4 + bytes(4)) * 2)
+        row = _rows(mask_feather(mask, 8, 2, 2), 8)[0]
+        assert row[0] == 255 and row[-1] == 0
+        assert list(row) == sorted(row, reverse=True)
+        assert 0 < row[3] < 255 and 0 < row[4] < 255
+
+    def test_zero_radius_is_noop(self, backend):
+        mask = bytearray([0, 40, 255])
+        assert mask_feather(mask, 3, 1, 0) == bytearray([0, 40, 255])
+
+    def test_soft_mask_stays_soft(self, backend):
+        # A uniform grey mask has no edge to feather and must not be
+        # thresholded to black or white.
+        mask = bytearray([100] * 12)
+        assert mask_feather(mask, 4, 3, 2) == bytearray([100] * 12)
+
+    def test_border_pixels_stay_masked(self, backend):
+        mask = bytearray(b"\xff" * 20)
+        assert mask_feather(mask, 5, 4, 3) == bytearray(b"\xff" * 20)
+
+
+class TestAlphaToBgra:
+    def test_white_pixels_with_alpha(self):
+        assert alpha_to_bgra(bytes([0, 128])) == bytearray(
+            [255, 255, 255, 0, 255, 255, 255, 128]
+        )
+
+    def test_reuses_buffer(self):
+        out = bytearray(8)
+        assert alpha_to_bgra(bytes([1, 2]), out) is out
+
+
+class TestMaskBounds:
+    def test_empty_mask(self):
+        assert mask_bounds(bytearray(12), 4, 3) is None
+
+    def test_tight_box(self):
+        mask = bytearray(30)
+        mask[1 * 6 + 2] = 255
+        mask[3 * 6 + 4] = 10
+        assert mask_bounds(mask, 6, 5) == TileRect(2, 1, 3, 3)
+
+    def test_respects_stride(self):
+        mask = bytes([0, 0, 9, 9, 0, 255, 9, 9])
+        assert mask_bounds(mask, 2, 2, stride=4) == TileRect(1, 1, 1, 1)
+
+
+class TestPaddedCrop:
+    def test_pads_and_aligns(self):
+        crop = padded_crop(TileRect(100, 100, 10, 10), 16, 1000, 1000)
+        assert crop == TileRect(84, 84, 48, 48)
+
+    def test_clipped_at_border_and_shifted_inside(self):
+        crop = padded_crop(TileRect(995, 0, 5, 5), 16, 1000, 1000)
+        assert crop == TileRect(976, 0, 24, 24)
+
+    def test_never_larger_than_image(self):
+        crop = padded_crop(TileRect(0, 0, 30, 30), 16, 30, 30)
+        assert crop == TileRect(0, 0, 30, 30)
@@ -0,0 +1,143 @@
+"""Unit tests for forge.domain.node_index — cached UUID/name lookups over a
+node tree, with validation of stale entries and rebuild on miss.
+"""
+
+from __future__ import annotations
+
+from forge.domain.node_index import NodeIndex
+
+
+class _Node:
+    def __init__(self, uid, name, node_type="paintLayer", children=()):
+        self.uid = uid
+        self.label = name
+        self.node_type = node_type
+        self.children = list(children)
+        self.parent = None
+        for child in self.children:
+            child.parent = self
+
+    def uniqueId(self):
+        return self.uid
+
+    def name(self):
+        return self.label
+
+    def type(self):
+        return self.node_type
+
+    def childNodes(self):
+        return list(self.children)
+
+    def parentNode(self):
+        return self.parent
+
+    def add(self, child):
+        child.parent = self
+        self.children.append(child)
+
+    def remove(self):
+        self.parent.children.remove(self)
+        self.parent = None
+
+
+def _tree():
+    return _Node("root", "root", "grouplayer", [
+        _Node("a", "Background"),
+        _Node("g", "Group", "grouplayer", [_Node("b", "Mask"), _Node("c", "Mask")]),
+    ])
+
+
+class TestNodeIndex:
+    def test_finds_nested_node_by_uuid(self):
+        root = _tree()
+        assert NodeIndex().find_by_uuid(root, "c").name() == "Mask"
+
+    def test_name_lookup_returns_first_in_tree_order(self):
+        root = _tree()
+        assert NodeIndex().find_by_name(root, "Mask").uniqueId() == "b"
+
+    def test_uuid_hits_do_not_rewalk(self):
+        root = _tree()
+        index = NodeIndex()
+        index.find_by_uuid(root, "a")
+        index.find_by_uuid(root, "b")
+        index.find_by_uuid(root, "g")
+        assert index.rebuilds == 1
+
+    def test_name_lookup_sees_earlier_node_added_in_krita(self):
+        root = _tree()
+        index = NodeIndex()
+        assert index.find_by_name(root, "Mask").uniqueId() == "b"
+        earlier = _Node("e", "Mask")
+        earlier.parent = root
+        root.children.insert(0, earlier)
+        assert index.find_by_name(root, "Mask") is earlier
+
+    def test_miss_rebuilds_and_finds_new_node(self):
+        root = _tree()
+        index = NodeIndex()
+        index.find_by_uuid(root, "a")
+        root.add(_Node("d", "Preview"))
+        assert index.find_by_uuid(root, "d").name() == "Preview"
+        assert index.rebuilds == 2
+
+    def test_removed_node_is_not_returned(self):
+        root = _tree()
+        index = NodeIndex()
+        node = index.find_by_uuid(root, "a")
+        node.remove()
+        assert index.find_by_uuid(root, "a") is None
+
+    def test_renamed_node_is_not_returned_by_old_name(self):
+        root = _tree()
+        index = NodeIndex()
+        node = index.find_by_name(root, "Background")
+        node.label = "Renamed"
+        assert index.find_by_name(root, "Background") is None
+        assert index.find_by_name(root, "Renamed") is node
+
+    def test_root_is_found(self):
+        root = _tree()
+        assert NodeIndex().find_by_uuid(root, "root") is root
+
+    def test_paintable_names(self):
+        assert NodeIndex().paintable_names(_tree()) == ["Background", "Mask", "Mask"]
+
+    def test_invalidate_forces_rebuild(self):
+        root = _tree()
+        index = NodeIndex()
+        index.find_by_uuid(root, "a")
+        index.invalidate()
+        index.find_by_uuid(root, "a")
+        assert index.rebuilds == 2
+
+    def test_paintable_names_follow_layers_added_in_krita(self):
+        root = _tree()
+        index = NodeIndex()
+        index.paintable_names(root)
+        root.add(_Node("d", "Sketch"))
+        assert index.paintable_names(root) == ["Background", "Mask", "Mask", "Sketch"]
+        assert index.revision == 2
+
+    def test_paintable_names_follow_renames(self):
+        root = _tree()
+        index = NodeIndex()
+        index.paintable_names(root)
+        root.children[0].label = "Paper"
+        assert index.paintable_names(root) == ["Paper", "Mask", "Mask"]
+
+    def test_paintable_names_are_cached_per_revision(self):
+        root = _tree()
+        index = NodeIndex()
+        first = index.paintable_names(root)
+        first.append("caller's own entry")
+        assert index.paintable_names(root) == ["Background", "Mask", "Mask"]
+        assert index.revision == 1
+
+    def test_unchanged_rebuild_keeps_revision(self):
+        root = _tree()
+        index = NodeIndex()
+        index.rebuild(root)
+        index.rebuild(root)
+        assert index.revision == 1
@@ -0,0 +1,86 @@
+"""Unit tests for forge.domain.payload_tiler — per-tile mapping of image
+fields in generation requests and rect scaling.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from forge.domain.generation_plan import TileRect
+from forge.domain.payload_tiler import (
+    map_controlnet_images,
+    map_payload_images,
+    scale_rect,
+)
+
+
+def _controlnet(*units):
+    return {"alwayson_scripts": {"controlnet": {"args": list(units)}}}
+
+
+class TestMapPayloadImages:
+    def test_maps_mask(self):
+        mapped = map_payload_images({"mask_img": "m", "prompt": "p"}, str.upper)
+        assert mapped == {"mask_img": "M", "prompt": "p"}
+
+    def test_leaves_init_image_alone(self):
+        mapped = map_payload_images({"img2img_img": "i"}, str.upper)
+        assert mapped["img2img_img"] == "i"
+
+    def test_maps_controlnet_image_and_mask(self):
+        data = _controlnet({"image": {"image": "a", "mask": "b"}, "weight": 1.0})
+        mapped = map_payload_images(data, str.upper)
+        unit = mapped["alwayson_scripts"]["controlnet"]["args"][0]
+        assert unit == {"image": {"image": "A", "mask": "B"}, "weight": 1.0}
+
+    def test_maps_plain_string_unit_images(self):
+        data = _controlnet({"input_image": "a"}, {"image": ""})
+        args = map_payload_images(data, str.upper)["alwayson_scripts"]["controlnet"]["args"]
+        assert args == [{"input_image": "A"}, {"image": ""}]
+
+    def test_does_not_mutate_input(self):
+        data = _controlnet({"image": {"image": "a"}})
+        data["mask_img"] = "m"
+        map_payload_images(data, str.upper)
+        assert data["mask_img"] == "m"
+        assert data["alwayson_scripts"]["controlnet"]["args"][0]["image"]["image"] == "a"
+
+    def test_other_scripts_are_shared(self):
+        adetailer = {"args": [True]}
+        data = {"alwayson_scripts": {"ADetailer": adetailer, "controlnet": {"args": []}}}
+        mapped = map_payload_images(data, str.upper)
+        assert mapped["alwayson_scripts"]["ADetailer"] is adetailer
+
+
+class TestMapControlnetImages:
+    def test_leaves_mask_alone(self):
+        data = _controlnet({"image": "a"})
+        data["mask_img"] = "m"
+        mapped = map_controlnet_images(data, str.upper)
+        assert mapped["mask_img"] == "m"
+        assert mapped["alwayson_scripts"]["controlnet"]["args"] == [{"image": "A"}]
+
+    def test_without_controlnet_returns_copy(self):
+        data = {"prompt": "p"}
+        mapped = map_controlnet_images(data, str.upper)
+        assert mapped == data
+        assert mapped is not data
+
+
+class TestScaleRect:
+    def test_same_size_is_identity(self):
+        rect = TileRect(10, 20, 30, 40)
+        assert scale_rect(rect, (100, 100), (100, 100)) is rect
+
+    def test_half_size(self):
+        assert scale_rect(TileRect(100, 50, 200, 100), (1000, 500), (500, 250)) == (
+            TileRect(50, 25, 100, 50)
+        )
+
+    def test_rounds_outwards_and_clips(self):
+        rect = scale_rect(TileRect(1, 1, 99, 99), (100, 100), (30, 30))
+        assert rect == TileRect(0, 0, 30, 30)
+
+    def test_invalid_source(self):
+        with pytest.raises(ValueError):
+            scale_rect(TileRect(0, 0, 1, 1), (0, 10), (5, 5))
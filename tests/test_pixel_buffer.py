@@ -0,0 +1,199 @@
+"""Unit tests for forge.domain.pixel_buffer — zero-copy views into raw
+row-major pixel buffers.
+"""
+
+from __future__ import annotations
+
+import base64
+import struct
+import zlib
+
+import pytest
+
+from forge.domain.generation_plan import TileRect
+from forge.domain.pixel_buffer import (
+    ARGB32_ALPHA_OFFSET,
+    RGBA_BYTES_PER_PIXEL,
+    band_mask,
+    channel_plane,
+    scaled_size,
+    scaled_span,
+    tile_view,
+)
+
+
+def _buffer(width: int, height: int) -> bytearray:
+    data = bytearray()
+    for y in range(height):
+        for x in range(width):
+            data.extend((x, y, 0, 255))
+    return data
+
+
+class TestTileView:
+    def test_view_starts_at_first_pixel(self):
+        pixels = _buffer(8, 8)
+        view = tile_view(pixels, 8 * RGBA_BYTES_PER_PIXEL, TileRect(2, 3, 4, 2))
+        assert tuple(view[:4]) == (2, 3, 0, 255)
+
+    def test_view_ends_after_last_pixel(self):
+        pixels = _buffer(8, 8)
+        stride = 8 * RGBA_BYTES_PER_PIXEL
+        view = tile_view(pixels, stride, TileRect(2, 3, 4, 2))
+        assert len(view) == stride + 4 * RGBA_BYTES_PER_PIXEL
+        assert tuple(view[-4:]) == (5, 4, 0, 255)
+
+    def test_rows_use_parent_stride(self):
+        pixels = _buffer(8, 8)
+        stride = 8 * RGBA_BYTES_PER_PIXEL
+        view = tile_view(pixels, stride, TileRect(1, 1, 2, 3))
+        assert tuple(view[2 * stride:2 * stride + 4]) == (1, 3, 0, 255)
+
+    def test_view_is_zero_copy(self):
+        pixels = _buffer(4, 4)
+        view = tile_view(pixels, 4 * RGBA_BYTES_PER_PIXEL, TileRect(1, 1, 2, 2))
+        pixels[4 * 4 + 4] = 99
+        assert view[0] == 99
+
+    def test_empty_rect(self):
+        assert len(tile_view(_buffer(4, 4), 16, TileRect(0, 0, 0, 4))) == 0
+
+
+class TestBandMask:
+    def test_vertical_band(self):
+        mask = band_mask(6, 2, TileRect(2, 0, 3, 2))
+        assert mask == bytes([0, 0, 255, 255, 255, 0]) * 2
+
+    def test_horizontal_band(self):
+        mask = band_mask(2, 4, TileRect(0, 1, 2, 2))
+        assert mask == bytes(2) + b"\xff" * 4 + bytes(2)
+
+    def test_band_is_clipped(self):
+        mask = band_mask(4, 1, TileRect(3, 0, 5, 1))
+        assert mask == bytes([0, 0, 0, 255])
+
+    def test_padding_grows_band(self):
+        mask = band_mask(8, 1, TileRect(3, 0, 2, 1), padding=1)
+        assert mask == bytes([0, 0, 255, 255, 255, 255, 0, 0])
+
+    def test_feather_fades_out_linearly(self):
+        mask = band_mask(9, 1, TileRect(4, 0, 1, 1), padding=1, feather=2)
+        assert mask == bytes([0, 85, 170, 255, 255, 255, 170, 85, 0])
+
+    def test_feather_applies_in_both_directions(self):
+        mask = band_mask(3, 3, TileRect(1, 1, 1, 1), feather=1)
+        assert mask == bytes([128, 128, 128, 128, 255, 128, 128, 128, 128])
+
+
+class TestChannelPlane:
+    def test_extracts_alpha_from_packed_buffer(self):
+        pixels = bytes([1, 2, 3, 10, 4, 5, 6, 20, 7, 8, 9, 30, 0, 0, 0, 40])
+        assert channel_plane(pixels, 2, 2, 8, ARGB32_ALPHA_OFFSET) == bytes([10, 20, 30, 40])
+
+    def test_skips_row_padding(self):
+        pixels = bytes([0, 0, 0, 10, 99, 99, 0, 0, 0, 20, 99, 99])
+        assert channel_plane(pixels, 1, 2, 6, ARGB32_ALPHA_OFFSET) == bytes([10, 20])
+
+    def test_other_channel(self):
+        pixels = _buffer(3, 2)
+        assert channel_plane(pixels, 3, 2, 12, 0) == bytes([0, 1, 2, 0, 1, 2])
+
+
+class TestScaledSize:
+    def test_no_target(self):
+        assert scaled_size(300, 200) == (300, 200)
+
+    def test_width_only(self):
+        assert scaled_size(300, 200, 150) == (150, 100)
+
+    def test_height_only(self):
+        assert scaled_size(300, 200, target_height=100) == (150, 100)
+
+    def test_height_wins_when_both_given(self):
+        assert scaled_size(300, 200, 600, 100) == (150, 100)
+
+    def test_never_collapses_to_zero(self):
+        assert scaled_size(1000, 1, 10) == (10, 1)
+
+    def test_keeps_intermediate_rounding_of_qt_chain(self):
+        # scaledToWidth rounds the height before scaledToHeight uses it.
+        assert scaled_size(96, 152, 62, 370) == (234, 370)
+        assert scaled_size(140, 151, 233, 255) == (237, 255)
+
+    def test_rounds_halves_up_like_qt(self):
+        assert scaled_size(4, 1, 2) == (2, 1)
+        assert scaled_size(2, 3, 1) == (1, 2)
+
+    def test_matches_qt(self, real_qt):
+        output = real_qt("""
+            import random
+            from forge.domain.pixel_buffer import scaled_size
+            from forge.qt_compat import QImage
+
+            rng = random.Random(4)
+            mismatches = 0
+            for _ in range(300):
+                width, height = rng.randint(1, 300), rng.randint(1, 300)
+                target_width = rng.choice([-1, rng.randint(8, 400)])
+                target_height = rng.choice([-1, rng.randint(8, 400)])
+                image = QImage(width, height, QImage.Format.Format_ARGB32)
+                if target_width > -1:
+                    image = image.scaledToWidth(target_width)
+                if target_height > -1:
+                    image = image.scaledToHeight(target_height)
+                size = scaled_size(width, height, target_width, target_height)
+                mismatches += size != (image.width(), image.height())
+            print(mismatches)
+        """)
+        assert output.strip() == "0"
+
+
+def _png_b64(size: int) -> str:
+    """Encode a ``size`` x ``size`` RGBA gradient as PNG without Qt."""
+    row = bytes(range(256)) * (size * 4 // 256 + 2)
+    raw = b"".join(b"\x00" + row[y % 256:y % 256 + size * 4] for y in range(size))
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0)
+    png = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 1))
+    return base64.b64encode(png + chunk(b"IEND", b"")).decode()
+
+
+class TestResultDecodeMemory:
+    @pytest.mark.parametrize("size", [2048, 4096])
+    def test_peak_is_decoded_image_plus_one_copy(self, size, tmp_path, real_qt):
+        # The PNG is built here so that the measuring process starts with a
+        # low peak RSS. The old decode path peaked at more than 3x the decoded
+        # size: QImage, then bits().asstring(), then a QByteArray copy.
+        source = tmp_path / "result.b64"
+        source.write_text(_png_b64(size))
+        output = real_qt(f"""
+            import resource
+            from forge.adapters.krita_adapter import KritaAdapter
+
+            encoded = open({str(source)!r}).read()
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            pixels, width, height = KritaAdapter.base64_to_pixeldata(encoded)
+            after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            print(len(pixels), (after - before) * 1024)
+        """)
+        length, peak = map(int, output.split())
+        assert length == size * size * 4
+        assert peak < 2.5 * length
+
+
+class TestScaledSpan:
+    def test_identity(self):
+        assert scaled_span(10, 20, 100, 100) == (10, 30)
+
+    def test_consecutive_strips_tile_target(self):
+        spans = [scaled_span(top, min(7, 50 - top), 50, 19) for top in range(0, 50, 7)]
+        assert spans[0][0] == 0
+        assert spans[-1][1] == 19
+        assert all(prev[1] == nxt[0] for prev, nxt in zip(spans, spans[1:]))
+
+    def test_invalid_source_raises(self):
+        with pytest.raises(ValueError):
+            scaled_span(0, 1, 0, 10)
@@ -0,0 +1,81 @@
+"""Unit tests for forge.domain.png_stream — the incremental RGBA PNG
+encoder and BGRA channel swapping.
+"""
+
+from __future__ import annotations
+
+import io
+import struct
+import zlib
+
+import pytest
+
+from forge.domain.png_stream import PNG_SIGNATURE, PngStreamWriter, bgra_to_rgba
+
+
+def _chunks(png: bytes):
+    assert png.startswith(PNG_SIGNATURE)
+    offset = len(PNG_SIGNATURE)
+    while offset < len(png):
+        (length,) = struct.unpack(">I", png[offset:offset + 4])
+        kind = png[offset + 4:offset + 8]
+        payload = png[offset + 8:offset + 8 + length]
+        (crc,) = struct.unpack(">I", png[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(kind + payload)
+        yield kind, payload
+        offset += 12 + length
+
+
+def _encode(width, height, strips, compression=3):
+    sink = io.BytesIO()
+    writer = PngStreamWriter(sink, width, height, compression)
+    for strip in strips:
+        writer.write_rows(strip)
+    writer.close()
+    return sink.getvalue(), writer
+
+
+class TestPngStreamWriter:
+    def test_round_trips_pixels(self):
+        rows = [bytes(range(row * 8, row * 8 + 8)) for row in range(3)]
+        png, writer = _encode(2, 3, [rows[0], rows[1] + rows[2]])
+        chunks = list(_chunks(png))
+
+        assert [kind for kind, _ in chunks] == [b"IHDR", b"IDAT", b"IEND"]
+        assert struct.unpack(">IIBBBBB", chunks[0][1]) == (2, 3, 8, 6, 0, 0, 0)
+        data = zlib.decompress(b"".join(p for kind, p in chunks if kind == b"IDAT"))
+        assert data == b"".join(b"\x00" + row for row in rows)
+        assert writer.bytes_written == len(png)
+
+    def test_splits_large_idat(self, monkeypatch):
+        monkeypatch.setattr("forge.domain.png_stream.IDAT_CHUNK_SIZE", 16)
+        strip = bytes(range(256)) * 4
+        png, _ = _encode(16, 16, [strip], compression=0)
+        assert sum(kind == b"IDAT" for kind, _ in _chunks(png)) > 1
+
+    def test_partial_row_is_rejected(self):
+        writer = PngStreamWriter(io.BytesIO(), 2, 2)
+        with pytest.raises(ValueError):
+            writer.write_rows(b"\x00" * 12)
+
+    def test_too_many_rows_is_rejected(self):
+        writer = PngStreamWriter(io.BytesIO(), 1, 1)
+        with pytest.raises(ValueError):
+            writer.write_rows(b"\x00" * 8)
+
+    def test_close_before_all_rows_is_rejected(self):
+        writer = PngStreamWriter(io.BytesIO(), 1, 2)
+        writer.write_rows(b"\x00" * 4)
+        with pytest.raises(ValueError):
+            writer.close()
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            PngStreamWriter(io.BytesIO(), 0, 1)
+
+
+class TestBgraToRgba:
+    def test_swaps_red_and_blue(self):
+        assert bgra_to_rgba(b"\x01\x02\x03\x04\x05\x06\x07\x08") == bytearray(
+            b"\x03\x02\x01\x04\x07\x06\x05\x08"
+        )
@@ -0,0 +1,97 @@
+"""Unit tests for forge.domain.preview_pipeline — preview frame deduplication,
+commit rate limiting and the latest-frame slot.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from forge.domain.preview_pipeline import (
+    LatestFrameSlot,
+    PreviewFrameGate,
+    PreviewThrottle,
+    frame_fingerprint,
+)
+
+
+class TestPreviewFrameGate:
+    def test_first_frame_is_admitted(self):
+        assert PreviewFrameGate().admit("a") is True
+
+    def test_unchanged_frame_is_skipped(self):
+        gate = PreviewFrameGate()
+        gate.admit("a")
+        assert gate.admit("a") is False
+
+    def test_changed_frame_is_admitted(self):
+        gate = PreviewFrameGate()
+        gate.admit("a")
+        assert gate.admit("b") is True
+
+    def test_reset_forgets_last_frame(self):
+        gate = PreviewFrameGate()
+        gate.admit("a")
+        gate.reset()
+        assert gate.admit("a") is True
+
+
+class TestPreviewThrottle:
+    def test_first_commit_is_immediate(self):
+        assert PreviewThrottle(max_fps=2).delay(now=5.0) == 0.0
+
+    def test_commits_inside_interval_wait(self):
+        throttle = PreviewThrottle(max_fps=2)
+        throttle.mark(now=0.0)
+        assert throttle.delay(now=0.2) == pytest.approx(0.3)
+        assert throttle.delay(now=0.6) == 0.0
+
+    def test_zero_fps_disables_cap(self):
+        throttle = PreviewThrottle(max_fps=0)
+        throttle.mark(now=0.0)
+        assert throttle.delay(now=0.0) == 0.0
+
+    def test_reset(self):
+        throttle = PreviewThrottle(max_fps=1)
+        throttle.mark(now=0.0)
+        throttle.reset()
+        assert throttle.delay(now=0.1) == 0.0
+
+
+class TestLatestFrameSlot:
+    def test_take_empties_slot(self):
+        slot = LatestFrameSlot()
+        slot.put(1)
+        assert slot.take() == 1
+        assert slot.take() is None
+
+    def test_newer_frame_replaces_unconsumed_one(self):
+        slot = LatestFrameSlot()
+        slot.put(1)
+        slot.put(2)
+        assert slot.take() == 2
+        assert slot.dropped == 1
+
+    def test_clear(self):
+        slot = LatestFrameSlot()
+        slot.put(1)
+        slot.clear()
+        assert slot.take() is None
+
+    def test_frames_of_other_jobs_are_dropped(self):
+        slot = LatestFrameSlot()
+        slot.open("job-2")
+        assert not slot.put(1, "job-1")
+        assert slot.put(2, "job-2")
+        assert slot.take() == 2
+
+    def test_late_frames_after_clear_are_dropped(self):
+        slot = LatestFrameSlot()
+        slot.open("job-1")
+        slot.clear()
+        assert not slot.put(1, "job-1")
+        assert slot.take() is None
+
+
+def test_fingerprint_depends_on_content():
+    assert frame_fingerprint("a") == frame_fingerprint("a")
+    assert frame_fingerprint("a") != frame_fingerprint("b")
@@ -371,6 +371,208 @@ class TestErrorHandling:
         assert result == b"not json at all"
 
 
+# ---------------------------------------------------------------------------
+# Tile planning
+# ---------------------------------------------------------------------------
+
+class TestPlanTiles:
+    """plan_tiles() sizes tiles from the model family in the request."""
+
+    def test_uses_model_family_max_size(self):
+        api = _make_api(max_retries=0)
+        layout = api.plan_tiles({"model": "wan2.1.safetensors"}, 3000, 1000)
+        assert layout.tile_width <= 1024
+        assert (layout.columns, layout.rows) == (4, 1)
+
+    def test_explicit_tile_size_overrides_model(self):
+        api = _make_api(max_retries=0)
+        layout = api.plan_tiles({"model": "sdxl_base"}, 3000, 1000, tile_size=512)
+        assert layout.tile_width == 512
+        assert layout.tile_height == 512
+
+    def test_single_tile_when_image_fits(self):
+        api = _make_api(max_retries=0)
+        layout = api.plan_tiles({}, 1024, 1024)
+        assert layout.tile_count == 1
+
+
+class TestIterTiles:
+    """iter_tiles() encodes tiles ahead of the consumer, in layout order."""
+
+    @staticmethod
+    def _layout():
+        from forge.domain.generation_plan import build_tile_layout
+        return build_tile_layout(3000, 1000, min_size=512, max_size=1024)
+
+    def test_yields_tiles_in_layout_order(self):
+        layout = self._layout()
+        with patch(
+            "forge.adapters.sd_api._encode_tile",
+            side_effect=lambda pixels, stride, rect, quality: f"{rect.x},{rect.y}",
+        ):
+            tiles = list(SDAPI.iter_tiles(b"", 0, layout.tiles, workers=2))
+        assert [t["tile_b64"] for t in tiles] == [
+            f"{rect.x},{rect.y}" for rect in layout.tiles
+        ]
+        assert (tiles[0]["w"], tiles[0]["h"]) == (layout.tile_width, layout.tile_height)
+
+    def test_encoding_is_lazy_and_bounded(self):
+        layout = self._layout()
+        encoded = []
+
+        def _encode(pixels, stride, rect, quality):
+            encoded.append(rect)
+            return "tile"
+
+        with patch("forge.adapters.sd_api._encode_tile", side_effect=_encode):
+            stream = SDAPI.iter_tiles(b"", 0, layout.tiles, workers=1)
+            next(stream)
+            stream.close()
+        assert len(encoded) < layout.tile_count
+
+    def test_passes_compression_as_qt_quality(self):
+        layout = self._layout()
+        with patch(
+            "forge.adapters.sd_api._encode_tile", return_value="tile",
+        ) as mock_encode:
+            list(SDAPI.iter_tiles(b"", 0, layout.tiles, png_compression=0, workers=1))
+        assert mock_encode.call_args.args[3] == 100
+
+
+class TestTiledGenerate:
+    """tiled_generate() end to end, through the real Qt image codecs."""
+
+    def test_png_source(self, real_qt):
+        output = real_qt("""
+            import base64
+            from unittest.mock import MagicMock, patch
+            from forge.adapters.sd_api import SDAPI, _qimage_to_b64
+            from forge.qt_compat import QImage
+
+            image = QImage(1500, 700, QImage.Format.Format_RGBA8888)
+            for y in range(700):
+                for x in range(1500):
+                    image.setPixel(x, y, 0xFF000000 | (x % 256) << 16 | (y % 256) << 8)
+            source = _qimage_to_b64(image)
+            assert source.startswith("iVBORw0KGgo")
+
+            with patch("forge.adapters.sd_api.urllib.request.urlopen") as urlopen:
+                urlopen.side_effect = ConnectionRefusedError
+                api = SDAPI(max_retries=0)
+            sent = []
+            api.img2img = lambda data: sent.append(data) or {"images": [data["img2img_img"]]}
+
+            result = api.tiled_generate({"img2img_img": source}, tile_size=512)
+            decoded = QImage.fromData(base64.b64decode(result["images"][0]))
+            print(len(sent), decoded.width(), decoded.height())
+        """)
+        tiles, width, height = map(int, output.split())
+        assert tiles > 1
+        assert (width, height) == (1500, 700)
+
+    def test_flat_tiles_are_skipped_only_when_enabled(self, real_qt):
+        output = real_qt("""
+            from unittest.mock import patch
+            from forge.adapters.sd_api import SDAPI, _qimage_to_b64
+            from forge.domain.tile_filter import TileSkipThresholds
+            from forge.qt_compat import QImage
+
+            image = QImage(1500, 700, QImage.Format.Format_RGBA8888)
+            image.fill(0xFF336699)
+            source = _qimage_to_b64(image)
+
+            with patch("forge.adapters.sd_api.urllib.request.urlopen") as urlopen:
+                urlopen.side_effect = ConnectionRefusedError
+                api = SDAPI(max_retries=0)
+            api.img2img = lambda data: {"images": [data["img2img_img"]]}
+
+            for thresholds in (None, TileSkipThresholds()):
+                info = api.tiled_generate(
+                    {"img2img_img": source}, tile_size=512, skip_thresholds=thresholds,
+                )["info"]
+                print(info["tiles_total"], info["tiles_skipped"])
+        """)
+        default, enabled = [tuple(map(int, line.split())) for line in output.splitlines()]
+        assert default[1] == 0
+        assert enabled[1] == enabled[0] > 1
+
+
+class TestRefineStripBatch:
+    """Seam strip requests carry only what a strip needs."""
+
+    def test_controlnet_units_are_left_out(self):
+        from forge.domain.generation_plan import SeamRefinement
+
+        api = _make_api(max_retries=0)
+        sent = []
+        api.img2img = lambda data: sent.append(data) or {"images": ["a", "b"]}
+        data = {
+            "img2img_img": "full",
+            "mask_img": "full-mask",
+            "prompt": "p",
+            "alwayson_scripts": {
+                "controlnet": {"args": [{"image": "full-control"}]},
+                "soft inpainting": {"args": [True]},
+            },
+        }
+        batch = [
+            {"x": 0, "y": 0, "w": 64, "h": 256, "tile_b64": "a"},
+            {"x": 512, "y": 0, "w": 64, "h": 256, "tile_b64": "b"},
+        ]
+
+        assert api._refine_strip_batch(data, batch, "band", SeamRefinement()) == ["a", "b"]
+        assert sent[0]["alwayson_scripts"] == {"soft inpainting": {"args": [True]}}
+        assert sent[0]["init_images"] == ["a", "b"]
+        assert sent[0]["mask_blur"] == 0
+        assert "controlnet" in data["alwayson_scripts"]
+
+
+class TestRefineSeams:
+    def test_batches_overlap_and_mask_is_feathered(self, real_qt):
+        output = real_qt("""
+            import base64, threading, time
+            from unittest.mock import patch
+            from forge.adapters.sd_api import SDAPI, _qimage_to_b64
+            from forge.domain.generation_plan import SeamRefinement, build_tile_layout
+            from forge.qt_compat import QImage
+
+            image = QImage(1500, 1200, QImage.Format.Format_RGBA8888)
+            image.fill(0xFF336699)
+            layout = build_tile_layout(1500, 1200, min_size=0, max_size=512, min_overlap=64)
+
+            with patch("forge.adapters.sd_api.urllib.request.urlopen") as urlopen:
+                urlopen.side_effect = ConnectionRefusedError
+                api = SDAPI(max_retries=0)
+            api.tile_encode_workers = 3
+            lock = threading.Lock()
+            active, peak, masks = [0], [0], set()
+
+            def img2img(data):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                    masks.add(data["mask_img"])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+                return {"images": data["init_images"]}
+
+            api.img2img = img2img
+            refined, strips = api.refine_seams(
+                {}, _qimage_to_b64(image), layout, SeamRefinement(batch_size=1),
+            )
+            levels = set()
+            for mask_b64 in masks:
+                mask = QImage.fromData(base64.b64decode(mask_b64))
+                levels.update(mask.pixel(x, 0) & 0xFF for x in range(mask.width()))
+            print(strips, peak[0], len(levels) > 2, 0 in levels, 255 in levels)
+        """)
+        strips, peak, soft, has_black, has_white = output.split()
+        assert int(strips) > 3
+        assert int(peak) > 1
+        assert (soft, has_black, has_white) == ("True", "True", "True")
+
+
 # ---------------------------------------------------------------------------
 # BackendType and ConnectionState enum completeness
 # ---------------------------------------------------------------------------
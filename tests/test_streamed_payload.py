@@ -0,0 +1,107 @@
+"""Unit tests for forge.domain.streamed_payload — streamed images in JSON
+request bodies.
+"""
+
+from __future__ import annotations
+
+import base64
+import copy
+import io
+import json
+import tempfile
+
+import pytest
+
+from forge.domain.payload_builder import build_api_payload
+from forge.domain.streamed_payload import (
+    StreamedImage,
+    StreamedJsonBody,
+    contains_streams,
+    iter_streams,
+    json_default,
+)
+
+
+def _streamed(data: bytes) -> StreamedImage:
+    return StreamedImage(io.BytesIO(data), len(data), 4, 4)
+
+
+class TestStreamedImage:
+    @pytest.mark.parametrize("size", [0, 1, 2, 3, 10])
+    def test_chunks_join_to_base64(self, size):
+        data = bytes(range(size))
+        image = _streamed(data)
+        assert b"".join(image.iter_base64(block_size=4)) == base64.b64encode(data)
+        assert image.base64_length == len(base64.b64encode(data))
+
+    def test_read_base64(self):
+        assert _streamed(b"png").read_base64() == base64.b64encode(b"png").decode()
+
+
+class TestStreamedJsonBody:
+    def test_matches_inline_json(self):
+        first, second = b"first image", b"\x00\xff" * 50
+        payload = {
+            "prompt": 'say "hi"',
+            "init_images": [_streamed(first)],
+            "alwayson_scripts": {"controlnet": {"args": [{"image": _streamed(second)}]}},
+        }
+        body = StreamedJsonBody(payload)
+        encoded = b"".join(body)
+
+        assert json.loads(encoded) == {
+            "prompt": 'say "hi"',
+            "init_images": [base64.b64encode(first).decode()],
+            "alwayson_scripts": {
+                "controlnet": {"args": [{"image": base64.b64encode(second).decode()}]},
+            },
+        }
+        assert body.length == len(encoded)
+
+    def test_can_be_iterated_again(self):
+        body = StreamedJsonBody({"image": _streamed(b"abcd")})
+        assert b"".join(body) == b"".join(body)
+
+
+class TestPayloadBuilding:
+    @pytest.mark.parametrize("spool_size", [1 << 20, 16])
+    def test_stream_survives_build_api_payload(self, spool_size):
+        data = b"\x89PNG" + bytes(range(256)) * 4
+        spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        spool.write(data)  # rolls over to a real file when over spool_size
+        image = StreamedImage(spool, len(data), 64, 64)
+
+        payload = build_api_payload({"img2img_img": image, "prompt": "p"})
+        assert payload["init_images"][0] is image
+
+        encoded = json.loads(b"".join(StreamedJsonBody(payload)))
+        assert encoded["init_images"] == [base64.b64encode(data).decode()]
+        image.close()
+
+    def test_copies_are_the_same_stream(self):
+        image = _streamed(b"abc")
+        assert copy.copy(image) is image
+        assert copy.deepcopy({"a": [image]})["a"][0] is image
+
+
+class TestHelpers:
+    def test_contains_streams(self):
+        assert contains_streams({"a": [{"b": _streamed(b"")}]})
+        assert not contains_streams({"a": ["b", 1, None]})
+
+    def test_iter_streams(self):
+        first, second = _streamed(b"1"), _streamed(b"2")
+        assert list(iter_streams({"a": [first, {"b": (second,)}], "c": 1})) == [first, second]
+
+    def test_closed(self):
+        image = _streamed(b"abc")
+        image.close()
+        assert image.closed
+
+    def test_json_default_describes_stream(self):
+        text = json.dumps({"image": _streamed(b"abc")}, default=json_default)
+        assert "streamed image 4x4, 3 bytes" in text
+
+    def test_json_default_rejects_other_objects(self):
+        with pytest.raises(TypeError):
+            json.dumps({"value": object()}, default=json_default)
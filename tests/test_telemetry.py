@@ -0,0 +1,67 @@
+"""Unit tests for forge.domain.telemetry — counters, metrics and timing."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from forge.domain.telemetry import Telemetry
+
+
+class TestTelemetry:
+    def test_counters_accumulate(self):
+        t = Telemetry()
+        t.increment("tiles.skipped")
+        t.increment("tiles.skipped", 3)
+        assert t.counter("tiles.skipped") == 4
+        assert t.counter("missing") == 0
+
+    def test_metrics_track_count_total_last(self):
+        t = Telemetry()
+        t.record("upload.bytes", 100)
+        t.record("upload.bytes", 300)
+        summary = t.metric("upload.bytes")
+        assert summary.count == 2
+        assert summary.total == 400
+        assert summary.last == 300
+        assert summary.mean == 200
+
+    def test_timed_records_milliseconds(self):
+        t = Telemetry()
+        with t.timed("insert.ms"):
+            pass
+        summary = t.metric("insert.ms")
+        assert summary.count == 1
+        assert summary.last >= 0.0
+
+    def test_timed_records_on_exception(self):
+        t = Telemetry()
+        with pytest.raises(RuntimeError):
+            with t.timed("failing.ms"):
+                raise RuntimeError("boom")
+        assert t.metric("failing.ms").count == 1
+
+    def test_snapshot_and_reset(self):
+        t = Telemetry()
+        t.increment("a")
+        t.record("b", 2.0)
+        snapshot = t.snapshot()
+        assert snapshot["counters"] == {"a": 1}
+        assert snapshot["metrics"]["b"]["mean"] == 2.0
+        t.reset()
+        assert t.snapshot() == {"counters": {}, "metrics": {}}
+
+    def test_thread_safe_increments(self):
+        t = Telemetry()
+
+        def _work():
+            for _ in range(1000):
+                t.increment("n")
+
+        threads = [threading.Thread(target=_work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert t.counter("n") == 4000
@@ -0,0 +1,142 @@
+"""Unit tests for forge.domain.tile_filter — per-tile statistics and the
+skip decision used by tiled generation.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from forge.domain.generation_plan import TileRect
+from forge.domain.tile_filter import (
+    TileSkipThresholds,
+    TileStats,
+    measure_tile,
+    tile_skip_reason,
+)
+
+
+def _rgba(width: int, height: int, pixel_fn) -> bytes:
+    data = bytearray()
+    for y in range(height):
+        for x in range(width):
+            data.extend(pixel_fn(x, y))
+    return bytes(data)
+
+
+def _gray(width: int, height: int, value_fn) -> bytes:
+    return bytes(value_fn(x, y) for y in range(height) for x in range(width))
+
+
+# ---------------------------------------------------------------------------
+# measure_tile
+# ---------------------------------------------------------------------------
+
+
+class TestMeasureTile:
+    """Variance and coverage are measured on the tile rectangle only."""
+
+    def test_flat_opaque_tile(self):
+        pixels = _rgba(8, 8, lambda x, y: (10, 20, 30, 255))
+        stats = measure_tile(pixels, 8 * 4, TileRect(0, 0, 8, 8), sample_step=1)
+        assert stats.variance == 0.0
+        assert stats.alpha_coverage == 1.0
+        assert stats.mask_coverage is None
+
+    def test_checkerboard_has_variance(self):
+        pixels = _rgba(
+            8, 8,
+            lambda x, y: (255, 255, 255, 255) if (x + y) % 2 else (0, 0, 0, 255),
+        )
+        stats = measure_tile(pixels, 8 * 4, TileRect(0, 0, 8, 8), sample_step=1)
+        assert stats.variance == pytest.approx(127.5 ** 2)
+
+    def test_transparent_tile(self):
+        pixels = _rgba(4, 4, lambda x, y: (0, 0, 0, 0))
+        stats = measure_tile(pixels, 4 * 4, TileRect(0, 0, 4, 4), sample_step=1)
+        assert stats.alpha_coverage == 0.0
+
+    def test_only_rect_is_sampled(self):
+        pixels = _rgba(
+            8, 4,
+            lambda x, y: (0, 0, 0, 0) if x < 4 else (x * 30, y * 30, 0, 255),
+        )
+        left = measure_tile(pixels, 8 * 4, TileRect(0, 0, 4, 4), sample_step=1)
+        right = measure_tile(pixels, 8 * 4, TileRect(4, 0, 4, 4), sample_step=1)
+        assert left.alpha_coverage == 0.0
+        assert right.alpha_coverage == 1.0
+        assert right.variance > 0.0
+
+    def test_padded_stride(self):
+        stride = 4 * 4 + 8
+        data = bytearray()
+        for _ in range(4):
+            data.extend(bytes((5, 5, 5, 255)) * 4)
+            data.extend(b"\xff" * 8)
+        stats = measure_tile(bytes(data), stride, TileRect(0, 0, 4, 4), sample_step=1)
+        assert stats.variance == 0.0
+
+    def test_mask_coverage(self):
+        pixels = _rgba(8, 8, lambda x, y: (x * 30, y * 30, 0, 255))
+        mask = _gray(8, 8, lambda x, y: 255 if x >= 6 else 0)
+        inside = measure_tile(
+            pixels, 32, TileRect(4, 0, 4, 8), mask=mask, mask_stride=8, sample_step=1,
+        )
+        outside = measure_tile(
+            pixels, 32, TileRect(0, 0, 4, 8), mask=mask, mask_stride=8, sample_step=1,
+        )
+        assert inside.mask_coverage == pytest.approx(0.5)
+        assert outside.mask_coverage == 0.0
+
+    def test_inverted_mask_coverage(self):
+        pixels = _rgba(4, 4, lambda x, y: (x * 60, y * 60, 0, 255))
+        mask = _gray(4, 4, lambda x, y: 255)
+        stats = measure_tile(
+            pixels, 16, TileRect(0, 0, 4, 4),
+            mask=mask, mask_stride=4, mask_inverted=True, sample_step=1,
+        )
+        assert stats.mask_coverage == 0.0
+
+    def test_sampling_step_skips_pixels(self):
+        pixels = _rgba(8, 8, lambda x, y: (0, 0, 0, 255) if x % 2 == 0 else (0, 0, 0, 0))
+        stats = measure_tile(pixels, 32, TileRect(0, 0, 8, 8), sample_step=2)
+        assert stats.alpha_coverage == 1.0
+
+
+# ---------------------------------------------------------------------------
+# tile_skip_reason
+# ---------------------------------------------------------------------------
+
+
+class TestTileSkipReason:
+    """Thresholds decide which tiles are copied through."""
+
+    def test_detailed_tile_is_generated(self):
+        stats = TileStats(variance=500.0, alpha_coverage=1.0)
+        assert tile_skip_reason(stats, TileSkipThresholds()) is None
+
+    def test_flat_tile_is_skipped(self):
+        stats = TileStats(variance=0.0, alpha_coverage=1.0)
+        assert tile_skip_reason(stats, TileSkipThresholds()) == "flat"
+
+    def test_transparent_tile_is_skipped(self):
+        stats = TileStats(variance=500.0, alpha_coverage=0.0)
+        assert tile_skip_reason(stats, TileSkipThresholds()) == "transparent"
+
+    def test_unmasked_tile_is_skipped(self):
+        stats = TileStats(variance=500.0, alpha_coverage=1.0, mask_coverage=0.0)
+        assert tile_skip_reason(stats, TileSkipThresholds()) == "unmasked"
+
+    def test_zero_thresholds_disable_skipping(self):
+        thresholds = TileSkipThresholds(
+            min_variance=0.0, min_alpha_coverage=0.0, min_mask_coverage=0.0,
+        )
+        stats = TileStats(variance=0.0, alpha_coverage=0.0, mask_coverage=0.0)
+        assert tile_skip_reason(stats, thresholds) is None
+
+    def test_masked_flat_tile_is_generated(self):
+        stats = TileStats(variance=0.0, alpha_coverage=1.0, mask_coverage=1.0)
+        assert tile_skip_reason(stats, TileSkipThresholds()) is None
+
+    def test_masked_transparent_tile_is_generated(self):
+        stats = TileStats(variance=0.0, alpha_coverage=0.0, mask_coverage=0.5)
+        assert tile_skip_reason(stats, TileSkipThresholds()) is None